@@ -0,0 +1,132 @@
+import asyncio
+from typing import List, Optional
+
+import strawberry
+from fastapi import FastAPI
+from strawberry.fastapi import GraphQLRouter
+
+# Stand-ins for the external hotelmate review and loyalty services.
+#
+# They answer the queries the room and guest services send (see their client.py) with
+# generated data, after a fixed delay that plays the part of the network and the upstream's
+# own work. Their schemas are introspectable like the real ones, so the services' startup
+# behaves as it does against the real upstreams.
+
+REVIEW_DATE = "2025-06-01"
+
+@strawberry.type
+class ReviewAspect:
+    rating: int
+    comment: Optional[str] = None
+
+@strawberry.type
+class Review:
+    reviewId: int
+    stayId: int
+    overallRating: int
+    content: Optional[str] = None
+    reviewDate: str
+    lastUpdated: Optional[str] = None
+    aspects: List[ReviewAspect]
+
+@strawberry.type
+class Reward:
+    rewardId: int
+    name: str
+    pointsRequired: int
+    description: Optional[str] = None
+    available: bool
+    tierRestriction: Optional[str] = None
+    createdAt: str
+    updatedAt: str
+
+@strawberry.type
+class LoyaltyGuest:
+    loyaltyPoints: int
+    tier: str
+
+@strawberry.type
+class LoyaltyInfo:
+    loyaltyPoints: int
+    tier: str
+    availableRewards: List[Reward]
+
+TIERS = ["STANDARD", "SILVER", "GOLD", "PLATINUM"]
+
+def generate_reviews(rooms: int, per_room: int) -> List[Review]:
+    return [
+        Review(
+            reviewId=room_id * per_room + n,
+            stayId=room_id,
+            overallRating=1 + (room_id + n) % 5,
+            content=f"Review {n + 1} of room {room_id}",
+            reviewDate=REVIEW_DATE,
+            lastUpdated=REVIEW_DATE,
+            aspects=[ReviewAspect(rating=1 + (room_id + n) % 5, comment="Cleanliness")]
+        )
+        for room_id in range(1, rooms + 1)
+        for n in range(per_room)
+    ]
+
+def generate_rewards() -> List[Reward]:
+    return [
+        Reward(
+            rewardId=index + 1,
+            name=f"{tier.title()} late check-out",
+            pointsRequired=500 * (index + 1),
+            description="Check out at 2 PM",
+            available=True,
+            tierRestriction=tier,
+            createdAt=REVIEW_DATE,
+            updatedAt=REVIEW_DATE
+        )
+        for index, tier in enumerate(TIERS)
+    ]
+
+def review_service(latency: float, rooms: int, reviews_per_room: int) -> FastAPI:
+    """Review service answering ``reviews`` after ``latency`` seconds"""
+    reviews = generate_reviews(rooms, reviews_per_room)
+
+    @strawberry.type
+    class Query:
+        @strawberry.field
+        async def reviews(self) -> List[Review]:
+            await asyncio.sleep(latency)
+            return reviews
+
+    app = FastAPI(title="Fake Review Service")
+    app.include_router(GraphQLRouter(strawberry.Schema(query=Query)), prefix="/graphql")
+    return app
+
+def loyalty_service(latency: float) -> FastAPI:
+    """Loyalty service answering every guest after ``latency`` seconds; the tier follows from the guest id"""
+    rewards = generate_rewards()
+
+    def tier_of(guest_id: int) -> str:
+        return TIERS[guest_id % len(TIERS)]
+
+    @strawberry.type
+    class Query:
+        @strawberry.field
+        async def loyalty_info_by_guest_id(self, guest_id: int) -> Optional[LoyaltyInfo]:
+            await asyncio.sleep(latency)
+            tier = tier_of(guest_id)
+            return LoyaltyInfo(
+                loyaltyPoints=100 * guest_id,
+                tier=tier,
+                availableRewards=[reward for reward in rewards if reward.tierRestriction == tier]
+            )
+
+        @strawberry.field
+        async def guest_by_email(self, email: str) -> Optional[LoyaltyGuest]:
+            await asyncio.sleep(latency)
+            return LoyaltyGuest(loyaltyPoints=100, tier=TIERS[0])
+
+        @strawberry.field
+        async def rewards(self, tier: Optional[str] = None, available: Optional[bool] = None) -> List[Reward]:
+            await asyncio.sleep(latency)
+            return [reward for reward in rewards if tier is None or reward.tierRestriction == tier]
+
+    app = FastAPI(title="Fake Loyalty Service")
+    app.include_router(GraphQLRouter(strawberry.Schema(query=Query)), prefix="/graphql")
+    return app
@@ -0,0 +1,180 @@
+import asyncio
+import csv
+import io
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, List
+
+from services import Cluster
+
+# Seed data and the named benchmark scenarios.
+#
+# A scenario is one "user request": a coroutine taking the cluster, the seeded dataset and
+# a running request index, which raises if the request failed. Its latency is the time
+# until the coroutine returns, so a page that sends several queries at once (the dashboard)
+# counts as one request.
+
+# Seeded checked-out stays start here, far enough back that stays of different rooms and
+# the future stays never overlap
+PAST_STAYS_START = date.today() - timedelta(days=400)
+FUTURE_STAYS_START = date.today() + timedelta(days=30)
+# create_reservation books after every seeded stay
+BURST_STAYS_START = date.today() + timedelta(days=730)
+# Every stay is two nights, and a room's stays are three days apart
+STAY_NIGHTS = 2
+STAY_SPACING = 3
+RESERVATION_BATCH_SIZE = 100
+
+class Dataset:
+    def __init__(self, room_ids: List[int], guest_ids: List[int], reservations: int, bills: int):
+        self.room_ids = room_ids
+        self.guest_ids = guest_ids
+        self.reservations = reservations
+        self.bills = bills
+
+def _csv(columns: List[str], rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+def stay(room_ids: List[int], index: int, start: date) -> Dict[str, Any]:
+    """Room and dates of the ``index``-th stay from ``start``, spread over the rooms without overlaps"""
+    check_in = start + timedelta(days=STAY_SPACING * (index // len(room_ids)))
+    return {
+        "roomId": room_ids[index % len(room_ids)],
+        "checkInDate": check_in.isoformat(),
+        "checkOutDate": (check_in + timedelta(days=STAY_NIGHTS)).isoformat(),
+    }
+
+async def _import(cluster: Cluster, service: str, path: str, body: bytes):
+    response = await cluster.client.post(cluster.url(service, path), content=body, headers={"Content-Type": "text/csv"})
+    response.raise_for_status()
+    result = response.json()
+    if result["failed"]:
+        raise Exception(f"{path}: {result['errors'][:3]}")
+
+async def seed(cluster: Cluster, rooms: int, guests: int, reservations: int) -> Dataset:
+    """Import rooms and guests, book reservations (three in five checked out) and bill the checked-out ones"""
+    await _import(cluster, "room_service", "/import/rooms.csv", _csv(
+        ["room_number", "room_type", "price_per_night", "status"],
+        ([f"B{n:05d}", ["Standard", "Deluxe", "Suite"][n % 3], 100 + 50 * (n % 3), "available"] for n in range(rooms))
+    ))
+    await _import(cluster, "guest_service", "/import/guests.csv", _csv(
+        ["full_name", "email", "phone", "address"],
+        ([f"Guest {n}", f"guest{n}@bench.example", f"+62 800 {n:06d}", f"Jalan Benchmark {n}"] for n in range(guests))
+    ))
+    # Includes the services' own sample data; rooms in maintenance can't be booked
+    room_ids = [room["id"] for room in (await cluster.graphql("room_service", "{ rooms { id status } }"))["rooms"] if room["status"] != "maintenance"]
+    guest_ids = [guest["id"] for guest in (await cluster.graphql("guest_service", "{ guests { id } }"))["guests"]]
+
+    items = []
+    for n in range(reservations):
+        if n % 5 < 3:
+            item = {**stay(room_ids, n, PAST_STAYS_START), "status": "checked-out"}
+        else:
+            item = {**stay(room_ids, n, FUTURE_STAYS_START), "status": "confirmed"}
+        items.append({**item, "guestId": guest_ids[n % len(guest_ids)]})
+    booked = 0
+    for start in range(0, len(items), RESERVATION_BATCH_SIZE):
+        data = await cluster.graphql(
+            "reservation_service",
+            "mutation Seed($items: [ReservationInput!]!) { createReservations(items: $items) { success error } }",
+            {"items": items[start:start + RESERVATION_BATCH_SIZE]}
+        )
+        results = data["createReservations"]
+        booked += sum(result["success"] for result in results)
+        failed = [result["error"] for result in results if not result["success"]]
+        if failed:
+            raise Exception(f"Seeding reservations failed: {failed[:3]}")
+
+    bills = await cluster.graphql(
+        "billing_service",
+        "mutation Seed($since: Date!) { generateBills(checkedOutSince: $since) { created } }",
+        {"since": PAST_STAYS_START.isoformat()}
+    )
+    return Dataset(room_ids, guest_ids, booked, bills["generateBills"]["created"])
+
+RESERVATIONS_PAGE = """
+query ReservationsPage($first: Int) {
+  reservationsConnection(first: $first) {
+    edges {
+      node {
+        id
+        checkInDate
+        checkOutDate
+        status
+        guest { fullName email }
+        room { roomNumber roomType pricePerNight }
+      }
+    }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+"""
+
+async def reservations_list(cluster: Cluster, dataset: Dataset, index: int):
+    """A page of 50 reservations with their guest and room from the other two services"""
+    await cluster.graphql("reservation_service", RESERVATIONS_PAGE, {"first": 50})
+
+CREATE_RESERVATION = """
+mutation Book($data: ReservationInput!) {
+  createReservation(reservationData: $data) {
+    id
+    status
+    guest { fullName }
+    room { roomNumber status }
+  }
+}
+"""
+
+async def create_reservation(cluster: Cluster, dataset: Dataset, index: int):
+    """A new booking per request, each for a free room and stay"""
+    data = {**stay(dataset.room_ids, index, BURST_STAYS_START), "guestId": dataset.guest_ids[index % len(dataset.guest_ids)]}
+    await cluster.graphql("reservation_service", CREATE_RESERVATION, {"data": data})
+
+DASHBOARD_QUERIES = [
+    ("room_service", "{ roomStatistics { totalRooms availableRooms reservedRooms occupiedRooms maintenanceRooms } }"),
+    ("reservation_service", "{ reservationStatistics { totalReservations activeReservations upcomingReservations completedReservations cancelledReservations } }"),
+    ("billing_service", "{ billingStatistics { totalBills pendingPayments paidBills totalRevenue } }"),
+    ("billing_service", "{ monthlyRevenue { month revenue } }"),
+]
+
+async def dashboard(cluster: Cluster, dataset: Dataset, index: int):
+    """The dashboard's statistics queries, sent together as the frontend does"""
+    await asyncio.gather(*[cluster.graphql(service, query) for service, query in DASHBOARD_QUERIES])
+
+ROOMS_WITH_REVIEWS = """
+query RoomsPage($first: Int) {
+  roomsConnection(first: $first) {
+    edges { node { id roomNumber status reviews { overallRating content } } }
+  }
+}
+"""
+
+async def rooms_with_reviews(cluster: Cluster, dataset: Dataset, index: int):
+    """A page of 20 rooms with their reviews from the review service"""
+    await cluster.graphql("room_service", ROOMS_WITH_REVIEWS, {"first": 20})
+
+GUESTS_WITH_LOYALTY = """
+query GuestsPage($first: Int) {
+  guestsConnection(first: $first) {
+    edges { node { id fullName loyaltyInfo { tier loyaltyPoints } } }
+  }
+}
+"""
+
+async def guests_with_loyalty(cluster: Cluster, dataset: Dataset, index: int):
+    """A page of 20 guests with their loyalty tier from the loyalty service"""
+    await cluster.graphql("guest_service", GUESTS_WITH_LOYALTY, {"first": 20})
+
+Scenario = Callable[[Cluster, Dataset, int], Awaitable[None]]
+
+# Run in this order by default; create_reservation last, as it adds to what the others read
+SCENARIOS: Dict[str, Scenario] = {
+    "reservations_list": reservations_list,
+    "dashboard": dashboard,
+    "rooms_with_reviews": rooms_with_reviews,
+    "guests_with_loyalty": guests_with_loyalty,
+    "create_reservation": create_reservation,
+}
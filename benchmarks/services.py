@@ -0,0 +1,142 @@
+import asyncio
+import importlib
+import os
+import socket
+import sys
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import httpx
+import uvicorn
+
+from fakes import loyalty_service, review_service
+
+# The four services and the two fake upstreams, served by uvicorn in this process.
+#
+# Every service is a package named ``app`` in its own directory, as in its container, so the
+# packages can't be imported side by side. Each one is imported and started (which runs its
+# migrations through alembic's ``from app.db import ...``) while ``app`` in sys.modules is
+# that service's package, then moved out of the way for the next one. The modules keep
+# their references to each other, so the services run unchanged afterwards. They talk to
+# each other and to the fakes over HTTP on localhost, through the URLs their clients read
+# from the environment.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Start order: the reservation service calls room and guest, billing calls reservation
+SERVICES = ["room_service", "guest_service", "reservation_service", "billing_service"]
+
+# Environment variables with the GraphQL URL other services use to reach a service
+URL_VARIABLES = {
+    "room_service": "ROOM_SERVICE_URL",
+    "guest_service": "GUEST_SERVICE_URL",
+    "reservation_service": "RESERVATION_SERVICE_URL",
+    "review_service": "REVIEW_SERVICE_URL",
+    "loyalty_service": "LOYALTY_SERVICE_URL",
+}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _take_app_modules() -> Dict[str, Any]:
+    return {name: sys.modules.pop(name) for name in list(sys.modules) if name == "app" or name.startswith("app.")}
+
+class Server:
+    """A uvicorn server for one ASGI app on a free localhost port"""
+    def __init__(self, name: str, app=None):
+        self.name = name
+        self.app = app
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.server: Optional[uvicorn.Server] = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=self.port, lifespan="on", log_level="warning", access_log=False)
+        self.server = uvicorn.Server(config)
+        # The harness handles Ctrl-C; every server installing its own handlers would override the others
+        self.server.install_signal_handlers = lambda: None
+        self.task = asyncio.create_task(self.server.serve())
+        # started is set once the lifespan startup (migrations, sample data) has finished
+        while not self.server.started:
+            if self.task.done():
+                self.task.result()
+                raise Exception(f"{self.name} did not start")
+            await asyncio.sleep(0.05)
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.should_exit = True
+            await self.task
+
+class Service(Server):
+    """One of the hotel services, imported from its directory with its own database"""
+    def __init__(self, name: str, database_url: str):
+        super().__init__(name)
+        self.root = os.path.join(REPO_ROOT, name)
+        self.database_url = database_url
+        self.modules: Dict[str, Any] = {}
+
+    @contextmanager
+    def active(self):
+        """Make ``app`` resolve to this service's package"""
+        sys.path.insert(0, self.root)
+        sys.modules.update(self.modules)
+        try:
+            yield
+        finally:
+            self.modules = _take_app_modules()
+            sys.path.remove(self.root)
+
+    async def start(self):
+        with self.active():
+            os.environ["DATABASE_URL"] = self.database_url
+            self.app = importlib.import_module("app.main").app
+            await super().start()
+
+class Cluster:
+    """The hotel services backed by fake review and loyalty services"""
+    def __init__(self, database_urls: Dict[str, str], review_latency: float, loyalty_latency: float, rooms: int, reviews_per_room: int):
+        self.fakes = {
+            "review_service": Server("review_service", review_service(review_latency, rooms, reviews_per_room)),
+            "loyalty_service": Server("loyalty_service", loyalty_service(loyalty_latency)),
+        }
+        self.services = {name: Service(name, database_urls[name]) for name in SERVICES}
+        self.client: Optional[httpx.AsyncClient] = None
+
+    async def start(self, connections: int):
+        if _take_app_modules():
+            raise Exception("An app package was imported before the services; run the harness from benchmarks/run.py")
+        # The URLs are read at import time or in the lifespan, so set them all before the first import
+        for name, server in {**self.fakes, **self.services}.items():
+            if name in URL_VARIABLES:
+                os.environ[URL_VARIABLES[name]] = f"{server.url}/graphql"
+        for server in self.fakes.values():
+            await server.start()
+        for service in self.services.values():
+            print(f"Starting {service.name} on {service.url}")
+            await service.start()
+        self.client = httpx.AsyncClient(
+            timeout=60,
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+        )
+
+    async def stop(self):
+        if self.client is not None:
+            await self.client.aclose()
+        for server in [*reversed(list(self.services.values())), *self.fakes.values()]:
+            await server.stop()
+
+    def url(self, service: str, path: str) -> str:
+        return f"{self.services[service].url}{path}"
+
+    async def graphql(self, service: str, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Data of a GraphQL request to ``service``; GraphQL and HTTP errors raise"""
+        response = await self.client.post(self.url(service, "/graphql"), json={"query": query, "variables": variables})
+        response.raise_for_status()
+        result = response.json()
+        if result.get("errors"):
+            raise Exception(f"{service}: {result['errors'][0].get('message')}")
+        return result["data"]
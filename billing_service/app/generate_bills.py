@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from sqlalchemy import Date, Integer, any_, bindparam, func, insert, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from .client import ReservationServiceClient, calculate_days
+from .db import SessionLocal
+from .http_client import SharedHTTPClient
+from .models import Bill
+from .response_cache import ResponseCache
+from .rollup import _add_to_rollup
+
+# End-of-night billing: one bill per checked-out reservation that doesn't have one yet.
+#
+# Reservations are read from the reservation service a page at a time with their room rate
+# (the reservation service batches the room lookups of a page into one call), bills already
+# present are skipped with one query, and the new bills go in with multi-row inserts. The
+# revenue rollup gets one aggregated upsert for the whole run.
+
+# The room field counts as a remote call in the reservation service's query cost, which
+# keeps a page well below its budget at this size
+RESERVATION_PAGE_SIZE = 200
+# Rows per INSERT statement, well below the bind parameter limits of PostgreSQL and SQLite
+INSERT_CHUNK_SIZE = 5000
+# Serializes concurrent runs on PostgreSQL so a reservation can't be billed twice
+GENERATE_BILLS_LOCK_ID = 7301
+
+async def fetch_checked_out_reservations(client: ReservationServiceClient, since: date) -> List[Dict[str, Any]]:
+    reservations = []
+    after = None
+    while True:
+        page = await client.get_checked_out_reservations(since, RESERVATION_PAGE_SIZE, after)
+        reservations.extend(edge["node"] for edge in page["edges"])
+        if not page["pageInfo"]["hasNextPage"]:
+            return reservations
+        after = page["pageInfo"]["endCursor"]
+
+def _reservation_filter(db, reservation_ids):
+    if db.get_bind().dialect.name == "postgresql":
+        # A single array bind parameter keeps the statement text constant for any number of ids
+        return Bill.reservation_id == any_(bindparam("reservation_ids", reservation_ids, type_=ARRAY(Integer)))
+    return Bill.reservation_id.in_(reservation_ids)
+
+def insert_bills(db, reservations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Insert pending bills for reservations without one and update the rollup, in the caller's transaction"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": GENERATE_BILLS_LOCK_ID})
+
+    reservation_ids = [reservation["id"] for reservation in reservations]
+    billed = set()
+    if reservation_ids:
+        billed = {row.reservation_id for row in db.query(Bill.reservation_id).filter(_reservation_filter(db, reservation_ids))}
+
+    rows = []
+    without_rate = 0
+    for reservation in reservations:
+        if reservation["id"] in billed:
+            continue
+        # The room may have been deleted since the stay; such reservations need a manual bill
+        if not reservation.get("room"):
+            without_rate += 1
+            continue
+        check_in_date = datetime.fromisoformat(reservation["checkInDate"]).date()
+        check_out_date = datetime.fromisoformat(reservation["checkOutDate"]).date()
+        total_amount = calculate_days(check_in_date, check_out_date) * Decimal(str(reservation["room"]["pricePerNight"]))
+        rows.append({"reservation_id": reservation["id"], "total_amount": total_amount, "payment_status": "pending"})
+
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.execute(insert(Bill.__table__).values(rows[start:start + INSERT_CHUNK_SIZE]))
+
+    total = Decimal(0)
+    if rows:
+        # Aggregate the new bills by day as rebuild_revenue_rollup does, using their server-generated timestamps
+        bill_day = func.date(Bill.generated_at, type_=Date)
+        new_bills = _reservation_filter(db, [row["reservation_id"] for row in rows])
+        deltas = {}
+        for period, status, amount, count in db.query(
+            bill_day, Bill.payment_status, func.sum(Bill.total_amount), func.count(Bill.id)
+        ).filter(new_bills).group_by(bill_day, Bill.payment_status).all():
+            deltas[(period, status)] = [amount, count]
+            total += Decimal(str(amount))
+        _add_to_rollup(db, deltas)
+
+    return {
+        "reservations": len(reservations),
+        "created": len(rows),
+        "already_billed": len(billed),
+        "without_rate": without_rate,
+        "total_amount": total,
+    }
+
+async def generate_bills(db, client: ReservationServiceClient, since: date) -> Dict[str, Any]:
+    """Bill every reservation checked out on or after ``since`` that has no bill yet, and commit"""
+    reservations = await fetch_checked_out_reservations(client, since)
+    result = insert_bills(db, reservations)
+    db.commit()
+    return result
+
+async def main(since: date):
+    http_client = SharedHTTPClient.from_env()
+    db = SessionLocal()
+    try:
+        result = await generate_bills(db, ReservationServiceClient(http_client), since)
+        # Reaches the service's cached responses with a shared (redis) backend; otherwise they expire with their TTL
+        await ResponseCache.from_env("billing").invalidate(["Bill"])
+        print(
+            f"Generated {result['created']} bills totalling {result['total_amount']} for {result['reservations']} "
+            f"checked-out reservations ({result['already_billed']} already billed, {result['without_rate']} without a room rate)"
+        )
+    finally:
+        db.close()
+        await http_client.aclose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate bills for checked-out reservations")
+    parser.add_argument("--since", type=date.fromisoformat, default=date.today() - timedelta(days=1),
+                        help="first check-out date to bill (YYYY-MM-DD, default yesterday)")
+    args = parser.parse_args()
+    asyncio.run(main(args.since))
@@ -1,40 +1,35 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import time
-from .db import engine, Base, get_db, wait_for_db
-from .models import Bill
-from .schema import graphql_router
+from contextlib import asynccontextmanager
+from .db import engine, Base, get_db, wait_for_db, run_migrations
+from .models import Bill, RevenueRollup
+from .rollup import rebuild_revenue_rollup
+from .schema import graphql_router, response_cache
+from .client import ReservationServiceClient
+from .http_client import SharedHTTPClient
+from .persisted_queries import query_cache
+from .query_cost import cost_throttle
+from .change_feed import start_change_feeds, stop_change_feeds
+from .export import export_router
 
-# Create FastAPI app
-app = FastAPI(title="Billing Service")
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+async def invalidate_changed(events):
+    """Drop cached responses containing rooms or guests changed in their own services"""
+    await response_cache.invalidate(event["entity"] for event in events)
 
-# Include GraphQL router
-app.include_router(graphql_router, prefix="/graphql")
+# Lifespan context manager
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: one pooled keep-alive HTTP client shared by every request
+    app.state.http_client = SharedHTTPClient.from_env()
+    app.state.reservation_service_client = ReservationServiceClient(app.state.http_client)
 
-# Health check endpoint
-@app.get("/health")
-def health_check():
-    return {"status": "healthy", "service": "billing_service"}
-
-# Startup event to initialize database and add sample data
-@app.on_event("startup")
-async def startup_event():
     # Wait for database to be ready
     print("Waiting for database to be ready...")
     if wait_for_db():
-        print("Creating database tables...")
-        # Create database tables
-        Base.metadata.create_all(bind=engine)
+        print("Running database migrations...")
+        run_migrations()
         
         # Add sample data
         print("Adding sample data...")
@@ -58,6 +53,13 @@ async def startup_event():
                 db.add_all(sample_bills)
                 db.commit()
                 print("Sample data added successfully")
+            
+            # Populate the revenue rollup for bills that predate it
+            if db.query(RevenueRollup).count() == 0 and db.query(Bill).count() > 0:
+                print("Building revenue rollup...")
+                count = rebuild_revenue_rollup(db)
+                db.commit()
+                print(f"Revenue rollup built from {count} bills")
         except Exception as e:
             print(f"Error adding sample data: {e}")
         finally:
@@ -65,5 +67,62 @@ async def startup_event():
     else:
         print("Failed to connect to database. Service may not function correctly.")
 
+    # LISTEN for room and guest changes committed in their services
+    app.state.change_feeds = start_change_feeds(invalidate_changed)
+
+    yield  # Application is running
+
+    # Shutdown: Stop the change feed listeners and close the shared HTTP client
+    await stop_change_feeds(app.state.change_feeds)
+    await app.state.http_client.aclose()
+
+# Create FastAPI app
+app = FastAPI(title="Billing Service", lifespan=lifespan)
+
+# Add CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Include GraphQL router
+app.include_router(graphql_router, prefix="/graphql")
+
+# Streaming CSV/NDJSON exports
+app.include_router(export_router)
+
+# Health check endpoint
+@app.get("/health")
+def health_check():
+    return {"status": "healthy", "service": "billing_service"}
+
+# Connection pool utilization of the shared downstream HTTP client
+@app.get("/metrics/http-client")
+def http_client_metrics(request: Request):
+    return request.app.state.http_client.metrics()
+
+# Persisted query and parsed-document cache counters
+@app.get("/metrics/query-cache")
+def query_cache_metrics():
+    return query_cache.stats()
+
+# Query cost throttle (QUERY_COST_RATE) state and counters
+@app.get("/metrics/query-cost")
+def query_cost_metrics():
+    return cost_throttle.stats()
+
+# Response cache hit ratio and memory use
+@app.get("/metrics/response-cache")
+async def response_cache_metrics():
+    return await response_cache.stats()
+
+# Room and guest change feed listeners
+@app.get("/metrics/change-feed")
+def change_feed_metrics(request: Request):
+    return [listener.stats() for listener in request.app.state.change_feeds]
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
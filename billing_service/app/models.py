@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, TIMESTAMP
+from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, TIMESTAMP, Date, Index, text
 from sqlalchemy.sql import func
 from typing import Optional
 from sqlmodel import Field, SQLModel
@@ -16,3 +16,27 @@ class Bill(Base):
     total_amount = Column(Numeric(10, 2), nullable=False)
     payment_status = Column(String, nullable=False)  # pending, paid, cancelled
     generated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+    # Created by the Alembic migrations in migrations/versions; keep the two in step
+    __table_args__ = (
+        # billsByReservation
+        Index("ix_bills_reservation_id", "reservation_id"),
+        # billsByStatus and billsConnection(status) page by id within a status
+        Index("ix_bills_payment_status_id", "payment_status", "id"),
+        # Pending bills are the working set of the billing desk; a partial index stays small
+        Index(
+            "ix_bills_pending_id",
+            "id",
+            postgresql_where=text("payment_status = 'pending'"),
+            sqlite_where=text("payment_status = 'pending'")
+        ),
+    )
+
+class RevenueRollup(Base):
+    """Daily revenue totals per payment status, kept in step with the bills table"""
+    __tablename__ = "revenue_rollup"
+
+    period = Column(Date, primary_key=True)  # Day the bills were generated
+    payment_status = Column(String, primary_key=True)
+    amount_sum = Column(Numeric(14, 2), nullable=False, default=0)
+    bill_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+
+from graphql import DocumentNode, GraphQLError
+from strawberry.extensions import SchemaExtension
+from strawberry.fastapi import GraphQLRouter
+from strawberry.http.exceptions import HTTPException
+from strawberry.types import ExecutionResult
+
+# Automatic persisted queries (the Apollo APQ protocol) and a parsed-document cache.
+#
+# A client sends {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": ...}}} without
+# the query text. If the hash is unknown the response carries a PERSISTED_QUERY_NOT_FOUND error
+# and the client repeats the request with the query text, which registers it. Every executed
+# query, persisted or not, keeps its parsed document and validation result in the same LRU,
+# so a repeated query is neither parsed nor validated again.
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1000))
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+class CachedQuery:
+    __slots__ = ("query", "document", "errors")
+
+    def __init__(self, query: str):
+        self.query = query
+        self.document: Optional[DocumentNode] = None
+        # None until the document has been validated once
+        self.errors: Optional[List[GraphQLError]] = None
+
+class QueryCache:
+    """LRU of query texts by sha256 hash, with their parsed document and validation errors.
+
+    The service serves a single schema, so validation results are valid for every request.
+    """
+    def __init__(self, max_size: int = QUERY_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries: "OrderedDict[str, CachedQuery]" = OrderedDict()
+        self.persisted_hits = 0
+        self.persisted_misses = 0
+        self.registrations = 0
+        self.document_hits = 0
+        self.document_misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CachedQuery]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def add(self, key: str, query: str) -> CachedQuery:
+        entry = self.get(key)
+        if entry is None:
+            entry = self.entries[key] = CachedQuery(query)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Query text of a persisted query hash, or None if it isn't (or no longer) known"""
+        entry = self.get(key)
+        if entry is None:
+            self.persisted_misses += 1
+            return None
+        self.persisted_hits += 1
+        return entry.query
+
+    def register(self, key: str, query: str):
+        if self.get(key) is None:
+            self.registrations += 1
+            self.add(key, query)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "persisted_hits": self.persisted_hits,
+            "persisted_misses": self.persisted_misses,
+            "registrations": self.registrations,
+            "document_hits": self.document_hits,
+            "document_misses": self.document_misses,
+            "evictions": self.evictions,
+        }
+
+query_cache = QueryCache()
+
+class CachedDocuments(SchemaExtension):
+    """Reuse the parsed document and validation result of queries already in query_cache"""
+    entry: Optional[CachedQuery] = None
+
+    def on_parse(self) -> Iterator[None]:
+        context = self.execution_context
+        key = query_hash(context.query)
+        self.entry = query_cache.get(key)
+        if self.entry is not None and self.entry.document is not None:
+            query_cache.document_hits += 1
+            context.graphql_document = self.entry.document
+            yield
+            return
+        yield
+        # Only documents that parsed are cached; syntax errors are reported again next time
+        if context.graphql_document is not None:
+            query_cache.document_misses += 1
+            self.entry = query_cache.add(key, context.query)
+            self.entry.document = context.graphql_document
+
+    def on_validate(self) -> Iterator[None]:
+        context = self.execution_context
+        entry = self.entry
+        if entry is None or entry.errors is None:
+            yield
+            if entry is not None:
+                entry.errors = list(context.errors or [])
+            return
+        # Strawberry skips validation when errors are already set; [] means the document is valid
+        context.errors = list(entry.errors)
+        yield
+
+class PersistedQueryError(Exception):
+    def __init__(self, message: str, code: str):
+        super().__init__(message)
+        self.code = code
+
+    def as_graphql_error(self) -> GraphQLError:
+        return GraphQLError(str(self), extensions={"code": self.code})
+
+def resolve_persisted_query(query: Optional[str], extensions: Any) -> Optional[str]:
+    """Query text for a request, registering or looking up its persisted query hash"""
+    persisted = extensions.get("persistedQuery") if isinstance(extensions, dict) else None
+    if not persisted:
+        return query
+    if persisted.get("version") != 1:
+        raise PersistedQueryError("Unsupported persisted query version", "PERSISTED_QUERY_NOT_SUPPORTED")
+    key = persisted.get("sha256Hash")
+    if query is None:
+        query = query_cache.lookup(key)
+        if query is None:
+            raise PersistedQueryError("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND")
+        return query
+    if query_hash(query) != key:
+        raise PersistedQueryError("Provided sha256Hash does not match the query", "PERSISTED_QUERY_HASH_MISMATCH")
+    query_cache.register(key, query)
+    return query
+
+class PersistedQueryRouter(GraphQLRouter):
+    """GraphQLRouter that accepts automatic persisted queries over POST and GET"""
+    def should_render_graphiql(self, request) -> bool:
+        # A GET with only a query hash has no query parameter but is not a browser visit
+        return "extensions" not in request.query_params and super().should_render_graphiql(request)
+
+    async def parse_http_body(self, request):
+        request_data = await super().parse_http_body(request)
+        if request.method == "GET":
+            extensions = request.query_params.get("extensions")
+            try:
+                extensions = json.loads(extensions) if extensions else None
+            except ValueError as e:
+                # Answered like a request body that isn't JSON
+                raise HTTPException(400, "Unable to parse the extensions query parameter as JSON") from e
+        elif "application/json" in (request.content_type or ""):
+            # Starlette caches the body, so this doesn't read the request again
+            extensions = self.parse_json(await request.get_body()).get("extensions")
+        else:
+            extensions = None
+        request_data.query = resolve_persisted_query(request_data.query, extensions)
+        return request_data
+
+    async def execute_operation(self, request, context, root_value):
+        try:
+            return await super().execute_operation(request, context, root_value)
+        except PersistedQueryError as error:
+            # Reported as a GraphQL error so APQ clients know to resend the query text
+            return ExecutionResult(data=None, errors=[error.as_graphql_error()])
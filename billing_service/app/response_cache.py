@@ -0,0 +1,307 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from graphql import FieldNode, FragmentDefinitionNode, FragmentSpreadNode, InlineFragmentNode, get_named_type, get_operation_ast
+from graphql.execution import ExecutionResult as GraphQLExecutionResult
+from graphql.utilities import strip_ignored_characters
+from strawberry.extensions import SchemaExtension
+
+# Read-through cache of query responses with entity-tag invalidation.
+#
+# Root query fields opt in with metadata=cached("Room"); nested fields add the tags of the
+# entities they return. A response is stored with the version of each of its tags, and
+# mutations declared with metadata=invalidates("Room") bump those versions once they have
+# run, so every response that contains rooms misses on its next read. Entries also expire
+# after RESPONSE_CACHE_TTL seconds, which bounds staleness of data owned by other services.
+#
+# RESPONSE_CACHE_BACKEND=redis keeps entries and tag versions in a Redis-compatible store
+# (RESPONSE_CACHE_REDIS_URL). Tag versions are shared there, so services using the same
+# store also invalidate each other's responses.
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+RESPONSE_CACHE_ENABLED = _env_flag("RESPONSE_CACHE_ENABLED", "true")
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 30))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+def cached(*tags: str) -> Dict[str, Any]:
+    """Field metadata: the field's data depends on these entity tags"""
+    return {"cache_tags": tags}
+
+def invalidates(*tags: str) -> Dict[str, Any]:
+    """Mutation metadata: running the mutation changes these entity tags"""
+    return {"invalidates": tags}
+
+class MemoryBackend:
+    """In-process LRU bounded by the total size of the stored responses"""
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+        self.versions: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        if key in self.entries:
+            self._remove(key)
+        if len(value) > self.max_bytes:
+            return
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.bytes += len(value)
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        _, value = self.entries.pop(key)
+        self.bytes -= len(value)
+
+    async def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        return {tag: self.versions.get(tag, 0) for tag in tags}
+
+    async def bump(self, tags: Iterable[str]):
+        for tag in tags:
+            self.versions[tag] = self.versions.get(tag, 0) + 1
+
+    async def memory(self) -> Dict[str, Any]:
+        return {"entries": len(self.entries), "bytes": self.bytes, "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+class RedisBackend:
+    """Entries and tag versions in a Redis-compatible store"""
+    def __init__(self, url: str, namespace: str):
+        import redis.asyncio as redis
+        self.redis = redis.from_url(url)
+        self.namespace = namespace
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.redis.get(f"response:{self.namespace}:{key}")
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self.redis.set(f"response:{self.namespace}:{key}", value, ex=ttl)
+
+    async def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        tags = list(tags)
+        if not tags:
+            return {}
+        values = await self.redis.mget([f"tag:{tag}" for tag in tags])
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    async def bump(self, tags: Iterable[str]):
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            for tag in tags:
+                pipeline.incr(f"tag:{tag}")
+            await pipeline.execute()
+
+    async def memory(self) -> Dict[str, Any]:
+        info = await self.redis.info("memory")
+        return {"keys": await self.redis.dbsize(), "used_memory": info.get("used_memory")}
+
+@lru_cache(maxsize=1024)
+def normalize_query(query: str) -> str:
+    """Query text without insignificant whitespace, commas and comments"""
+    return strip_ignored_characters(query)
+
+def operation_tags(schema, document, operation_name: Optional[str]) -> Optional[Set[str]]:
+    """Entity tags a query's response depends on, or None if a root field doesn't opt in to caching"""
+    operation = get_operation_ast(document, operation_name)
+    if operation is None or operation.operation.value != "query":
+        return None
+    fragments = {definition.name.value: definition for definition in document.definitions if isinstance(definition, FragmentDefinitionNode)}
+    tags: Set[str] = set()
+
+    def fields(selection_set, parent_type):
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                yield selection, parent_type
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = schema.get_type(selection.type_condition.name.value) if selection.type_condition else parent_type
+                yield from fields(selection.selection_set, fragment_type)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = fragments[selection.name.value]
+                yield from fields(fragment.selection_set, schema.get_type(fragment.type_condition.name.value))
+
+    def collect(node: FieldNode, parent_type, root: bool) -> bool:
+        # Introspection is answered from the schema and never goes stale
+        if node.name.value.startswith("__"):
+            return True
+        field_def = parent_type.fields.get(node.name.value)
+        strawberry_field = field_def.extensions.get("strawberry-definition") if field_def else None
+        field_tags = strawberry_field.metadata.get("cache_tags") if strawberry_field else None
+        if root and not field_tags:
+            return False
+        tags.update(field_tags or ())
+        if node.selection_set is not None:
+            child_type = get_named_type(field_def.type)
+            for child, child_parent in fields(node.selection_set, child_type):
+                collect(child, child_parent, False)
+        return True
+
+    root_type = schema.get_root_type(operation.operation)
+    for node, parent_type in fields(operation.selection_set, root_type):
+        if not collect(node, parent_type, True):
+            return None
+    return tags
+
+class ResponseCache:
+    def __init__(self, namespace: str, backend=None, ttl: int = RESPONSE_CACHE_TTL):
+        self.namespace = namespace
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.bypassed = 0
+        self.errors = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls, namespace: str) -> "ResponseCache":
+        backend = None
+        if RESPONSE_CACHE_BACKEND == "redis":
+            try:
+                backend = RedisBackend(RESPONSE_CACHE_REDIS_URL, namespace)
+            except ImportError:
+                print("RESPONSE_CACHE_BACKEND=redis but the redis package is not installed, using the in-process cache")
+        return cls(namespace, backend)
+
+    def key(self, query: str, operation_name: Optional[str], variables: Optional[Dict[str, Any]]) -> str:
+        raw = json.dumps([self.namespace, normalize_query(query), operation_name, variables or {}], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def lookup(self, key: str, versions: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """Cached data for key, unless missing, expired or stored before one of its tags was bumped"""
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            print(f"Response cache read failed: {e}")
+            return None
+        if value is None:
+            self.misses += 1
+            return None
+        entry = json.loads(value)
+        if entry["versions"] != versions:
+            self.stale += 1
+            return None
+        self.hits += 1
+        return entry["data"]
+
+    async def store(self, key: str, versions: Dict[str, int], data: Dict[str, Any]):
+        try:
+            await self.backend.set(key, json.dumps({"versions": versions, "data": data}, default=str).encode("utf-8"), self.ttl)
+        except Exception as e:
+            self.errors += 1
+            print(f"Response cache write failed: {e}")
+
+    async def tag_versions(self, tags: Set[str]) -> Optional[Dict[str, int]]:
+        try:
+            return await self.backend.tag_versions(sorted(tags))
+        except Exception as e:
+            self.errors += 1
+            print(f"Response cache read failed: {e}")
+            return None
+
+    async def invalidate(self, tags: Iterable[str]):
+        tags = sorted(set(tags))
+        if not tags:
+            return
+        self.invalidations += 1
+        try:
+            await self.backend.bump(tags)
+        except Exception as e:
+            # Entries still expire after the TTL
+            self.errors += 1
+            print(f"Response cache invalidation of {tags} failed: {e}")
+
+    async def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.stale
+        try:
+            memory = await self.backend.memory()
+        except Exception as e:
+            memory = {"error": str(e)}
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "bypassed": self.bypassed,
+            "errors": self.errors,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "memory": memory,
+        }
+
+    def extension(self):
+        """Schema extension class serving and filling this cache"""
+        return type("ResponseCacheExtension", (ResponseCacheExtension,), {"cache": self})
+
+class ResponseCacheExtension(SchemaExtension):
+    cache: ResponseCache
+    status: Optional[str] = None
+
+    async def on_execute(self):
+        context = self.execution_context
+        # Another extension (e.g. the cost limit) already produced the result
+        if not RESPONSE_CACHE_ENABLED or context.result is not None:
+            yield
+            return
+        if context.operation_type.value == "mutation":
+            yield
+            await self.cache.invalidate(self._mutation_tags())
+            return
+
+        tags = operation_tags(context.schema._schema, context.graphql_document, context.operation_name)
+        versions = await self.cache.tag_versions(tags) if tags is not None else None
+        if versions is None:
+            self.cache.bypassed += 1
+            self.status = "bypass"
+            yield
+            return
+        key = self.cache.key(context.query, context.operation_name, context.variables)
+        data = await self.cache.lookup(key, versions)
+        if data is not None:
+            self.status = "hit"
+            # Strawberry skips execution when a result is already set
+            context.result = GraphQLExecutionResult(data=data, errors=None)
+            yield
+            return
+        self.status = "miss"
+        yield
+        # Stored with the versions read before executing, so a mutation that committed
+        # meanwhile makes the entry stale instead of hiding its change
+        if context.result is not None and not context.result.errors:
+            await self.cache.store(key, versions, context.result.data)
+
+    def _mutation_tags(self) -> List[str]:
+        context = self.execution_context
+        operation = get_operation_ast(context.graphql_document, context.operation_name)
+        mutation_type = context.schema._schema.mutation_type
+        tags = []
+        for selection in operation.selection_set.selections:
+            field_def = mutation_type.fields.get(selection.name.value) if isinstance(selection, FieldNode) else None
+            strawberry_field = field_def.extensions.get("strawberry-definition") if field_def else None
+            if strawberry_field is not None:
+                tags.extend(strawberry_field.metadata.get("invalidates", ()))
+        return tags
+
+    def get_results(self) -> Dict[str, Any]:
+        return {"responseCache": self.status} if self.status else {}
@@ -0,0 +1,95 @@
+import argparse
+from collections import defaultdict
+from decimal import Decimal
+from sqlalchemy import func, Date
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .db import SessionLocal
+from .models import Bill, RevenueRollup
+
+# Number of bills aggregated per query when rebuilding the rollup
+REBUILD_CHUNK_SIZE = 10000
+
+def rollup_entry(bill: Bill):
+    """The (day, payment_status, amount) contribution of a bill to the revenue rollup"""
+    return (bill.generated_at.date(), bill.payment_status, Decimal(str(bill.total_amount)))
+
+def _add_to_rollup(db, deltas):
+    """Add {(day, status): [amount, count]} deltas to the rollup with a single upsert"""
+    rows = [
+        {"period": period, "payment_status": status, "amount_sum": amount, "bill_count": count}
+        for (period, status), (amount, count) in deltas.items()
+        if amount != 0 or count != 0
+    ]
+    if not rows:
+        return
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(RevenueRollup).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RevenueRollup.period, RevenueRollup.payment_status],
+        set_={
+            "amount_sum": RevenueRollup.amount_sum + stmt.excluded.amount_sum,
+            "bill_count": RevenueRollup.bill_count + stmt.excluded.bill_count
+        }
+    )
+    db.execute(stmt)
+
+def update_rollup(db, old=None, new=None):
+    """Move a bill's contribution from ``old`` to ``new`` (rollup_entry tuples) in the caller's transaction.
+
+    Pass only ``new`` for a created bill and only ``old`` for a deleted one.
+    """
+    deltas = defaultdict(lambda: [Decimal(0), 0])
+    if old is not None:
+        period, status, amount = old
+        deltas[(period, status)][0] -= amount
+        deltas[(period, status)][1] -= 1
+    if new is not None:
+        period, status, amount = new
+        deltas[(period, status)][0] += amount
+        deltas[(period, status)][1] += 1
+    _add_to_rollup(db, deltas)
+
+def rebuild_revenue_rollup(db, chunk_size: int = REBUILD_CHUNK_SIZE) -> int:
+    """Recompute the rollup from the bills table in primary key chunks.
+
+    Runs in the caller's transaction, so readers keep seeing the old totals until it commits.
+    Returns the number of bills processed.
+    """
+    db.query(RevenueRollup).delete(synchronize_session=False)
+    bill_day = func.date(Bill.generated_at, type_=Date)
+    processed = 0
+    last_id = 0
+    while True:
+        # Upper id of this chunk, or None when fewer than chunk_size bills remain
+        upper_id = db.query(Bill.id).filter(Bill.id > last_id).order_by(Bill.id).offset(chunk_size - 1).limit(1).scalar()
+        chunk = db.query(
+            bill_day,
+            Bill.payment_status,
+            func.sum(Bill.total_amount),
+            func.count(Bill.id)
+        ).filter(Bill.id > last_id)
+        if upper_id is not None:
+            chunk = chunk.filter(Bill.id <= upper_id)
+        deltas = {}
+        for period, status, amount, count in chunk.group_by(bill_day, Bill.payment_status).all():
+            deltas[(period, status)] = [amount, count]
+            processed += count
+        _add_to_rollup(db, deltas)
+        if upper_id is None:
+            return processed
+        last_id = upper_id
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the billing revenue rollup table")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--chunk-size", type=int, default=REBUILD_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        count = rebuild_revenue_rollup(db, chunk_size=args.chunk_size)
+        db.commit()
+        print(f"Revenue rollup rebuilt from {count} bills")
+    finally:
+        db.close()
@@ -1,20 +1,23 @@
 import strawberry
-from typing import List, Optional
+from typing import List, Optional, Annotated
+from sqlalchemy import func, extract
 from sqlalchemy.orm import Session
 from datetime import datetime, date
-from .models import Bill
-from .db import get_db
-from fastapi import Depends
-from strawberry.fastapi import GraphQLRouter
-from .client import ReservationServiceClient, calculate_days
+from .models import Bill, RevenueRollup
+from .db import get_db, get_request_db, run_db, fetch_by_ids
+from .pagination import Connection, paginate
+from .rollup import rollup_entry, update_rollup
+from .generate_bills import fetch_checked_out_reservations, insert_bills
+from fastapi import Depends, Request
+from .client import calculate_days
+from .persisted_queries import CachedDocuments, PersistedQueryRouter
+from .query_cost import QueryCost, REMOTE, all_rows
+from .response_cache import ResponseCache, cached, invalidates
 
 # Dependency to get database session for strawberry
-def get_context():
-    db = next(get_db())
-    try:
-        yield {"db": db}
-    finally:
-        db.close()
+async def get_context(request: Request):
+    async for db in get_request_db():
+        yield {"db": db, "reservation_service_client": request.app.state.reservation_service_client}
 
 # Input types for mutations
 @strawberry.input
@@ -62,6 +65,39 @@ class BillType:
     generated_at: datetime
     reservation: Optional[ReservationType] = None
 
+# Dashboard aggregate types
+@strawberry.type
+class BillingStatisticsType:
+    total_bills: int
+    pending_payments: int
+    paid_bills: int
+    total_revenue: float
+
+@strawberry.type
+class RevenuePeriodType:
+    period: str  # YYYY-MM-DD, YYYY-MM or YYYY depending on granularity
+    payment_status: str
+    amount: float
+    bill_count: int
+
+@strawberry.type
+class MonthlyRevenueType:
+    period: str  # YYYY-MM
+    month: str  # Short month name used as chart label
+    revenue: float
+
+# Result of a batch bill generation run
+@strawberry.type
+class BillGenerationType:
+    reservations: int  # Checked-out reservations found
+    created: int
+    already_billed: int
+    without_rate: int  # Skipped because their room (and its rate) no longer exists
+    total_amount: float
+
+# Only paid bills count towards revenue
+REVENUE_STATUS = "paid"
+
 # Convert database model to GraphQL type
 def bill_to_graphql(bill: Bill) -> BillType:
     return BillType(
@@ -75,77 +111,195 @@ def bill_to_graphql(bill: Bill) -> BillType:
 # Queries
 @strawberry.type
 class Query:
-    @strawberry.field
+    # Embeds the reservation with its guest and room
+    @strawberry.field(metadata={**REMOTE, **cached("Bill", "Reservation", "Guest", "Room")})
     async def bill(self, info, id: int) -> Optional[BillType]:
-        db = info.context["db"]
-        bill = db.query(Bill).filter(Bill.id == id).first()
-        if not bill:
+        def load(db):
+            bill = db.query(Bill).filter(Bill.id == id).first()
+            if bill:
+                return bill_to_graphql(bill)
+            return None
+        result = await run_db(info.context["db"], load)
+        if not result:
             return None
-        
-        result = bill_to_graphql(bill)
         
         # Fetch related reservation data
-        reservation_client = ReservationServiceClient()
-        try:
-            reservation_data = await reservation_client.get_reservation(bill.reservation_id)
-            if reservation_data:
-                guest = None
-                room = None
-                
-                if "guest" in reservation_data and reservation_data["guest"]:
-                    guest = GuestType(
-                        id=reservation_data["guest"]["id"],
-                        full_name=reservation_data["guest"]["fullName"],
-                        email=reservation_data["guest"]["email"]
-                    )
-                
-                if "room" in reservation_data and reservation_data["room"]:
-                    room = RoomType(
-                        id=reservation_data["room"]["id"],
-                        room_number=reservation_data["room"]["roomNumber"],
-                        room_type=reservation_data["room"]["roomType"],
-                        price_per_night=reservation_data["room"]["pricePerNight"]
-                    )
-                
-                result.reservation = ReservationType(
-                    id=reservation_data["id"],
-                    guest_id=reservation_data["guestId"],
-                    room_id=reservation_data["roomId"],
-                    check_in_date=datetime.fromisoformat(reservation_data["checkInDate"]).date(),
-                    check_out_date=datetime.fromisoformat(reservation_data["checkOutDate"]).date(),
-                    status=reservation_data["status"],
-                    guest=guest,
-                    room=room
+        reservation_client = info.context["reservation_service_client"]
+        reservation_data = await reservation_client.get_reservation(result.reservation_id)
+        if reservation_data:
+            guest = None
+            room = None
+            
+            if "guest" in reservation_data and reservation_data["guest"]:
+                guest = GuestType(
+                    id=reservation_data["guest"]["id"],
+                    full_name=reservation_data["guest"]["fullName"],
+                    email=reservation_data["guest"]["email"]
+                )
+            
+            if "room" in reservation_data and reservation_data["room"]:
+                room = RoomType(
+                    id=reservation_data["room"]["id"],
+                    room_number=reservation_data["room"]["roomNumber"],
+                    room_type=reservation_data["room"]["roomType"],
+                    price_per_night=reservation_data["room"]["pricePerNight"]
                 )
-        finally:
-            await reservation_client.close()
+            
+            result.reservation = ReservationType(
+                id=reservation_data["id"],
+                guest_id=reservation_data["guestId"],
+                room_id=reservation_data["roomId"],
+                check_in_date=datetime.fromisoformat(reservation_data["checkInDate"]).date(),
+                check_out_date=datetime.fromisoformat(reservation_data["checkOutDate"]).date(),
+                status=reservation_data["status"],
+                guest=guest,
+                room=room
+            )
             
         return result
 
-    @strawberry.field
-    def bills(self, info) -> List[BillType]:
-        db = info.context["db"]
-        bills = db.query(Bill).all()
-        return [bill_to_graphql(bill) for bill in bills]
+    @strawberry.field(metadata={**cached("Bill"), **all_rows(Bill)})
+    async def bills(self, info) -> List[BillType]:
+        def load(db):
+            bills = db.query(Bill).all()
+            return [bill_to_graphql(bill) for bill in bills]
+        return await run_db(info.context["db"], load)
+
+    @strawberry.field(metadata=cached("Bill"))
+    async def bills_connection(self, info, first: Optional[int] = None, after: Optional[str] = None, status: Optional[str] = None) -> Connection[BillType]:
+        """Page through bills by id; pass pageInfo.endCursor as ``after`` to get the next page"""
+        def build_query(db):
+            query = db.query(Bill)
+            if status is not None:
+                query = query.filter(Bill.payment_status == status)
+            return query
+        return await paginate(info.context["db"], build_query, Bill, bill_to_graphql, first, after)
+
+    @strawberry.field(metadata=cached("Bill"))
+    async def billing_statistics(self, info) -> BillingStatisticsType:
+        """Bill counts and revenue for the dashboard, read from the revenue rollup"""
+        def load(db):
+            return db.query(
+                RevenueRollup.payment_status,
+                func.sum(RevenueRollup.bill_count),
+                func.coalesce(func.sum(RevenueRollup.amount_sum), 0)
+            ).group_by(RevenueRollup.payment_status).all()
+        rows = await run_db(info.context["db"], load)
+        counts = {status: int(count) for status, count, _ in rows}
+        amounts = {status: amount for status, _, amount in rows}
+        return BillingStatisticsType(
+            total_bills=sum(counts.values()),
+            pending_payments=counts.get("pending", 0),
+            paid_bills=counts.get(REVENUE_STATUS, 0),
+            total_revenue=float(amounts.get(REVENUE_STATUS, 0))
+        )
+
+    @strawberry.field(metadata=cached("Bill"))
+    async def monthly_revenue(self, info, months: int = 6) -> List[MonthlyRevenueType]:
+        """Paid revenue for the last ``months`` calendar months (oldest first), read from the revenue rollup"""
+        months = max(1, min(months, 60))
+        today = date.today()
+        # (year, month) pairs for the requested window, ending with the current month
+        periods = []
+        year, month = today.year, today.month
+        for _ in range(months):
+            periods.append((year, month))
+            year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+        periods.reverse()
+        start = date(periods[0][0], periods[0][1], 1)
+
+        rollup_year = extract("year", RevenueRollup.period)
+        rollup_month = extract("month", RevenueRollup.period)
+        def load(db):
+            return db.query(rollup_year, rollup_month, func.sum(RevenueRollup.amount_sum)).filter(
+                RevenueRollup.payment_status == REVENUE_STATUS,
+                RevenueRollup.period >= start
+            ).group_by(rollup_year, rollup_month).all()
+        rows = await run_db(info.context["db"], load)
+        revenue = {(int(row_year), int(row_month)): float(amount or 0) for row_year, row_month, amount in rows}
+
+        return [
+            MonthlyRevenueType(
+                period=f"{period_year:04d}-{period_month:02d}",
+                month=date(period_year, period_month, 1).strftime("%b"),
+                revenue=revenue.get((period_year, period_month), 0.0)
+            )
+            for period_year, period_month in periods
+        ]
+
+    @strawberry.field(metadata=cached("Bill"))
+    async def revenue_by_period(
+        self,
+        info,
+        granularity: str = "month",
+        from_date: Annotated[Optional[date], strawberry.argument(name="from")] = None,
+        to_date: Annotated[Optional[date], strawberry.argument(name="to")] = None,
+        payment_status: Optional[str] = None
+    ) -> List[RevenuePeriodType]:
+        """Revenue per day, month or year and payment status between ``from`` and ``to`` (inclusive)"""
+        if granularity == "day":
+            group_columns = [RevenueRollup.period]
+        elif granularity == "month":
+            group_columns = [extract("year", RevenueRollup.period), extract("month", RevenueRollup.period)]
+        elif granularity == "year":
+            group_columns = [extract("year", RevenueRollup.period)]
+        else:
+            raise Exception(f"Unsupported granularity '{granularity}', expected day, month or year")
+
+        def load(db):
+            query = db.query(
+                *group_columns,
+                RevenueRollup.payment_status,
+                func.sum(RevenueRollup.amount_sum),
+                func.sum(RevenueRollup.bill_count)
+            ).filter(RevenueRollup.bill_count > 0)
+            if from_date is not None:
+                query = query.filter(RevenueRollup.period >= from_date)
+            if to_date is not None:
+                query = query.filter(RevenueRollup.period <= to_date)
+            if payment_status is not None:
+                query = query.filter(RevenueRollup.payment_status == payment_status)
+            return query.group_by(*group_columns, RevenueRollup.payment_status).order_by(*group_columns, RevenueRollup.payment_status).all()
+        rows = await run_db(info.context["db"], load)
+
+        result = []
+        for row in rows:
+            *period_parts, status, amount, count = row
+            if granularity == "day":
+                period = period_parts[0].isoformat()
+            elif granularity == "month":
+                period = f"{int(period_parts[0]):04d}-{int(period_parts[1]):02d}"
+            else:
+                period = f"{int(period_parts[0]):04d}"
+            result.append(RevenuePeriodType(period=period, payment_status=status, amount=float(amount or 0), bill_count=int(count)))
+        return result
+
+    @strawberry.field(metadata=cached("Bill"))
+    async def bills_by_ids(self, info, ids: List[int]) -> List[Optional[BillType]]:
+        """Fetch many bills in one query, in the order of ``ids`` (None for unknown ids)"""
+        def load(db):
+            return [bill_to_graphql(bill) if bill else None for bill in fetch_by_ids(db, Bill, ids)]
+        return await run_db(info.context["db"], load)
     
-    @strawberry.field
-    def bills_by_reservation(self, info, reservation_id: int) -> List[BillType]:
-        db = info.context["db"]
-        bills = db.query(Bill).filter(Bill.reservation_id == reservation_id).all()
-        return [bill_to_graphql(bill) for bill in bills]
+    @strawberry.field(metadata=cached("Bill"))
+    async def bills_by_reservation(self, info, reservation_id: int) -> List[BillType]:
+        def load(db):
+            bills = db.query(Bill).filter(Bill.reservation_id == reservation_id).all()
+            return [bill_to_graphql(bill) for bill in bills]
+        return await run_db(info.context["db"], load)
     
-    @strawberry.field
-    def bills_by_status(self, info, status: str) -> List[BillType]:
-        db = info.context["db"]
-        bills = db.query(Bill).filter(Bill.payment_status == status).all()
-        return [bill_to_graphql(bill) for bill in bills]
+    @strawberry.field(metadata={**cached("Bill"), **all_rows(Bill)})
+    async def bills_by_status(self, info, status: str) -> List[BillType]:
+        def load(db):
+            bills = db.query(Bill).filter(Bill.payment_status == status).all()
+            return [bill_to_graphql(bill) for bill in bills]
+        return await run_db(info.context["db"], load)
 
 # Mutations
 @strawberry.type
 class Mutation:
-    @strawberry.mutation
+    @strawberry.mutation(metadata=invalidates("Bill"))
     async def create_bill(self, info, bill_data: BillInput = None, reservation_id: int = None) -> BillType:
-        db = info.context["db"]
         # If bill_data is provided, use it directly
         if bill_data:
             bill = Bill(
@@ -155,66 +309,87 @@ class Mutation:
             )
         # Otherwise, calculate bill based on reservation details
         elif reservation_id:
-            reservation_client = ReservationServiceClient()
-            try:
-                reservation_data = await reservation_client.get_reservation(reservation_id)
-                if not reservation_data:
-                    raise Exception(f"Reservation {reservation_id} not found")
-                
-                # Calculate total amount based on room price and length of stay
-                check_in_date = datetime.fromisoformat(reservation_data["checkInDate"]).date()
-                check_out_date = datetime.fromisoformat(reservation_data["checkOutDate"]).date()
-                days = calculate_days(check_in_date, check_out_date)
-                price_per_night = reservation_data["room"]["pricePerNight"]
-                total_amount = days * price_per_night
-                
-                bill = Bill(
-                    reservation_id=reservation_id,
-                    total_amount=total_amount,
-                    payment_status="pending"
-                )
-            finally:
-                await reservation_client.close()
+            reservation_client = info.context["reservation_service_client"]
+            reservation_data = await reservation_client.get_reservation(reservation_id)
+            if not reservation_data:
+                raise Exception(f"Reservation {reservation_id} not found")
+            
+            # Calculate total amount based on room price and length of stay
+            check_in_date = datetime.fromisoformat(reservation_data["checkInDate"]).date()
+            check_out_date = datetime.fromisoformat(reservation_data["checkOutDate"]).date()
+            days = calculate_days(check_in_date, check_out_date)
+            price_per_night = reservation_data["room"]["pricePerNight"]
+            total_amount = days * price_per_night
+            
+            bill = Bill(
+                reservation_id=reservation_id,
+                total_amount=total_amount,
+                payment_status="pending"
+            )
         else:
             raise Exception("Either bill_data or reservation_id must be provided")
         
-        db.add(bill)
-        db.commit()
-        db.refresh(bill)
-        return bill_to_graphql(bill)
-
-    @strawberry.mutation
-    def update_bill(self, info, id: int, bill_data: BillUpdateInput) -> Optional[BillType]:
-        db = info.context["db"]
-        bill = db.query(Bill).filter(Bill.id == id).first()
-        if not bill:
-            return None
-        
-        if bill_data.total_amount is not None:
-            bill.total_amount = bill_data.total_amount
-        if bill_data.payment_status is not None:
-            bill.payment_status = bill_data.payment_status
+        def save(db):
+            db.add(bill)
+            # Flush to get the server-generated timestamp, then record the bill in the rollup in the same transaction
+            db.flush()
+            db.refresh(bill)
+            update_rollup(db, new=rollup_entry(bill))
+            db.commit()
+            db.refresh(bill)
+            return bill_to_graphql(bill)
+        return await run_db(info.context["db"], save)
+
+    @strawberry.mutation(metadata=invalidates("Bill"))
+    async def generate_bills(self, info, checked_out_since: date) -> BillGenerationType:
+        """Bill every reservation checked out on or after ``checked_out_since`` that has no bill yet"""
+        reservations = await fetch_checked_out_reservations(info.context["reservation_service_client"], checked_out_since)
+        def save(db):
+            result = insert_bills(db, reservations)
+            db.commit()
+            return BillGenerationType(**{**result, "total_amount": float(result["total_amount"])})
+        return await run_db(info.context["db"], save)
+
+    @strawberry.mutation(metadata=invalidates("Bill"))
+    async def update_bill(self, info, id: int, bill_data: BillUpdateInput) -> Optional[BillType]:
+        def update(db):
+            bill = db.query(Bill).filter(Bill.id == id).first()
+            if not bill:
+                return None
             
-        db.commit()
-        db.refresh(bill)
-        return bill_to_graphql(bill)
-
-    @strawberry.mutation
-    def delete_bill(self, info, id: int) -> bool:
-        db = info.context["db"]
-        bill = db.query(Bill).filter(Bill.id == id).first()
-        if not bill:
-            return False
-        
-        db.delete(bill)
-        db.commit()
-        return True
+            old_entry = rollup_entry(bill)
+            if bill_data.total_amount is not None:
+                bill.total_amount = bill_data.total_amount
+            if bill_data.payment_status is not None:
+                bill.payment_status = bill_data.payment_status
+            update_rollup(db, old=old_entry, new=rollup_entry(bill))
+                
+            db.commit()
+            db.refresh(bill)
+            return bill_to_graphql(bill)
+        return await run_db(info.context["db"], update)
+
+    @strawberry.mutation(metadata=invalidates("Bill"))
+    async def delete_bill(self, info, id: int) -> bool:
+        def delete(db):
+            bill = db.query(Bill).filter(Bill.id == id).first()
+            if not bill:
+                return False
+            
+            update_rollup(db, old=rollup_entry(bill))
+            db.delete(bill)
+            db.commit()
+            return True
+        return await run_db(info.context["db"], delete)
+
+# Responses of repeated queries, dropped when a mutation changes bills
+response_cache = ResponseCache.from_env("billing")
 
 # Create GraphQL schema
-schema = strawberry.Schema(query=Query, mutation=Mutation)
+schema = strawberry.Schema(query=Query, mutation=Mutation, extensions=[CachedDocuments, QueryCost, response_cache.extension()])
 
 # Create GraphQL router for FastAPI
-graphql_router = GraphQLRouter(
+graphql_router = PersistedQueryRouter(
     schema,
     context_getter=get_context
 )
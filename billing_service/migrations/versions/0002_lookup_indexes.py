@@ -0,0 +1,42 @@
+"""Indexes for the reservation and payment status lookups of bills
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+billsByReservation, billsByStatus and billsConnection(status) were sequential
+scans of bills. Pending bills are the working set of the billing desk, so they
+get a small partial index of their own.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+PENDING_CONDITION = "payment_status = 'pending'"
+
+def create_index_concurrently(name, table, columns, **kw):
+    # An interrupted CONCURRENTLY build leaves an INVALID index with this name behind, which
+    # would make every later run of this migration fail; drop it so the build starts over
+    if op.get_context().dialect.name == "postgresql":
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    op.create_index(name, table, columns, postgresql_concurrently=True, **kw)
+
+def upgrade():
+    # CONCURRENTLY keeps the table writable while the indexes build; it can't run in a transaction
+    with op.get_context().autocommit_block():
+        create_index_concurrently("ix_bills_reservation_id", "bills", ["reservation_id"])
+        create_index_concurrently("ix_bills_payment_status_id", "bills", ["payment_status", "id"])
+        create_index_concurrently(
+            "ix_bills_pending_id", "bills", ["id"],
+            postgresql_where=sa.text(PENDING_CONDITION),
+            sqlite_where=sa.text(PENDING_CONDITION)
+        )
+
+def downgrade():
+    op.drop_index("ix_bills_pending_id", table_name="bills")
+    op.drop_index("ix_bills_payment_status_id", table_name="bills")
+    op.drop_index("ix_bills_reservation_id", table_name="bills")
@@ -17,6 +17,8 @@ document.addEventListener('DOMContentLoaded', function() {
     document.getElementById('confirm-delete').addEventListener('click', deleteBill);
     document.getElementById('bill-search').addEventListener('input', filterBills);
     document.getElementById('status-filter').addEventListener('change', filterBills);
+    document.getElementById('load-more-bills').addEventListener('click', () => fetchBills(true));
+    document.getElementById('load-more-reservations').addEventListener('click', () => populateReservationsDropdown(true));
     
     // Add event listener for reservation selection to auto-calculate amount
     document.getElementById('reservation-id').addEventListener('change', calculateBillAmount);
@@ -25,29 +27,42 @@ document.addEventListener('DOMContentLoaded', function() {
 // Global variables
 let allBills = [];
 let allReservations = [];
+const BILLS_PAGE_SIZE = 50;
+let billsEndCursor = null;
+const RESERVATIONS_PAGE_SIZE = 50;
+let reservationsEndCursor = null;
 
-// Fetch all bills from billing service
-async function fetchBills() {
+// Fetch bills from billing service one page at a time (loadMore appends the next page)
+async function fetchBills(loadMore = false) {
     try {
         const query = `
-            query {
-                bills {
-                    id
-                    reservationId
-                    totalAmount
-                    paymentStatus
-                    generatedAt
+            query GetBills($first: Int, $after: String) {
+                billsConnection(first: $first, after: $after) {
+                    edges {
+                        node {
+                            id
+                            reservationId
+                            totalAmount
+                            paymentStatus
+                            generatedAt
+                        }
+                    }
+                    pageInfo {
+                        hasNextPage
+                        endCursor
+                    }
                 }
             }
         `;
+        const variables = { first: BILLS_PAGE_SIZE, after: loadMore ? billsEndCursor : null };
         
-        // First, get all bills
+        // First, get a page of bills
         const billsResponse = await fetch('http://localhost:8004/graphql', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ query })
+            body: JSON.stringify({ query, variables })
         });
         
         if (!billsResponse.ok) {
@@ -60,60 +75,68 @@ async function fetchBills() {
             throw new Error(billsData.errors[0].message);
         }
         
-        // Now get reservation details for each bill
-        const bills = billsData.data.bills;
-        const enhancedBills = [];
+        const connection = billsData.data.billsConnection;
+        const bills = connection.edges.map(edge => edge.node);
         
-        for (const bill of bills) {
-            // For each bill, fetch its reservation details
-            if (bill.reservationId) {
-                const reservationQuery = `
-                    query {
-                        reservation(id: ${bill.reservationId}) {
+        // Now get reservation details for every bill on the page in a single request
+        const reservationIds = [...new Set(bills.map(bill => bill.reservationId).filter(id => id))];
+        if (reservationIds.length > 0) {
+            const reservationQuery = `
+                query GetReservationsByIds($ids: [Int!]!) {
+                    reservationsByIds(ids: $ids) {
+                        id
+                        guestId
+                        roomId
+                        checkInDate
+                        checkOutDate
+                        guest {
                             id
-                            guestId
-                            roomId
-                            checkInDate
-                            checkOutDate
-                            guest {
-                                id
-                                fullName
-                            }
-                            room {
-                                id
-                                roomNumber
-                                roomType
-                                pricePerNight
-                            }
+                            fullName
+                        }
+                        room {
+                            id
+                            roomNumber
+                            roomType
+                            pricePerNight
                         }
                     }
-                `;
+                }
+            `;
+            
+            try {
+                const resResponse = await fetch('http://localhost:8002/graphql', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                    },
+                    body: JSON.stringify({ query: reservationQuery, variables: { ids: reservationIds } })
+                });
                 
-                try {
-                    const resResponse = await fetch('http://localhost:8002/graphql', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json',
-                        },
-                        body: JSON.stringify({ query: reservationQuery })
-                    });
-                    
-                    if (resResponse.ok) {
-                        const resData = await resResponse.json();
-                        if (!resData.errors && resData.data && resData.data.reservation) {
-                            // Add reservation data to the bill
-                            bill.reservation = resData.data.reservation;
-                        }
+                if (resResponse.ok) {
+                    const resData = await resResponse.json();
+                    if (!resData.errors && resData.data && resData.data.reservationsByIds) {
+                        // Add reservation data to each bill
+                        const reservationsById = new Map();
+                        resData.data.reservationsByIds.forEach(reservation => {
+                            if (reservation) {
+                                reservationsById.set(reservation.id, reservation);
+                            }
+                        });
+                        bills.forEach(bill => {
+                            if (reservationsById.has(bill.reservationId)) {
+                                bill.reservation = reservationsById.get(bill.reservationId);
+                            }
+                        });
                     }
-                } catch (error) {
-                    console.error(`Error fetching reservation ${bill.reservationId}:`, error);
                 }
+            } catch (error) {
+                console.error('Error fetching reservations for bills:', error);
             }
-            
-            enhancedBills.push(bill);
         }
         
-        allBills = enhancedBills;
+        allBills = loadMore ? allBills.concat(bills) : bills;
+        billsEndCursor = connection.pageInfo.endCursor;
+        document.getElementById('bills-pagination').classList.toggle('active', connection.pageInfo.hasNextPage);
         renderBillsTable(allBills);
     } catch (error) {
         console.error('Error fetching bills:', error);
@@ -235,38 +258,48 @@ async function showCreateBillModal() {
     document.getElementById('bill-modal').classList.add('active');
 }
 
-// Populate reservations dropdown
-async function populateReservationsDropdown() {
+// Populate reservations dropdown one page at a time (loadMore appends the next page).
+// A page of reservations with guest and room stays within the query cost budget; the whole list doesn't.
+async function populateReservationsDropdown(loadMore = false) {
     try {
         const query = `
-            query {
-                reservations {
-                    id
-                    guestId
-                    roomId
-                    checkInDate
-                    checkOutDate
-                    status
-                    guest {
-                        id
-                        fullName
+            query GetReservations($first: Int, $after: String) {
+                reservationsConnection(first: $first, after: $after) {
+                    edges {
+                        node {
+                            id
+                            guestId
+                            roomId
+                            checkInDate
+                            checkOutDate
+                            status
+                            guest {
+                                id
+                                fullName
+                            }
+                            room {
+                                id
+                                roomNumber
+                                roomType
+                                pricePerNight
+                            }
+                        }
                     }
-                    room {
-                        id
-                        roomNumber
-                        roomType
-                        pricePerNight
+                    pageInfo {
+                        hasNextPage
+                        endCursor
                     }
                 }
             }
         `;
+        const variables = { first: RESERVATIONS_PAGE_SIZE, after: loadMore ? reservationsEndCursor : null };
         
         const response = await fetch('http://localhost:8002/graphql', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ query })
+            body: JSON.stringify({ query, variables })
         });
         
         if (!response.ok) {
@@ -279,13 +312,19 @@ async function populateReservationsDropdown() {
             throw new Error(data.errors[0].message);
         }
         
-        allReservations = data.data.reservations;
+        const connection = data.data.reservationsConnection;
+        const reservations = connection.edges.map(edge => edge.node);
+        allReservations = loadMore ? allReservations.concat(reservations) : reservations;
+        reservationsEndCursor = connection.pageInfo.endCursor;
+        document.getElementById('reservations-pagination').classList.toggle('active', connection.pageInfo.hasNextPage);
         
         const reservationSelect = document.getElementById('reservation-id');
-        reservationSelect.innerHTML = '<option value="">Select a reservation</option>';
+        if (!loadMore) {
+            reservationSelect.innerHTML = '<option value="">Select a reservation</option>';
+        }
         
         // Only show checked-out or confirmed reservations
-        const validReservations = allReservations.filter(res => 
+        const validReservations = reservations.filter(res => 
             res.status === 'checked-out' || res.status === 'confirmed' || res.status === 'checked-in'
         );
         
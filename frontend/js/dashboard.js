@@ -31,23 +31,33 @@ let dashboardData = {
 // Fetch data from all services for dashboard
 async function fetchDashboardData() {
     try {
-        // Fetch room statistics
-        dashboardData.roomStats = await fetchRoomStatistics();
+        // The statistics are small server-side aggregates; request them all at once
+        const [roomStats, guestStats, reservationStats, billingStats, recentActivity, monthlyRevenue] = await Promise.all([
+            fetchRoomStatistics(),
+            fetchGuestStatistics(),
+            fetchReservationStatistics(),
+            fetchBillingStatistics(),
+            fetchRecentActivity(),
+            fetchMonthlyRevenue()
+        ]);
+        
+        // Room statistics
+        dashboardData.roomStats = roomStats;
         document.getElementById('available-rooms').textContent = dashboardData.roomStats.availableRooms;
         document.getElementById('occupied-rooms').textContent = dashboardData.roomStats.occupiedRooms;
         
-        // Fetch guest statistics
-        dashboardData.guestStats = await fetchGuestStatistics();
+        // Guest statistics
+        dashboardData.guestStats = guestStats;
         document.getElementById('total-guests').textContent = dashboardData.guestStats.totalGuests;
         document.getElementById('new-guests').textContent = dashboardData.guestStats.newGuestsThisMonth;
         
-        // Fetch reservation statistics
-        dashboardData.reservationStats = await fetchReservationStatistics();
+        // Reservation statistics
+        dashboardData.reservationStats = reservationStats;
         document.getElementById('active-reservations').textContent = dashboardData.reservationStats.activeReservations;
         document.getElementById('upcoming-reservations').textContent = dashboardData.reservationStats.upcomingReservations;
         
-        // Fetch billing statistics
-        dashboardData.billingStats = await fetchBillingStatistics();
+        // Billing statistics
+        dashboardData.billingStats = billingStats;
         document.getElementById('pending-payments').textContent = dashboardData.billingStats.pendingPayments;
         
         // Format total revenue with currency symbol
@@ -59,12 +69,12 @@ async function fetchDashboardData() {
         }).format(dashboardData.billingStats.totalRevenue);
         document.getElementById('total-revenue').textContent = formattedRevenue;
         
-        // Fetch recent activity
-        dashboardData.recentActivity = await fetchRecentActivity();
+        // Recent activity
+        dashboardData.recentActivity = recentActivity;
         updateRecentActivity(dashboardData.recentActivity);
         
-        // Fetch monthly revenue data
-        dashboardData.monthlyRevenue = await fetchMonthlyRevenue();
+        // Monthly revenue data
+        dashboardData.monthlyRevenue = monthlyRevenue;
         
         return dashboardData;
     } catch (error) {
@@ -15,33 +15,45 @@ document.addEventListener('DOMContentLoaded', function() {
     document.getElementById('cancel-delete').addEventListener('click', closeDeleteModal);
     document.getElementById('confirm-delete').addEventListener('click', deleteGuest);
     document.getElementById('guest-search').addEventListener('input', filterGuests);
+    document.getElementById('load-more-guests').addEventListener('click', () => fetchGuests(true));
 });
 
 // Global variables
 let allGuests = [];
 let isEditing = false;
+const GUESTS_PAGE_SIZE = 50;
+let guestsEndCursor = null;
 
-// Fetch all guests from guest service
-async function fetchGuests() {
+// Fetch guests from guest service one page at a time (loadMore appends the next page)
+async function fetchGuests(loadMore = false) {
     try {
         const query = `
-            query {
-                guests {
-                    id
-                    fullName
-                    email
-                    phone
-                    address
+            query GetGuests($first: Int, $after: String) {
+                guestsConnection(first: $first, after: $after) {
+                    edges {
+                        node {
+                            id
+                            fullName
+                            email
+                            phone
+                            address
+                        }
+                    }
+                    pageInfo {
+                        hasNextPage
+                        endCursor
+                    }
                 }
             }
         `;
+        const variables = { first: GUESTS_PAGE_SIZE, after: loadMore ? guestsEndCursor : null };
         
         const response = await fetch('http://localhost:8003/graphql', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ query })
+            body: JSON.stringify({ query, variables })
         });
         
         if (!response.ok) {
@@ -54,7 +66,11 @@ async function fetchGuests() {
             throw new Error(data.errors[0].message);
         }
         
-        allGuests = data.data.guests;
+        const connection = data.data.guestsConnection;
+        const guests = connection.edges.map(edge => edge.node);
+        allGuests = loadMore ? allGuests.concat(guests) : guests;
+        guestsEndCursor = connection.pageInfo.endCursor;
+        document.getElementById('guests-pagination').classList.toggle('active', connection.pageInfo.hasNextPage);
         renderGuestsTable(allGuests);
     } catch (error) {
         console.error('Error fetching guests:', error);
@@ -14,45 +14,60 @@ document.addEventListener('DOMContentLoaded', function() {
     document.getElementById('confirm-delete').addEventListener('click', deleteReservation);
     document.getElementById('reservation-search').addEventListener('input', filterReservations);
     document.getElementById('status-filter').addEventListener('change', filterReservations);
+    // Refresh the free rooms whenever the stay dates of a new reservation change
+    document.getElementById('check-in-date').addEventListener('change', () => { if (!isEditing) populateRoomsDropdown(); });
+    document.getElementById('check-out-date').addEventListener('change', () => { if (!isEditing) populateRoomsDropdown(); });
+    document.getElementById('load-more-reservations').addEventListener('click', () => fetchReservations(true));
 });
 
 // Global variables
 let allReservations = [];
 let isEditing = false;
+const RESERVATIONS_PAGE_SIZE = 50;
+let reservationsEndCursor = null;
 
-// Fetch all reservations from reservation service
-async function fetchReservations() {
+// Fetch reservations from reservation service one page at a time (loadMore appends the next page)
+async function fetchReservations(loadMore = false) {
     try {
         const query = `
-            query {
-                reservations {
-                    id
-                    guestId
-                    roomId
-                    checkInDate
-                    checkOutDate
-                    status
-                    guest {
-                        id
-                        fullName
-                        email
+            query GetReservations($first: Int, $after: String) {
+                reservationsConnection(first: $first, after: $after) {
+                    edges {
+                        node {
+                            id
+                            guestId
+                            roomId
+                            checkInDate
+                            checkOutDate
+                            status
+                            guest {
+                                id
+                                fullName
+                                email
+                            }
+                            room {
+                                id
+                                roomNumber
+                                roomType
+                                pricePerNight
+                            }
+                        }
                     }
-                    room {
-                        id
-                        roomNumber
-                        roomType
-                        pricePerNight
+                    pageInfo {
+                        hasNextPage
+                        endCursor
                     }
                 }
             }
         `;
+        const variables = { first: RESERVATIONS_PAGE_SIZE, after: loadMore ? reservationsEndCursor : null };
         
         const response = await fetch('http://localhost:8002/graphql', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ query })
+            body: JSON.stringify({ query, variables })
         });
         
         if (!response.ok) {
@@ -65,7 +80,11 @@ async function fetchReservations() {
             throw new Error(data.errors[0].message);
         }
         
-        allReservations = data.data.reservations;
+        const connection = data.data.reservationsConnection;
+        const reservations = connection.edges.map(edge => edge.node);
+        allReservations = loadMore ? allReservations.concat(reservations) : reservations;
+        reservationsEndCursor = connection.pageInfo.endCursor;
+        document.getElementById('reservations-pagination').classList.toggle('active', connection.pageInfo.hasNextPage);
         renderReservationsTable(allReservations);
     } catch (error) {
         console.error('Error fetching reservations:', error);
@@ -274,33 +293,7 @@ async function populateGuestsDropdown() {
 // Populate rooms dropdown with available rooms
 async function populateRoomsDropdown() {
     try {
-        const query = `
-            query {
-                availableRooms {
-                    id
-                    roomNumber
-                    roomType
-                    pricePerNight
-                }
-            }
-        `;
-        
-        const response = await fetch('http://localhost:8001/graphql', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ query })
-        });
-        
-        if (!response.ok) {
-            throw new Error('Network response was not ok');
-        }
-        
-        const data = await response.json();
-        
         const roomSelect = document.getElementById('room-id');
-        roomSelect.innerHTML = '<option value="">Select a room</option>';
         
         // If editing, we need all rooms, not just available ones
         if (isEditing) {
@@ -334,60 +327,59 @@ async function populateRoomsDropdown() {
                 throw new Error(allRoomsData.errors[0].message);
             }
             
+            roomSelect.innerHTML = '<option value="">Select a room</option>';
             allRoomsData.data.rooms.forEach(room => {
                 const option = document.createElement('option');
                 option.value = room.id;
                 option.textContent = `${room.roomNumber} - ${room.roomType} ($${room.pricePerNight}/night) - ${capitalizeFirstLetter(room.status)}`;
                 roomSelect.appendChild(option);
             });
-        } else {
-            // For new reservations, only show available rooms
-            if (data.errors) {
-                throw new Error(data.errors[0].message);
-            }
-            
-            if (data.data.availableRooms && data.data.availableRooms.length > 0) {
-                data.data.availableRooms.forEach(room => {
-                    const option = document.createElement('option');
-                    option.value = room.id;
-                    option.textContent = `${room.roomNumber} - ${room.roomType} ($${room.pricePerNight}/night)`;
-                    roomSelect.appendChild(option);
-                });
-            } else {
-                // If no available rooms endpoint, fall back to all rooms
-                const allRoomsQuery = `
-                    query {
-                        rooms {
-                            id
-                            roomNumber
-                            roomType
-                            pricePerNight
-                            status
-                        }
-                    }
-                `;
-                
-                const allRoomsResponse = await fetch('http://localhost:8001/graphql', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({ query: allRoomsQuery })
-                });
-                
-                const allRoomsData = await allRoomsResponse.json();
-                
-                // Filter for available rooms only
-                const availableRooms = allRoomsData.data.rooms.filter(room => room.status === 'available');
-                
-                availableRooms.forEach(room => {
-                    const option = document.createElement('option');
-                    option.value = room.id;
-                    option.textContent = `${room.roomNumber} - ${room.roomType} ($${room.pricePerNight}/night)`;
-                    roomSelect.appendChild(option);
-                });
+            return;
+        }
+        
+        // For new reservations, ask the reservation service which rooms are free for the chosen dates
+        const checkIn = document.getElementById('check-in-date').value;
+        const checkOut = document.getElementById('check-out-date').value;
+        roomSelect.innerHTML = '<option value="">Select a room</option>';
+        if (!checkIn || !checkOut || checkOut <= checkIn) {
+            return;
+        }
+        
+        const query = `
+            query AvailableRoomsForDates($checkIn: Date!, $checkOut: Date!) {
+                availableRoomsForDates(checkIn: $checkIn, checkOut: $checkOut) {
+                    id
+                    roomNumber
+                    roomType
+                    pricePerNight
+                }
             }
+        `;
+        
+        const response = await fetch('http://localhost:8002/graphql', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ query, variables: { checkIn, checkOut } })
+        });
+        
+        if (!response.ok) {
+            throw new Error('Network response was not ok');
         }
+        
+        const data = await response.json();
+        
+        if (data.errors) {
+            throw new Error(data.errors[0].message);
+        }
+        
+        data.data.availableRoomsForDates.forEach(room => {
+            const option = document.createElement('option');
+            option.value = room.id;
+            option.textContent = `${room.roomNumber} - ${room.roomType} ($${room.pricePerNight}/night)`;
+            roomSelect.appendChild(option);
+        });
     } catch (error) {
         console.error('Error fetching rooms:', error);
         alert('Failed to load rooms. Please try again.');
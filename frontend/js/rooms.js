@@ -26,6 +26,7 @@ document.addEventListener('DOMContentLoaded', function() {
     document.getElementById('confirm-delete')?.addEventListener('click', deleteRoom);
     document.getElementById('room-search')?.addEventListener('input', filterRooms);
     document.getElementById('status-filter')?.addEventListener('change', filterRooms);
+    document.getElementById('load-more-rooms')?.addEventListener('click', () => fetchRooms(true));
     
     // Debug info
     console.log('All event listeners set up');
@@ -34,39 +35,50 @@ document.addEventListener('DOMContentLoaded', function() {
 // Global variables
 let allRooms = [];
 let isEditing = false;
+const ROOMS_PAGE_SIZE = 50;
+let roomsEndCursor = null;
 
-// Fetch all rooms from room service
-async function fetchRooms() {
+// Fetch rooms from room service one page at a time (loadMore appends the next page)
+async function fetchRooms(loadMore = false) {
     try {
         const query = `
-            query {
-                rooms {
-                    id
-                    roomNumber
-                    roomType
-                    pricePerNight
-                    status
-                    reviews {
-                        reviewId
-                        stayId
-                        overallRating
-                        content
-                        reviewDate
-                        aspects {
-                            rating
-                            comment
+            query GetRooms($first: Int, $after: String) {
+                roomsConnection(first: $first, after: $after) {
+                    edges {
+                        node {
+                            id
+                            roomNumber
+                            roomType
+                            pricePerNight
+                            status
+                            reviews {
+                                reviewId
+                                stayId
+                                overallRating
+                                content
+                                reviewDate
+                                aspects {
+                                    rating
+                                    comment
+                                }
+                            }
                         }
                     }
+                    pageInfo {
+                        hasNextPage
+                        endCursor
+                    }
                 }
             }
         `;
+        const variables = { first: ROOMS_PAGE_SIZE, after: loadMore ? roomsEndCursor : null };
         
         const response = await fetch('http://localhost:8001/graphql', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ query })
+            body: JSON.stringify({ query, variables })
         });
         
         if (!response.ok) {
@@ -79,7 +91,11 @@ async function fetchRooms() {
             throw new Error(data.errors[0].message);
         }
         
-        allRooms = data.data.rooms;
+        const connection = data.data.roomsConnection;
+        const rooms = connection.edges.map(edge => edge.node);
+        allRooms = loadMore ? allRooms.concat(rooms) : rooms;
+        roomsEndCursor = connection.pageInfo.endCursor;
+        document.getElementById('rooms-pagination').classList.toggle('active', connection.pageInfo.hasNextPage);
         renderRoomsTable(allRooms);
     } catch (error) {
         console.error('Error fetching rooms:', error);
@@ -0,0 +1,141 @@
+import codecs
+import csv
+import os
+import tempfile
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from .db import SessionLocal
+from .schema_new import response_cache
+
+# Bulk CSV import of guests.
+#
+# The request body is spooled to a temporary file, validated row by row, and the valid rows
+# are loaded with COPY into a temporary staging table (a plain INSERT on databases without
+# COPY). One INSERT ... SELECT ... ON CONFLICT (email) DO UPDATE then creates or updates every
+# guest, and the change outbox gets one row per guest, all in a single transaction.
+# Invalid rows are skipped and reported with their line number.
+
+# Request bodies up to this size stay in memory; larger ones go to disk
+IMPORT_SPOOL_SIZE = int(os.getenv("IMPORT_SPOOL_SIZE", 8 * 1024 * 1024))
+# Rows per INSERT into the staging table when COPY isn't available
+STAGING_CHUNK_SIZE = 5000
+
+COLUMNS = ["full_name", "email", "phone", "address"]
+
+def validate_row(row: Dict[str, Any]) -> List[Any]:
+    """Staging values of a CSV row; raises ValueError with a message for the error report"""
+    missing = [column for column in COLUMNS if not (row.get(column) or "").strip()]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    email = row["email"].strip()
+    if "@" not in email:
+        raise ValueError(f"email is not an email address: {email!r}")
+    return [row["full_name"].strip(), email, row["phone"].strip(), row["address"].strip()]
+
+def read_rows(source, staged) -> Dict[str, Any]:
+    """Validate the CSV in ``source`` and write the valid rows, as CSV with their line number, to ``staged``"""
+    # SpooledTemporaryFile can't be wrapped in io.TextIOWrapper before Python 3.11
+    reader = csv.DictReader(codecs.getreader("utf-8-sig")(source))
+    missing = [column for column in COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        return {"rows": 0, "staged": 0, "errors": [{"line": 1, "error": f"missing columns: {', '.join(missing)}"}]}
+    writer = csv.writer(staged)
+    errors = []
+    seen = {}
+    rows = 0
+    for row in reader:
+        rows += 1
+        line = reader.line_num
+        try:
+            values = validate_row(row)
+        except ValueError as e:
+            errors.append({"line": line, "error": str(e)})
+            continue
+        # One upsert can't change the same guest twice; the first occurrence wins
+        if values[1] in seen:
+            errors.append({"line": line, "error": f"duplicate email {values[1]!r} (first on line {seen[values[1]]})"})
+            continue
+        seen[values[1]] = line
+        writer.writerow([line] + values)
+    staged.seek(0)
+    return {"rows": rows, "staged": len(seen), "errors": errors}
+
+def load_staging(db, staged):
+    db.execute(text("DROP TABLE IF EXISTS guests_import"))
+    db.execute(text(
+        "CREATE TEMPORARY TABLE guests_import ("
+        "line INTEGER, full_name VARCHAR, email VARCHAR, phone VARCHAR, address TEXT, "
+        "existing BOOLEAN NOT NULL DEFAULT FALSE)"
+    ))
+    columns = ["line"] + COLUMNS
+    if db.get_bind().dialect.name == "postgresql":
+        cursor = db.connection().connection.cursor()
+        cursor.copy_expert(f"COPY guests_import ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", staged)
+        return
+    insert = text(f"INSERT INTO guests_import ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})")
+    chunk = []
+    for values in csv.reader(staged):
+        chunk.append(dict(zip(columns, values)))
+        if len(chunk) == STAGING_CHUNK_SIZE:
+            db.execute(insert, chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert, chunk)
+
+def upsert_guests(db) -> Dict[str, int]:
+    """Create or update guests from the staging table and record them in the change outbox"""
+    db.execute(text(
+        "UPDATE guests_import SET existing = TRUE "
+        "WHERE email IN (SELECT email FROM guests)"
+    ))
+    updated = db.execute(text("SELECT count(*) FROM guests_import WHERE existing")).scalar()
+    staged = db.execute(text("SELECT count(*) FROM guests_import")).scalar()
+    # WHERE TRUE keeps SQLite from reading ON CONFLICT as part of the SELECT
+    db.execute(text(
+        "INSERT INTO guests (full_name, email, phone, address) "
+        "SELECT full_name, email, phone, address FROM guests_import WHERE TRUE ORDER BY line "
+        "ON CONFLICT (email) DO UPDATE SET "
+        "full_name = excluded.full_name, phone = excluded.phone, address = excluded.address"
+    ))
+    db.execute(text(
+        "INSERT INTO change_outbox (entity, entity_id, operation) "
+        "SELECT 'Guest', guests.id, CASE WHEN guests_import.existing THEN 'update' ELSE 'create' END "
+        "FROM guests_import JOIN guests ON guests.email = guests_import.email ORDER BY guests_import.line"
+    ))
+    db.execute(text("DROP TABLE guests_import"))
+    return {"created": staged - updated, "updated": updated}
+
+def import_guests(source) -> Dict[str, Any]:
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE, mode="w+", newline="") as staged:
+        report = read_rows(source, staged)
+        counts = {"created": 0, "updated": 0}
+        if report["staged"]:
+            db = SessionLocal()
+            try:
+                load_staging(db, staged)
+                counts = upsert_guests(db)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+    return {"rows": report["rows"], **counts, "failed": len(report["errors"]), "errors": report["errors"]}
+
+import_router = APIRouter(prefix="/import")
+
+@import_router.post("/guests.csv")
+async def import_guests_csv(request: Request):
+    """Create or update guests from a CSV body with columns full_name, email, phone, address"""
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as source:
+        async for chunk in request.stream():
+            source.write(chunk)
+        source.seek(0)
+        result = await run_in_threadpool(import_guests, source)
+    if result["created"] or result["updated"]:
+        await response_cache.invalidate(["Guest"])
+    return result
@@ -1,10 +1,196 @@
 import os
+import asyncio
 import logging
+import time
+from collections import OrderedDict
 from gql import Client, gql
 from gql.transport.aiohttp import AIOHTTPTransport
 
 logger = logging.getLogger(__name__)
 
+class GraphQLUpstream:
+    """
+    A persistent gql session to one upstream GraphQL endpoint
+
+    The session (and its pooled keep-alive aiohttp connections) is opened once and
+    reused by every call. The upstream schema is introspected at most once, on first use.
+    """
+    def __init__(self, url, timeout=None, fetch_schema=True):
+        self.url = url
+        self.client = Client(transport=AIOHTTPTransport(url=url, timeout=timeout), fetch_schema_from_transport=False)
+        self.session = None
+        self.fetch_schema = fetch_schema
+        self._lock = asyncio.Lock()
+
+    async def connect(self):
+        async with self._lock:
+            if self.session is None:
+                self.session = await self.client.connect_async()
+            if self.fetch_schema:
+                # Only one attempt: if introspection fails, queries are sent without local validation
+                self.fetch_schema = False
+                try:
+                    await self.session.fetch_schema()
+                except Exception as e:
+                    logger.warning(f"Could not fetch schema from {self.url}: {str(e)}")
+
+    async def execute(self, document, variable_values=None):
+        if self.session is None or self.fetch_schema:
+            await self.connect()
+        return await self.session.execute(document, variable_values=variable_values)
+
+    async def close(self):
+        async with self._lock:
+            if self.session is not None:
+                await self.client.close_async()
+                self.session = None
+
+loyalty_upstream = GraphQLUpstream(os.environ.get("LOYALTY_SERVICE_URL", "http://loyalty_service:3001/graphql"))
+
+async def open_loyalty_session():
+    """Open the loyalty service session, called once at application startup"""
+    try:
+        await loyalty_upstream.connect()
+    except Exception as e:
+        logger.error(f"Error connecting to loyalty service at {loyalty_upstream.url}: {str(e)}")
+
+async def close_loyalty_session():
+    await loyalty_upstream.close()
+
+GUEST_BY_EMAIL_QUERY = gql("""
+query GetGuestByEmail($email: String!) {
+    guestByEmail(email: $email) {
+        loyaltyPoints
+        tier
+    }
+}
+""")
+
+REWARDS_QUERY = gql("""
+query GetRewards($tier: String) {
+    rewards(tier: $tier, available: true) {
+        rewardId
+        name
+        pointsRequired
+        description
+        available
+        tierRestriction
+        createdAt
+        updatedAt
+    }
+}
+""")
+
+LOYALTY_INFO_BY_GUEST_ID_QUERY = gql("""
+query GetLoyaltyInfoByGuestId($guestId: Int!) {
+    loyaltyInfoByGuestId(guestId: $guestId) {
+        loyaltyPoints
+        tier
+        availableRewards {
+            rewardId
+            name
+            pointsRequired
+            description
+            available
+            tierRestriction
+            createdAt
+            updatedAt
+        }
+    }
+}
+""")
+
+async def get_loyalty_info_by_guest_id(guest_id):
+    """Fetch the raw loyaltyInfoByGuestId result for a guest, or None if the service has no entry"""
+    result = await loyalty_upstream.execute(LOYALTY_INFO_BY_GUEST_ID_QUERY, variable_values={"guestId": guest_id})
+    logger.info(f"Received loyalty info response: {result}")
+    if result:
+        return result.get("loyaltyInfoByGuestId")
+    return None
+
+# Loyalty tiers change rarely, so entries are fresh for LOYALTY_CACHE_TTL seconds and then
+# served stale (while refreshed in the background) until LOYALTY_CACHE_MAX_STALE
+LOYALTY_CACHE_SIZE = int(os.environ.get("LOYALTY_CACHE_SIZE", "1000"))
+LOYALTY_CACHE_TTL = float(os.environ.get("LOYALTY_CACHE_TTL", "300"))
+LOYALTY_CACHE_MAX_STALE = float(os.environ.get("LOYALTY_CACHE_MAX_STALE", "3600"))
+
+class LoyaltyCache:
+    """
+    Bounded LRU + TTL cache of loyaltyInfoByGuestId results keyed by guest id
+
+    Concurrent misses for the same guest share one upstream request, and stale entries are
+    returned immediately while a single background refresh replaces them.
+    """
+    def __init__(self, fetch, max_size=LOYALTY_CACHE_SIZE, ttl=LOYALTY_CACHE_TTL, max_stale=LOYALTY_CACHE_MAX_STALE):
+        self.fetch = fetch
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_stale = max_stale
+        # guest_id -> (loyalty info or None, fetched_at), least recently used first
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "refreshes": 0, "errors": 0}
+
+    async def get(self, guest_id):
+        entry = self._entries.get(guest_id)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            if age < self.ttl:
+                self._entries.move_to_end(guest_id)
+                self.counters["hits"] += 1
+                return value
+            if age < self.ttl + self.max_stale:
+                self._entries.move_to_end(guest_id)
+                self.counters["stale_hits"] += 1
+                if guest_id not in self._in_flight:
+                    self.counters["refreshes"] += 1
+                    self._start_fetch(guest_id)
+                return value
+
+        if guest_id in self._in_flight:
+            self.counters["coalesced"] += 1
+        else:
+            self.counters["misses"] += 1
+            self._start_fetch(guest_id)
+        # shield so a cancelled resolver does not cancel the fetch other callers are waiting on
+        return await asyncio.shield(self._in_flight[guest_id])
+
+    def _start_fetch(self, guest_id):
+        task = asyncio.ensure_future(self._fetch(guest_id))
+        self._in_flight[guest_id] = task
+        # Background refreshes may have no awaiter, so retrieve failures here to avoid "never retrieved" warnings
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _fetch(self, guest_id):
+        try:
+            value = await self.fetch(guest_id)
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+        finally:
+            self._in_flight.pop(guest_id, None)
+        self._set(guest_id, value)
+        return value
+
+    def _set(self, guest_id, value):
+        self._entries[guest_id] = (value, time.monotonic())
+        self._entries.move_to_end(guest_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def invalidate(self, guest_id=None):
+        if guest_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(guest_id, None)
+
+    def stats(self):
+        return {"size": len(self._entries), "max_size": self.max_size, "ttl": self.ttl, "in_flight": len(self._in_flight), **self.counters}
+
+loyalty_cache = LoyaltyCache(get_loyalty_info_by_guest_id)
+
 async def get_loyalty_info_by_email(email):
     """
     Fetch loyalty information for a guest by email from the hotelmate loyalty service
@@ -15,59 +201,27 @@ async def get_loyalty_info_by_email(email):
     Returns:
         Loyalty info object or None if error occurs
     """
-    loyalty_service_url = os.environ.get("LOYALTY_SERVICE_URL", "http://loyalty_service:3001/graphql")
-    
     try:
-        transport = AIOHTTPTransport(url=loyalty_service_url)
-        async with Client(
-            transport=transport,
-            fetch_schema_from_transport=True,
-        ) as session:
-            # First try to get the guest by email
-            query = gql("""
-            query GetGuestByEmail($email: String!) {
-                guestByEmail(email: $email) {
-                    loyaltyPoints
-                    tier
-                }
-            }
-            """)
-            
-            variables = {"email": email}
-            result = await session.execute(query, variable_values=variables)
-            
-            guest_data = result.get("guestByEmail")
-            if not guest_data:
-                logger.info(f"No loyalty info found for guest with email {email}")
-                return None
-            
-            # Then get available rewards for the guest's tier
-            rewards_query = gql("""
-            query GetRewards($tier: String) {
-                rewards(tier: $tier, available: true) {
-                    rewardId
-                    name
-                    pointsRequired
-                    description
-                    available
-                    tierRestriction
-                    createdAt
-                    updatedAt
-                }
-            }
-            """)
-            
-            rewards_variables = {"tier": guest_data.get("tier")}
-            rewards_result = await session.execute(rewards_query, variable_values=rewards_variables)
-            
-            loyalty_info = {
-                "loyaltyPoints": guest_data.get("loyaltyPoints", 0),
-                "tier": guest_data.get("tier", "STANDARD"),
-                "availableRewards": rewards_result.get("rewards", [])
-            }
-            
-            logger.info(f"Found loyalty info for guest with email {email}: {loyalty_info['tier']} tier with {loyalty_info['loyaltyPoints']} points")
-            return loyalty_info
+        variables = {"email": email}
+        result = await loyalty_upstream.execute(GUEST_BY_EMAIL_QUERY, variable_values=variables)
+        
+        guest_data = result.get("guestByEmail")
+        if not guest_data:
+            logger.info(f"No loyalty info found for guest with email {email}")
+            return None
+        
+        # Then get available rewards for the guest's tier
+        rewards_variables = {"tier": guest_data.get("tier")}
+        rewards_result = await loyalty_upstream.execute(REWARDS_QUERY, variable_values=rewards_variables)
+        
+        loyalty_info = {
+            "loyaltyPoints": guest_data.get("loyaltyPoints", 0),
+            "tier": guest_data.get("tier", "STANDARD"),
+            "availableRewards": rewards_result.get("rewards", [])
+        }
+        
+        logger.info(f"Found loyalty info for guest with email {email}: {loyalty_info['tier']} tier with {loyalty_info['loyaltyPoints']} points")
+        return loyalty_info
     except Exception as e:
         logger.error(f"Error fetching loyalty info for guest with email {email}: {str(e)}")
         return None
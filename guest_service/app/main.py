@@ -2,9 +2,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import time
-from .db import engine, Base, get_db, wait_for_db
+from .db import engine, Base, get_db, wait_for_db, run_migrations
 from .models import Guest
-from .schema_new import graphql_router
+from .schema_new import graphql_router, response_cache
+from .outbox import prune_outbox
+from .bulk_import import import_router
+from .client import open_loyalty_session, close_loyalty_session, loyalty_cache
+from .persisted_queries import query_cache
+from .query_cost import cost_throttle
 
 # Create FastAPI app
 app = FastAPI(title="Guest Service")
@@ -21,20 +26,42 @@ app.add_middleware(
 # Include GraphQL router
 app.include_router(graphql_router, prefix="/graphql")
 
+# Bulk CSV imports
+app.include_router(import_router)
+
 # Health check endpoint
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "service": "guest_service"}
 
+# Hit/miss/eviction counters of the loyalty info cache
+@app.get("/metrics/loyalty-cache")
+def loyalty_cache_metrics():
+    return loyalty_cache.stats()
+
+# Persisted query and parsed-document cache counters
+@app.get("/metrics/query-cache")
+def query_cache_metrics():
+    return query_cache.stats()
+
+# Query cost throttle (QUERY_COST_RATE) state and counters
+@app.get("/metrics/query-cost")
+def query_cost_metrics():
+    return cost_throttle.stats()
+
+# Response cache hit ratio and memory use
+@app.get("/metrics/response-cache")
+async def response_cache_metrics():
+    return await response_cache.stats()
+
 # Startup event to initialize database and add sample data
 @app.on_event("startup")
 async def startup_event():
     # Wait for database to be ready
     print("Waiting for database to be ready...")
     if wait_for_db():
-        print("Creating database tables...")
-        # Create database tables
-        Base.metadata.create_all(bind=engine)
+        print("Running database migrations...")
+        run_migrations()
         
         # Add sample data
         print("Adding sample data...")
@@ -51,6 +78,10 @@ async def startup_event():
                 db.add_all(sample_guests)
                 db.commit()
                 print("Sample data added successfully")
+            # Old outbox rows are only needed by listeners catching up after a reconnect
+            pruned = prune_outbox(db)
+            if pruned:
+                print(f"Pruned {pruned} change outbox rows")
         except Exception as e:
             print(f"Error adding sample data: {e}")
         finally:
@@ -58,5 +89,12 @@ async def startup_event():
     else:
         print("Failed to connect to database. Service may not function correctly.")
 
+    # Open the persistent loyalty service session once for the lifetime of the app
+    await open_loyalty_session()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_loyalty_session()
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, Index, func
 from typing import Optional
 from sqlmodel import Field, SQLModel
 
@@ -14,3 +14,18 @@ class Guest(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     phone = Column(String, nullable=False)
     address = Column(Text, nullable=False)
+
+class ChangeOutbox(Base):
+    """Committed entity changes, announced to other services with NOTIFY (see outbox.py)"""
+    __tablename__ = "change_outbox"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    operation = Column(String, nullable=False)  # create, update, delete
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        # prune_outbox deletes by age
+        Index("ix_change_outbox_created_at", "created_at"),
+    )
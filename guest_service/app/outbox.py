@@ -0,0 +1,35 @@
+import os
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import insert
+
+from .models import ChangeOutbox
+
+# Transactional outbox of entity changes.
+#
+# Mutations add a row per changed entity in the same transaction as the change itself, so a
+# change is announced if and only if it commits. On PostgreSQL an AFTER INSERT trigger
+# (see the change_outbox migration) sends every row as a NOTIFY on CHANGE_CHANNEL, which
+# Postgres delivers to listeners when the transaction commits:
+#
+#   {"version": <outbox id>, "entity": "Room", "entity_id": 1, "operation": "update"}
+#
+# The outbox id is the version: it increases with every change, and listeners that lost
+# their connection read the rows above the last version they saw to catch up.
+
+CHANGE_CHANNEL = "change_outbox"
+CHANGE_OUTBOX_RETENTION_HOURS = int(os.getenv("CHANGE_OUTBOX_RETENTION_HOURS", 24))
+
+def record_changes(db, entity: str, entity_ids: Iterable[int], operation: str):
+    """Add outbox rows for changed entities to the session's transaction (commit is left to the caller)"""
+    rows = [{"entity": entity, "entity_id": entity_id, "operation": operation} for entity_id in entity_ids]
+    if rows:
+        db.execute(insert(ChangeOutbox.__table__), rows)
+
+def prune_outbox(db, retention_hours: int = CHANGE_OUTBOX_RETENTION_HOURS) -> int:
+    """Delete outbox rows older than the retention period; listeners only need recent rows to catch up"""
+    cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+    deleted = db.query(ChangeOutbox).filter(ChangeOutbox.created_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return deleted
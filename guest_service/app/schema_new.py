@@ -2,14 +2,17 @@ import strawberry
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from .models import Guest
-from .db import get_db
+from .db import get_db, get_request_db, run_db, fetch_by_ids
+from .outbox import record_changes
+from .pagination import Connection, paginate
 from fastapi import Depends
-from strawberry.fastapi import GraphQLRouter
 import os
 import logging
 import httpx
-from gql import Client, gql
-from gql.transport.aiohttp import AIOHTTPTransport
+from .client import loyalty_cache
+from .persisted_queries import CachedDocuments, PersistedQueryRouter
+from .query_cost import QueryCost, REMOTE, all_rows
+from .response_cache import ResponseCache, cached, invalidates
 
 # Input types for mutations
 @strawberry.input
@@ -53,45 +56,15 @@ class GuestType:
     phone: str
     address: str
     
-    @strawberry.field
+    @strawberry.field(metadata=REMOTE)
     async def loyalty_info(self) -> Optional[LoyaltyInfoType]:
         """Fetch loyalty information for this guest from the hotelmate loyalty service"""
         logging.info(f"Fetching loyalty info for guest {self.id} from loyalty service.")
-        loyalty_service_url = os.getenv("LOYALTY_SERVICE_URL")
-        if not loyalty_service_url:
-            logging.error("LOYALTY_SERVICE_URL not configured.")
-            return None
-
-        transport = AIOHTTPTransport(url=loyalty_service_url)
-        client = Client(transport=transport, fetch_schema_from_transport=False)
-
-        query_string = gql("""
-            query GetLoyaltyInfoByGuestId($guestId: Int!) {
-                loyaltyInfoByGuestId(guestId: $guestId) {
-                    loyaltyPoints
-                    tier
-                    availableRewards {
-                        rewardId
-                        name
-                        pointsRequired
-                        description
-                        available
-                        tierRestriction
-                        createdAt
-                        updatedAt
-                    }
-                }
-            }
-        """)
-
         try:
-            async with client as session:
-                result = await session.execute(query_string, variable_values={"guestId": self.id})
+            # Served from the loyalty cache; misses go through the session opened at startup
+            data = await loyalty_cache.get(self.id)
             
-            logging.info(f"Received loyalty info response: {result}")
-            
-            if result and result.get("loyaltyInfoByGuestId"):
-                data = result["loyaltyInfoByGuestId"]
+            if data:
                 available_rewards = []
                 if data.get("availableRewards"):
                     for reward_data in data["availableRewards"]:
@@ -134,91 +107,113 @@ def guest_to_graphql(guest: Guest) -> GuestType:
     )
 
 # Dependency to get database session for strawberry
-def get_context():
-    db = next(get_db())
-    try:
+async def get_context():
+    async for db in get_request_db():
         yield {"db": db}
-    finally:
-        db.close()
 
 # Queries
 @strawberry.type
 class Query:
-    @strawberry.field
-    def guest(self, info, id: int) -> Optional[GuestType]:
-        db = info.context["db"]
-        guest = db.query(Guest).filter(Guest.id == id).first()
-        if guest:
-            return guest_to_graphql(guest)
-        return None
-
-    @strawberry.field
-    def guests(self, info) -> List[GuestType]:
-        db = info.context["db"]
-        guests = db.query(Guest).all()
-        return [guest_to_graphql(guest) for guest in guests]
+    @strawberry.field(metadata=cached("Guest"))
+    async def guest(self, info, id: int) -> Optional[GuestType]:
+        def load(db):
+            guest = db.query(Guest).filter(Guest.id == id).first()
+            if guest:
+                return guest_to_graphql(guest)
+            return None
+        return await run_db(info.context["db"], load)
+
+    @strawberry.field(metadata={**cached("Guest"), **all_rows(Guest)})
+    async def guests(self, info) -> List[GuestType]:
+        def load(db):
+            guests = db.query(Guest).all()
+            return [guest_to_graphql(guest) for guest in guests]
+        return await run_db(info.context["db"], load)
+
+    @strawberry.field(metadata=cached("Guest"))
+    async def guests_connection(self, info, first: Optional[int] = None, after: Optional[str] = None) -> Connection[GuestType]:
+        """Page through guests by id; pass pageInfo.endCursor as ``after`` to get the next page"""
+        return await paginate(info.context["db"], lambda db: db.query(Guest), Guest, guest_to_graphql, first, after)
+
+    @strawberry.field(metadata=cached("Guest"))
+    async def guests_by_ids(self, info, ids: List[int]) -> List[Optional[GuestType]]:
+        """Fetch many guests in one query, in the order of ``ids`` (None for unknown ids)"""
+        def load(db):
+            return [guest_to_graphql(guest) if guest else None for guest in fetch_by_ids(db, Guest, ids)]
+        return await run_db(info.context["db"], load)
     
-    @strawberry.field
-    def guest_by_email(self, info, email: str) -> Optional[GuestType]:
-        db = info.context["db"]
-        guest = db.query(Guest).filter(Guest.email == email).first()
-        if guest:
-            return guest_to_graphql(guest)
-        return None
+    @strawberry.field(metadata=cached("Guest"))
+    async def guest_by_email(self, info, email: str) -> Optional[GuestType]:
+        def load(db):
+            guest = db.query(Guest).filter(Guest.email == email).first()
+            if guest:
+                return guest_to_graphql(guest)
+            return None
+        return await run_db(info.context["db"], load)
 
 # Mutations
 @strawberry.type
 class Mutation:
-    @strawberry.mutation
-    def create_guest(self, info, guest_data: GuestInput) -> GuestType:
-        db = info.context["db"]
-        guest = Guest(
-            full_name=guest_data.full_name,
-            email=guest_data.email,
-            phone=guest_data.phone,
-            address=guest_data.address
-        )
-        db.add(guest)
-        db.commit()
-        db.refresh(guest)
-        return guest_to_graphql(guest)
-
-    @strawberry.mutation
-    def update_guest(self, info, id: int, guest_data: GuestUpdateInput) -> Optional[GuestType]:
-        db = info.context["db"]
-        guest = db.query(Guest).filter(Guest.id == id).first()
-        if not guest:
-            return None
-        
-        if guest_data.full_name is not None:
-            guest.full_name = guest_data.full_name
-        if guest_data.email is not None:
-            guest.email = guest_data.email
-        if guest_data.phone is not None:
-            guest.phone = guest_data.phone
-        if guest_data.address is not None:
-            guest.address = guest_data.address
+    @strawberry.mutation(metadata=invalidates("Guest"))
+    async def create_guest(self, info, guest_data: GuestInput) -> GuestType:
+        def create(db):
+            guest = Guest(
+                full_name=guest_data.full_name,
+                email=guest_data.email,
+                phone=guest_data.phone,
+                address=guest_data.address
+            )
+            db.add(guest)
+            db.flush()
+            record_changes(db, "Guest", [guest.id], "create")
+            db.commit()
+            db.refresh(guest)
+            return guest_to_graphql(guest)
+        return await run_db(info.context["db"], create)
+
+    @strawberry.mutation(metadata=invalidates("Guest"))
+    async def update_guest(self, info, id: int, guest_data: GuestUpdateInput) -> Optional[GuestType]:
+        def update(db):
+            guest = db.query(Guest).filter(Guest.id == id).first()
+            if not guest:
+                return None
             
-        db.commit()
-        db.refresh(guest)
-        return guest_to_graphql(guest)
-
-    @strawberry.mutation
-    def delete_guest(self, info, id: int) -> bool:
-        db = info.context["db"]
-        guest = db.query(Guest).filter(Guest.id == id).first()
-        if not guest:
-            return False
-        
-        db.delete(guest)
-        db.commit()
-        return True
+            if guest_data.full_name is not None:
+                guest.full_name = guest_data.full_name
+            if guest_data.email is not None:
+                guest.email = guest_data.email
+            if guest_data.phone is not None:
+                guest.phone = guest_data.phone
+            if guest_data.address is not None:
+                guest.address = guest_data.address
+                
+            record_changes(db, "Guest", [guest.id], "update")
+            db.commit()
+            db.refresh(guest)
+            return guest_to_graphql(guest)
+        return await run_db(info.context["db"], update)
+
+    @strawberry.mutation(metadata=invalidates("Guest"))
+    async def delete_guest(self, info, id: int) -> bool:
+        def delete(db):
+            guest = db.query(Guest).filter(Guest.id == id).first()
+            if not guest:
+                return False
+            
+            db.delete(guest)
+            record_changes(db, "Guest", [id], "delete")
+            db.commit()
+            return True
+        return await run_db(info.context["db"], delete)
+
+# Responses of repeated queries, dropped when a mutation changes guests
+response_cache = ResponseCache.from_env("guest")
 
 # Create GraphQL schema
-schema = strawberry.Schema(query=Query, mutation=Mutation, types=[GuestType, LoyaltyInfoType, RewardType])
+schema = strawberry.Schema(query=Query, mutation=Mutation, types=[GuestType, LoyaltyInfoType, RewardType], extensions=[CachedDocuments, QueryCost, response_cache.extension()])
 
 # Create GraphQL router for FastAPI
-graphql_router = GraphQLRouter(
+graphql_router = PersistedQueryRouter(
     schema,
     context_getter=get_context
 )
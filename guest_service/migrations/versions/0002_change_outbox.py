@@ -0,0 +1,51 @@
+"""Transactional outbox of guest changes with a NOTIFY trigger
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+Mutations write a change_outbox row in the same transaction as the change. On
+PostgreSQL every inserted row is sent as a NOTIFY on the change_outbox channel,
+delivered to listeners (the reservation and billing services) when it commits.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+NOTIFY_FUNCTION = """
+CREATE OR REPLACE FUNCTION notify_change_outbox() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('change_outbox', json_build_object(
+        'version', NEW.id, 'entity', NEW.entity, 'entity_id', NEW.entity_id, 'operation', NEW.operation
+    )::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+def upgrade():
+    op.create_table(
+        "change_outbox",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer, "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("entity", sa.String, nullable=False),
+        sa.Column("entity_id", sa.Integer, nullable=False),
+        sa.Column("operation", sa.String, nullable=False),
+        sa.Column("created_at", sa.DateTime, nullable=False, server_default=sa.func.now())
+    )
+    op.create_index("ix_change_outbox_created_at", "change_outbox", ["created_at"])
+    if op.get_context().dialect.name == "postgresql":
+        op.execute(NOTIFY_FUNCTION)
+        op.execute(
+            "CREATE TRIGGER change_outbox_notify AFTER INSERT ON change_outbox "
+            "FOR EACH ROW EXECUTE FUNCTION notify_change_outbox()"
+        )
+
+def downgrade():
+    if op.get_context().dialect.name == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS change_outbox_notify ON change_outbox")
+        op.execute("DROP FUNCTION IF EXISTS notify_change_outbox()")
+    op.drop_table("change_outbox")
@@ -0,0 +1,104 @@
+from bisect import bisect_left, insort
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Reservations in ACTIVE_STATUSES occupy their room for [check_in_date, check_out_date)
+from .models import Reservation, ACTIVE_STATUSES, active_stay_filter
+
+class RoomIntervals:
+    """Active stays of one room, sorted by check-in date.
+
+    ``max_end[i]`` is the latest check-out among the first ``i + 1`` stays, so an overlap
+    test is a bisect on check-in dates plus one lookup, even if stays overlap each other.
+    """
+    def __init__(self):
+        self.stays: List[Tuple[date, date, int]] = []
+        self.starts: List[date] = []
+        self.max_end: List[date] = []
+
+    def __len__(self):
+        return len(self.stays)
+
+    def _rebuild(self):
+        self.starts = [start for start, _, _ in self.stays]
+        self.max_end = []
+        for _, end, _ in self.stays:
+            self.max_end.append(max(end, self.max_end[-1]) if self.max_end else end)
+
+    def add(self, check_in: date, check_out: date, reservation_id: int):
+        insort(self.stays, (check_in, check_out, reservation_id))
+        self._rebuild()
+
+    def remove(self, check_in: date, check_out: date, reservation_id: int):
+        self.stays.remove((check_in, check_out, reservation_id))
+        self._rebuild()
+
+    def is_free(self, check_in: date, check_out: date, exclude_reservation_id: Optional[int] = None) -> bool:
+        # Only stays starting before check_out can overlap [check_in, check_out)
+        count = bisect_left(self.starts, check_out)
+        if count == 0 or self.max_end[count - 1] <= check_in:
+            return True
+        if exclude_reservation_id is None:
+            return False
+        # Updating a reservation must not conflict with itself
+        return all(
+            end <= check_in or reservation_id == exclude_reservation_id
+            for _, end, reservation_id in self.stays[:count]
+        )
+
+class AvailabilityIndex:
+    """In-memory per-room interval index of active reservations.
+
+    Loaded from the reservations table at startup and updated by the reservation
+    mutations after they commit.
+    """
+    def __init__(self):
+        self.rooms: Dict[int, RoomIntervals] = {}
+        # reservation id -> (room_id, check_in, check_out) of its indexed stay
+        self.stays: Dict[int, Tuple[int, date, date]] = {}
+        self.loaded = False
+
+    def load(self, db):
+        self.rooms = {}
+        self.stays = {}
+        rows = db.query(
+            Reservation.id, Reservation.room_id, Reservation.check_in_date, Reservation.check_out_date
+        ).filter(active_stay_filter()).all()
+        for reservation_id, room_id, check_in, check_out in rows:
+            self._add(reservation_id, room_id, check_in, check_out)
+        self.loaded = True
+        return len(rows)
+
+    def _add(self, reservation_id: int, room_id: int, check_in: date, check_out: date):
+        self.rooms.setdefault(room_id, RoomIntervals()).add(check_in, check_out, reservation_id)
+        self.stays[reservation_id] = (room_id, check_in, check_out)
+
+    def remove(self, reservation_id: int):
+        stay = self.stays.pop(reservation_id, None)
+        if stay is None:
+            return
+        room_id, check_in, check_out = stay
+        intervals = self.rooms[room_id]
+        intervals.remove(check_in, check_out, reservation_id)
+        if not intervals:
+            del self.rooms[room_id]
+
+    def apply(self, reservation: Reservation):
+        """Re-index a created or updated reservation"""
+        self.remove(reservation.id)
+        if reservation.status in ACTIVE_STATUSES:
+            self._add(reservation.id, reservation.room_id, reservation.check_in_date, reservation.check_out_date)
+
+    def is_available(self, room_id: int, check_in: date, check_out: date, exclude_reservation_id: Optional[int] = None) -> bool:
+        intervals = self.rooms.get(room_id)
+        return intervals is None or intervals.is_free(check_in, check_out, exclude_reservation_id)
+
+    def available_room_ids(self, room_ids: Iterable[int], check_in: date, check_out: date) -> List[int]:
+        return [room_id for room_id in room_ids if self.is_available(room_id, check_in, check_out)]
+
+availability_index = AvailabilityIndex()
+
+def ensure_loaded(db):
+    """Load the index on first use if startup did not (e.g. the app was imported without its lifespan)"""
+    if not availability_index.loaded:
+        availability_index.load(db)
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import asyncpg
+
+# Listener for the change feeds of the room and guest databases.
+#
+# Those services write a change_outbox row in the same transaction as every room or guest
+# change, and a trigger sends each row as a NOTIFY on the change_outbox channel when the
+# transaction commits. A listener keeps one idle connection per source database with
+# LISTEN on that channel, so changes arrive within milliseconds without polling. Events
+# received in the same event loop iteration are handed to the handler as one batch.
+#
+# After a lost connection the listener reconnects and replays the outbox rows committed while
+# it was disconnected. Outbox ids are assigned when a row is inserted, not when its
+# transaction commits, so a change with a lower id than the last one seen can still commit
+# later. The replay therefore re-reads a window below the highest id seen (by id and by age)
+# and skips the ids it already handled.
+
+CHANGE_CHANNEL = "change_outbox"
+CHANGE_FEED_RECONNECT_DELAY = float(os.getenv("CHANGE_FEED_RECONNECT_DELAY", 1))
+CHANGE_FEED_MAX_RECONNECT_DELAY = float(os.getenv("CHANGE_FEED_MAX_RECONNECT_DELAY", 30))
+# Replay window below the highest id seen: this many ids, plus every row inserted in the last
+# CHANGE_FEED_REPLAY_SECONDS (covers transactions that stayed open longer than that many ids)
+CHANGE_FEED_REPLAY_IDS = int(os.getenv("CHANGE_FEED_REPLAY_IDS", 1000))
+CHANGE_FEED_REPLAY_SECONDS = float(os.getenv("CHANGE_FEED_REPLAY_SECONDS", 300))
+
+REPLAY_QUERY = (
+    "SELECT id AS version, entity, entity_id, operation FROM change_outbox "
+    "WHERE id > $1 OR created_at >= now() - make_interval(secs => $2) ORDER BY id"
+)
+
+# Source name -> environment variable with the DSN of its database; unset sources are skipped
+CHANGE_FEED_SOURCES = {
+    "room": "CHANGE_FEED_ROOM_URL",
+    "guest": "CHANGE_FEED_GUEST_URL",
+}
+
+ChangeHandler = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+class ChangeFeedListener:
+    """LISTEN on the change_outbox channel of one source database"""
+    def __init__(self, name: str, dsn: str, handler: ChangeHandler):
+        self.name = name
+        self.dsn = dsn
+        self.handler = handler
+        # Highest outbox id seen; None until the first connection
+        self.version: Optional[int] = None
+        # Ids handled within the replay window below version, to skip them when replaying
+        self._seen: Set[int] = set()
+        self.connected = False
+        self.events = 0
+        self.batches = 0
+        self.caught_up = 0
+        self.duplicates = 0
+        self.reconnects = 0
+        self.errors = 0
+        self.last_event_at: Optional[float] = None
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        delay = CHANGE_FEED_RECONNECT_DELAY
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                # LISTEN before catching up, so nothing committed in between is missed
+                await connection.add_listener(CHANGE_CHANNEL, self._on_notify)
+                await self._catch_up(connection)
+                self.connected = True
+                delay = CHANGE_FEED_RECONNECT_DELAY
+                print(f"Change feed {self.name}: listening from version {self.version}")
+                await closed.wait()
+                print(f"Change feed {self.name}: connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"Change feed {self.name}: {e}")
+            finally:
+                self.connected = False
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, CHANGE_FEED_MAX_RECONNECT_DELAY)
+
+    async def _catch_up(self, connection):
+        if self.version is None:
+            # No version to replay from yet; anything cached before the first connection expires with its TTL
+            latest = await connection.fetchval("SELECT coalesce(max(id), 0) FROM change_outbox")
+            # A notification may already have arrived while the query ran
+            self.version = max(self.version or 0, latest)
+            return
+        rows = await connection.fetch(REPLAY_QUERY, self.version - CHANGE_FEED_REPLAY_IDS, CHANGE_FEED_REPLAY_SECONDS)
+        for row in rows:
+            if self._receive(dict(row)):
+                self.caught_up += 1
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            self._receive(json.loads(payload))
+        except ValueError:
+            self.errors += 1
+            print(f"Change feed {self.name}: invalid payload {payload!r}")
+
+    def _receive(self, event: Dict[str, Any]) -> bool:
+        """Queue an event for the handler unless its id was already handled; True if queued"""
+        version = event["version"]
+        if version in self._seen:
+            self.duplicates += 1
+            return False
+        self._seen.add(version)
+        self.version = max(self.version or 0, version)
+        if len(self._seen) > 2 * CHANGE_FEED_REPLAY_IDS:
+            # Ids below the window may be replayed by age and handled twice; invalidating twice is harmless
+            low_water_mark = self.version - CHANGE_FEED_REPLAY_IDS
+            self._seen = {seen for seen in self._seen if seen > low_water_mark}
+        self.events += 1
+        self.last_event_at = time.time()
+        self._pending.append(event)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        return True
+
+    async def _flush(self):
+        # Runs after the notifications already queued in this loop iteration
+        await asyncio.sleep(0)
+        events, self._pending, self._flush_task = self._pending, [], None
+        self.batches += 1
+        try:
+            await self.handler(events)
+        except Exception as e:
+            self.errors += 1
+            print(f"Change feed {self.name}: handler failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.name,
+            "connected": self.connected,
+            "version": self.version,
+            "events": self.events,
+            "batches": self.batches,
+            "caught_up": self.caught_up,
+            "duplicates": self.duplicates,
+            "reconnects": self.reconnects,
+            "errors": self.errors,
+            "last_event_at": self.last_event_at,
+        }
+
+def start_change_feeds(handler: ChangeHandler) -> List[ChangeFeedListener]:
+    """Start a listener for every source with a configured database URL"""
+    listeners = []
+    for name, variable in CHANGE_FEED_SOURCES.items():
+        dsn = os.getenv(variable)
+        if dsn:
+            listener = ChangeFeedListener(name, dsn, handler)
+            listener.start()
+            listeners.append(listener)
+    return listeners
+
+async def stop_change_feeds(listeners: List[ChangeFeedListener]):
+    for listener in listeners:
+        await listener.stop()
@@ -1,48 +1,13 @@
-import httpx
 import os
-import json
-from typing import Dict, Any, Optional
+from typing import List, Optional
 
-class GraphQLClient:
-    def __init__(self, url: str):
-        self.url = url
-        self.client = httpx.AsyncClient(timeout=30.0)
-        
-    async def execute_query(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Execute a GraphQL query against the specified endpoint"""
-        payload = {
-            "query": query,
-            "variables": variables or {}
-        }
-        
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
-        response = await self.client.post(
-            self.url,
-            headers=headers,
-            content=json.dumps(payload)
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"GraphQL request failed with status code {response.status_code}: {response.text}")
-        
-        result = response.json()
-        
-        if "errors" in result:
-            raise Exception(f"GraphQL query execution error: {result['errors']}")
-        
-        return result["data"]
-    
-    async def close(self):
-        await self.client.aclose()
+from .http_client import SharedHTTPClient, GraphQLClient
 
 # Client for Room Service
 class RoomServiceClient:
-    def __init__(self):
+    def __init__(self, http_client: SharedHTTPClient):
         room_service_url = os.getenv("ROOM_SERVICE_URL", "http://localhost:8000/graphql") # Corrected port to 8000
-        self.client = GraphQLClient(room_service_url)
+        self.client = GraphQLClient(room_service_url, http_client)
     
     async def get_room(self, room_id: int):
         query = """
@@ -59,6 +24,37 @@ class RoomServiceClient:
         variables = {"id": room_id}
         result = await self.client.execute_query(query, variables)
         return result["room"]
+
+    async def get_rooms_by_ids(self, room_ids: List[int]):
+        query = """
+        query GetRoomsByIds($ids: [Int!]!) {
+            roomsByIds(ids: $ids) {
+                id
+                roomNumber
+                roomType
+                pricePerNight
+                status
+            }
+        }
+        """
+        variables = {"ids": room_ids}
+        result = await self.client.execute_query(query, variables)
+        return result["roomsByIds"]
+    
+    async def get_rooms(self):
+        query = """
+        query {
+            rooms {
+                id
+                roomNumber
+                roomType
+                pricePerNight
+                status
+            }
+        }
+        """
+        result = await self.client.execute_query(query)
+        return result["rooms"]
     
     async def get_available_rooms(self):
         query = """
@@ -81,6 +77,8 @@ class RoomServiceClient:
             updateRoom(id: $id, roomData: $roomData) {
                 id
                 roomNumber
+                roomType
+                pricePerNight
                 status
             }
         }
@@ -91,15 +89,31 @@ class RoomServiceClient:
         }
         result = await self.client.execute_query(mutation, variables)
         return result["updateRoom"]
-    
-    async def close(self):
-        await self.client.close()
+
+    async def update_room_statuses(self, room_ids: List[int], status: str, expected_status: Optional[str] = None):
+        """Set the status of many rooms with one set-based update; returns the rooms that changed"""
+        if not room_ids:
+            return []
+        mutation = """
+        mutation UpdateRoomStatuses($ids: [Int!]!, $status: String!, $expectedStatus: String) {
+            updateRoomStatuses(ids: $ids, status: $status, expectedStatus: $expectedStatus) {
+                id
+                roomNumber
+                roomType
+                pricePerNight
+                status
+            }
+        }
+        """
+        variables = {"ids": room_ids, "status": status, "expectedStatus": expected_status}
+        result = await self.client.execute_query(mutation, variables)
+        return result["updateRoomStatuses"]
 
 # Client for Guest Service
 class GuestServiceClient:
-    def __init__(self):
+    def __init__(self, http_client: SharedHTTPClient):
         guest_service_url = os.getenv("GUEST_SERVICE_URL", "http://localhost:8001/graphql") # Corrected port to 8001
-        self.client = GraphQLClient(guest_service_url)
+        self.client = GraphQLClient(guest_service_url, http_client)
     
     async def get_guest(self, guest_id: int):
         query = """
@@ -116,6 +130,19 @@ class GuestServiceClient:
         variables = {"id": guest_id}
         result = await self.client.execute_query(query, variables)
         return result["guest"]
-    
-    async def close(self):
-        await self.client.close()
+
+    async def get_guests_by_ids(self, guest_ids: List[int]):
+        query = """
+        query GetGuestsByIds($ids: [Int!]!) {
+            guestsByIds(ids: $ids) {
+                id
+                fullName
+                email
+                phone
+                address
+            }
+        }
+        """
+        variables = {"ids": guest_ids}
+        result = await self.client.execute_query(query, variables)
+        return result["guestsByIds"]
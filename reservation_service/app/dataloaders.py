@@ -0,0 +1,21 @@
+from typing import Dict, Any, List, Optional
+from strawberry.dataloader import DataLoader
+
+from .client import RoomServiceClient, GuestServiceClient
+
+# DataLoaders collect the room/guest ids requested by every ReservationType
+# resolved in the same tick and fetch them with a single batched call per
+# downstream service. They cache per instance, so create new ones per request.
+
+def create_loaders(room_service_client: RoomServiceClient, guest_service_client: GuestServiceClient) -> Dict[str, DataLoader]:
+    async def load_rooms(room_ids: List[int]) -> List[Optional[Dict[str, Any]]]:
+        # roomsByIds returns one entry per requested id, in request order
+        return await room_service_client.get_rooms_by_ids(list(room_ids))
+
+    async def load_guests(guest_ids: List[int]) -> List[Optional[Dict[str, Any]]]:
+        return await guest_service_client.get_guests_by_ids(list(guest_ids))
+
+    return {
+        "room_loader": DataLoader(load_fn=load_rooms),
+        "guest_loader": DataLoader(load_fn=load_guests),
+    }
@@ -0,0 +1,99 @@
+import argparse
+import re
+import sys
+from datetime import date, timedelta
+from sqlalchemy import insert, text
+
+from .db import SessionLocal
+from .models import Reservation, active_stay_filter
+from .pagination import DEFAULT_PAGE_SIZE
+
+# EXPLAIN each resolver query against seeded rows and fail if a lookup scans the whole table.
+# The seed rows live in the check's own transaction and are rolled back when it ends, but
+# run it against a development database anyway: the seeding takes write locks.
+#
+#   python -m app.explain_check [--rows 20000] [--verbose]
+
+DEFAULT_ROWS = 20000
+SEED_ROOMS = 500
+SEED_GUESTS = 2000
+
+def seed(db, rows: int):
+    """Insert ``rows`` back-to-back stays spread over the rooms, mostly finished ones as in a real history"""
+    first_day = date.today() - timedelta(days=3 * rows // SEED_ROOMS)
+    statuses = ["checked-out"] * 16 + ["cancelled"] * 3 + ["confirmed"]
+    db.execute(insert(Reservation), [
+        {
+            "guest_id": i % SEED_GUESTS + 1,
+            "room_id": i % SEED_ROOMS + 1,
+            # Each room gets consecutive two-night stays, so active ones never overlap
+            "check_in_date": first_day + timedelta(days=3 * (i // SEED_ROOMS)),
+            "check_out_date": first_day + timedelta(days=3 * (i // SEED_ROOMS) + 2),
+            "status": statuses[i % len(statuses)]
+        }
+        for i in range(rows)
+    ])
+
+def resolver_queries(db):
+    """The table each resolver reads and its query"""
+    return {
+        "reservationsByGuest": ("reservations", db.query(Reservation).filter(Reservation.guest_id == 7)),
+        "reservationsByRoom": ("reservations", db.query(Reservation).filter(Reservation.room_id == 7)),
+        "reservationsConnection(status)": (
+            "reservations",
+            db.query(Reservation).filter(Reservation.status == "cancelled").order_by(Reservation.id).limit(DEFAULT_PAGE_SIZE + 1)
+        ),
+        # Startup load of the in-memory availability index
+        "availability index": (
+            "reservations",
+            db.query(
+                Reservation.id, Reservation.room_id, Reservation.check_in_date, Reservation.check_out_date
+            ).filter(active_stay_filter())
+        ),
+    }
+
+def explain(db, query):
+    """Plan lines of ``query``, from EXPLAIN on PostgreSQL or EXPLAIN QUERY PLAN on SQLite"""
+    dialect = db.get_bind().dialect
+    compiled = query.statement.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if dialect.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if dialect.name == "sqlite":
+        rows = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).fetchall()
+        return [row[-1] for row in rows]
+    rows = db.connection().exec_driver_sql("EXPLAIN " + str(compiled), params).fetchall()
+    return [row[0] for row in rows]
+
+def full_scans(plan, table: str):
+    """Plan lines that read every row of ``table``"""
+    pattern = re.compile(rf"Seq Scan on {table}\b|^SCAN (TABLE )?{table}\b")
+    return [line for line in plan if pattern.search(line.strip()) and "INDEX" not in line]
+
+def run_check(db, rows: int = DEFAULT_ROWS, verbose: bool = False) -> bool:
+    seed(db, rows)
+    db.execute(text("ANALYZE"))
+    ok = True
+    for name, (table, query) in resolver_queries(db).items():
+        plan = explain(db, query)
+        scans = full_scans(plan, table)
+        ok = ok and not scans
+        print(f"{'FULL SCAN' if scans else 'ok':9} {name}")
+        for line in plan if verbose or scans else []:
+            print(f"          {line}")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN the reservation resolver queries against seeded data")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--verbose", action="store_true", help="print every plan, not only failing ones")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        ok = run_check(db, rows=args.rows, verbose=args.verbose)
+    finally:
+        # Never keep the seed rows
+        db.rollback()
+        db.close()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterator, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from .db import engine
+from .models import Reservation
+
+# Streaming exports for accounting.
+#
+# Rows are read through a server-side cursor (psycopg2 named cursor via stream_results) in
+# chunks of EXPORT_CHUNK_SIZE, and every chunk is written to the response as soon as it is
+# formatted, so memory use doesn't grow with the size of the table. The generators are
+# synchronous; StreamingResponse runs them in the threadpool, off the event loop.
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 1000))
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def stream_chunks(statement) -> Iterator[list]:
+    """Rows of a Core statement, EXPORT_CHUNK_SIZE at a time, from a server-side cursor"""
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_SIZE).execute(statement)
+        for chunk in result.partitions():
+            yield chunk
+
+def ndjson_lines(statement) -> Iterator[str]:
+    for chunk in stream_chunks(statement):
+        yield "".join(json.dumps({key: _json_value(value) for key, value in row._mapping.items()}) + "\n" for row in chunk)
+
+def csv_lines(statement) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(statement.selected_columns.keys())
+    for chunk in stream_chunks(statement):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Only the header when there are no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_response(statement, name: str, fmt: str) -> StreamingResponse:
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail=f"Unknown export format {fmt!r}; use ndjson or csv")
+    lines = ndjson_lines(statement) if fmt == "ndjson" else csv_lines(statement)
+    return StreamingResponse(
+        lines,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    )
+
+export_router = APIRouter(prefix="/export")
+
+@export_router.get("/reservations.{fmt}")
+def export_reservations(
+    fmt: str,
+    status: Optional[str] = None,
+    since: Optional[date] = Query(None, description="first check-out date to include"),
+    until: Optional[date] = Query(None, description="last check-out date to include")
+):
+    """All reservations in id order, optionally filtered by status and check-out date"""
+    table = Reservation.__table__
+    statement = select(
+        table.c.id, table.c.guest_id, table.c.room_id, table.c.check_in_date, table.c.check_out_date, table.c.status
+    ).order_by(table.c.id)
+    if status is not None:
+        statement = statement.where(table.c.status == status)
+    if since is not None:
+        statement = statement.where(table.c.check_out_date >= since)
+    if until is not None:
+        statement = statement.where(table.c.check_out_date <= until)
+    return export_response(statement, "reservations", fmt)
@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Any, Optional, Set
+from urllib.parse import urlsplit
+
+import httpx
+
+# One SharedHTTPClient is created per process in the FastAPI lifespan and shared by every
+# downstream service client, so connections are pooled and kept alive across requests.
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+def _error_codes(response: httpx.Response) -> Set[str]:
+    """extensions.code of the GraphQL errors in a response"""
+    try:
+        errors = response.json().get("errors") or []
+    except ValueError:
+        return set()
+    return {(error.get("extensions") or {}).get("code") for error in errors if isinstance(error, dict)}
+
+# Bodies of a 400 response to a hash-only request from a server without persisted queries:
+# it reports them as unsupported, or it looks for the query text and finds none (Strawberry)
+PERSISTED_QUERY_UNSUPPORTED_MESSAGES = ("persisted quer", "no graphql query found")
+
+def _persisted_queries_unsupported(response: httpx.Response) -> bool:
+    """Whether a response to a hash-only request says the endpoint only accepts query texts"""
+    if "PERSISTED_QUERY_NOT_SUPPORTED" in _error_codes(response):
+        return True
+    if response.status_code != 400:
+        return False
+    body = response.text.lower()
+    return any(message in body for message in PERSISTED_QUERY_UNSUPPORTED_MESSAGES)
+
+class HostMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.waiting = 0
+        self.total_wait_seconds = 0.0
+        self.total_request_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "waiting": self.waiting,
+            "avg_wait_ms": round(self.total_wait_seconds * 1000 / self.requests, 3) if self.requests else 0.0,
+            "avg_request_ms": round(self.total_request_seconds * 1000 / self.requests, 3) if self.requests else 0.0,
+        }
+
+class SharedHTTPClient:
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        per_host_concurrency: int = 50,
+        http2: bool = False,
+        timeout: float = 30.0,
+        persisted_queries: bool = True
+    ):
+        self.max_connections = max_connections
+        # Send query hashes instead of query texts (automatic persisted queries)
+        self.persisted_queries = persisted_queries
+        self._persisted_query_unsupported = set()
+        self.per_host_concurrency = per_host_concurrency
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("HTTP/2 requested but the h2 package is not installed, falling back to HTTP/1.1")
+                http2 = False
+        self.http2 = http2
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            )
+        )
+        # Per-host semaphores keep one slow downstream service from taking the whole pool
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._metrics: Dict[str, HostMetrics] = {}
+
+    @classmethod
+    def from_env(cls) -> "SharedHTTPClient":
+        return cls(
+            max_connections=_env_int("HTTP_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=_env_int("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20),
+            keepalive_expiry=_env_float("HTTP_KEEPALIVE_EXPIRY", 30.0),
+            per_host_concurrency=_env_int("HTTP_PER_HOST_CONCURRENCY", 50),
+            http2=os.getenv("HTTP_HTTP2", "false").lower() in ("1", "true", "yes"),
+            timeout=_env_float("HTTP_TIMEOUT", 30.0),
+            persisted_queries=os.getenv("HTTP_PERSISTED_QUERIES", "true").lower() in ("1", "true", "yes")
+        )
+
+    def _host(self, url: str) -> str:
+        return urlsplit(url).netloc
+
+    def _semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host_concurrency)
+            self._metrics[host] = HostMetrics()
+        return self._semaphores[host]
+
+    async def post_json(self, url: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """POST a JSON payload through the shared pool, bounded by the per-host semaphore"""
+        host = self._host(url)
+        semaphore = self._semaphore(host)
+        metrics = self._metrics[host]
+
+        metrics.waiting += 1
+        wait_started = time.perf_counter()
+        async with semaphore:
+            metrics.waiting -= 1
+            metrics.total_wait_seconds += time.perf_counter() - wait_started
+            metrics.requests += 1
+            metrics.in_flight += 1
+            metrics.max_in_flight = max(metrics.max_in_flight, metrics.in_flight)
+            started = time.perf_counter()
+            try:
+                return await self.client.post(
+                    url,
+                    headers={"Content-Type": "application/json", **(headers or {})},
+                    content=json.dumps(payload)
+                )
+            except Exception:
+                metrics.errors += 1
+                raise
+            finally:
+                metrics.in_flight -= 1
+                metrics.total_request_seconds += time.perf_counter() - started
+
+    async def execute_query(self, url: str, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Execute a GraphQL query against the specified endpoint.
+
+        With persisted queries only the query hash is sent; the query text follows in a second
+        request the first time an endpoint doesn't know the hash, which registers it there.
+        """
+        payload = {"variables": variables or {}}
+        if self.persisted_queries and url not in self._persisted_query_unsupported:
+            payload["extensions"] = {
+                "persistedQuery": {"version": 1, "sha256Hash": hashlib.sha256(query.encode("utf-8")).hexdigest()}
+            }
+            response = await self.post_json(url, payload)
+            if _persisted_queries_unsupported(response):
+                # The endpoint wants query texts; stop sending it hashes
+                print(f"Persisted queries not supported by {url}, sending full queries")
+                self._persisted_query_unsupported.add(url)
+                del payload["extensions"]
+            elif "PERSISTED_QUERY_NOT_FOUND" not in _error_codes(response):
+                # Any other error fails this request only, like a request with the query text
+                return self._result_data(response)
+        payload["query"] = query
+        return self._result_data(await self.post_json(url, payload))
+
+    def _result_data(self, response: httpx.Response) -> Dict[str, Any]:
+        if response.status_code != 200:
+            raise Exception(f"GraphQL request failed with status code {response.status_code}: {response.text}")
+
+        result = response.json()
+
+        if "errors" in result:
+            raise Exception(f"GraphQL query execution error: {result['errors']}")
+
+        return result["data"]
+
+    def metrics(self) -> Dict[str, Any]:
+        """Pool utilization and per-host request counters"""
+        in_flight = sum(m.in_flight for m in self._metrics.values())
+        pool = {"max_connections": self.max_connections, "in_flight": in_flight, "utilization": round(in_flight / self.max_connections, 3)}
+        # httpx does not expose its pool publicly; report live connections when the transport allows it
+        connections = getattr(getattr(self.client._transport, "_pool", None), "connections", None)
+        if connections is not None:
+            pool["open_connections"] = len(connections)
+            pool["idle_connections"] = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "http2": self.http2,
+            "persisted_queries": self.persisted_queries,
+            "persisted_queries_unsupported": sorted(self._persisted_query_unsupported),
+            "per_host_concurrency": self.per_host_concurrency,
+            "pool": pool,
+            "hosts": {host: m.as_dict() for host, m in self._metrics.items()}
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
+
+class GraphQLClient:
+    """Binds a GraphQL endpoint URL to the shared HTTP client"""
+    def __init__(self, url: str, http_client: SharedHTTPClient):
+        self.url = url
+        self.http_client = http_client
+
+    async def execute_query(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self.http_client.execute_query(self.url, query, variables)
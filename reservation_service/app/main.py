@@ -1,14 +1,26 @@
 from fastapi import FastAPI, Request
+from starlette.requests import HTTPConnection
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from datetime import date, timedelta
 from contextlib import asynccontextmanager
 
-from .db import engine, Base, get_db, wait_for_db
+from .db import engine, Base, get_db, get_request_db, wait_for_db, run_migrations
 from .models import Reservation
-from .schema import schema # Import the schema object directly
-from strawberry.fastapi import GraphQLRouter
+from .schema import schema, response_cache # Import the schema object directly
 from .client import RoomServiceClient, GuestServiceClient
+from .http_client import SharedHTTPClient
+from .dataloaders import create_loaders
+from .availability import availability_index
+from .persisted_queries import PersistedQueryRouter, query_cache
+from .query_cost import cost_throttle
+from .change_feed import start_change_feeds, stop_change_feeds
+from .export import export_router
+from .pubsub import pubsub
+
+async def invalidate_changed(events):
+    """Drop cached responses containing rooms or guests changed in their own services"""
+    await response_cache.invalidate(event["entity"] for event in events)
 
 # Lifespan context manager
 @asynccontextmanager
@@ -16,15 +28,17 @@ async def lifespan(app: FastAPI):
     # Startup: Initialize clients and database
     print("Application startup: Initializing clients and database...")
     
-    app.state.room_service_client = RoomServiceClient()
-    app.state.guest_service_client = GuestServiceClient()
+    # Both service clients share one pooled keep-alive HTTP client
+    app.state.http_client = SharedHTTPClient.from_env()
+    app.state.room_service_client = RoomServiceClient(app.state.http_client)
+    app.state.guest_service_client = GuestServiceClient(app.state.http_client)
     print("Service clients initialized.")
 
     # Wait for database to be ready
     print("Waiting for database to be ready...")
     if wait_for_db():
-        print("Creating database tables...")
-        Base.metadata.create_all(bind=engine)
+        print("Running database migrations...")
+        run_migrations()
         
         print("Adding sample data...")
         db_session = next(get_db())
@@ -52,22 +66,30 @@ async def lifespan(app: FastAPI):
                 print("Sample data added successfully")
         except Exception as e:
             print(f"Error adding sample data: {e}")
+
+        try:
+            # Build the in-memory availability index from the active reservations
+            count = availability_index.load(db_session)
+            print(f"Availability index loaded with {count} active reservations")
+        except Exception as e:
+            print(f"Error loading availability index: {e}")
         finally:
             db_session.close()
     else:
         print("Failed to connect to database. Service may not function correctly.")
+
+    # LISTEN for room and guest changes committed in their services
+    app.state.change_feeds = start_change_feeds(invalidate_changed)
     
     print("Application startup complete.")
     yield  # Application is running
 
     # Shutdown: Close clients
+    await stop_change_feeds(app.state.change_feeds)
     print("Application shutdown: Closing service clients...")
-    if hasattr(app.state, 'room_service_client') and app.state.room_service_client:
-        await app.state.room_service_client.close()
-        print("Room service client closed.")
-    if hasattr(app.state, 'guest_service_client') and app.state.guest_service_client:
-        await app.state.guest_service_client.close()
-        print("Guest service client closed.")
+    if hasattr(app.state, 'http_client') and app.state.http_client:
+        await app.state.http_client.aclose()
+        print("Shared HTTP client closed.")
     print("Application shutdown complete.")
 
 # Create FastAPI app with lifespan manager
@@ -82,26 +104,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Define context getter for Strawberry
-async def get_context(request: Request):
-    db_session = next(get_db())
-    try:
+# Define context getter for Strawberry; HTTPConnection covers both requests and subscription WebSockets
+async def get_context(request: HTTPConnection):
+    room_service_client = request.app.state.room_service_client
+    guest_service_client = request.app.state.guest_service_client
+    async for db_session in get_request_db():
         yield {
-            "room_service_client": request.app.state.room_service_client,
-            "guest_service_client": request.app.state.guest_service_client,
-            "db": db_session
+            "room_service_client": room_service_client,
+            "guest_service_client": guest_service_client,
+            "db": db_session,
+            # Fresh loaders per request so batching/caching never leaks across requests
+            **create_loaders(room_service_client, guest_service_client)
         }
-    finally:
-        db_session.close()
 
 # Include GraphQL router
-graphql_app = GraphQLRouter(schema, context_getter=get_context)
+graphql_app = PersistedQueryRouter(schema, context_getter=get_context)
 app.include_router(graphql_app, prefix="/graphql")
 
+# Streaming CSV/NDJSON exports
+app.include_router(export_router)
+
 # Health check endpoint
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "service": "reservation_service"}
 
+# Connection pool utilization of the shared downstream HTTP client
+@app.get("/metrics/http-client")
+def http_client_metrics(request: Request):
+    return request.app.state.http_client.metrics()
+
+# Persisted query and parsed-document cache counters
+@app.get("/metrics/query-cache")
+def query_cache_metrics():
+    return query_cache.stats()
+
+# Query cost throttle (QUERY_COST_RATE) state and counters
+@app.get("/metrics/query-cost")
+def query_cost_metrics():
+    return cost_throttle.stats()
+
+# Response cache hit ratio and memory use
+@app.get("/metrics/response-cache")
+async def response_cache_metrics():
+    return await response_cache.stats()
+
+# Open GraphQL subscriptions and queued/dropped events
+@app.get("/metrics/subscriptions")
+def subscription_metrics():
+    return pubsub.stats()
+
+# Room and guest change feed listeners
+@app.get("/metrics/change-feed")
+def change_feed_metrics(request: Request):
+    return [listener.stats() for listener in request.app.state.change_feeds]
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
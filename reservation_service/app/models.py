@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Computed, DDL, Index, bindparam, event, literal_column
+from sqlalchemy.dialects.postgresql import DATERANGE, ExcludeConstraint
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 from typing import Optional
 from sqlmodel import Field, SQLModel
 from datetime import date
@@ -6,13 +9,84 @@ from datetime import date
 # Import Base from db.py instead of creating a new one
 from .db import Base
 
+# Reservations in these statuses occupy their room; others never conflict
+ACTIVE_STATUSES = ("confirmed", "checked-in")
+
+class stay_range_of(FunctionElement):
+    """Generation expression of Reservation.stay_range for the current dialect"""
+    name = "stay_range_of"
+    inherit_cache = True
+
+@compiles(stay_range_of, "postgresql")
+def _compile_stay_range_postgresql(element, compiler, **kw):
+    check_in, check_out = element.clauses
+    # Half-open, so a check-out and the next check-in may share a day
+    return "daterange(%s, %s, '[)')" % (compiler.process(check_in, **kw), compiler.process(check_out, **kw))
+
+@compiles(stay_range_of)
+def _compile_stay_range_default(element, compiler, **kw):
+    # Databases without range types (SQLite for local runs) store a readable text form
+    check_in, check_out = element.clauses
+    return "%s || '/' || %s" % (compiler.process(check_in, **kw), compiler.process(check_out, **kw))
+
+@compiles(ExcludeConstraint, "sqlite")
+def _skip_exclude_constraint_sqlite(element, compiler, **kw):
+    # Exclusion constraints are PostgreSQL only; returning None omits it from CREATE TABLE
+    return None
+
 class Reservation(Base):
     """Reservation model based on the ERD"""
     __tablename__ = "reservations"
-    
+
     id = Column(Integer, primary_key=True, autoincrement=True)
     guest_id = Column(Integer, nullable=False)  # Reference to Guest in guest_service
     room_id = Column(Integer, nullable=False)  # Reference to Room in room_service
     check_in_date = Column(Date, nullable=False)
     check_out_date = Column(Date, nullable=False)
     status = Column(String, nullable=False)  # confirmed, checked-in, checked-out, cancelled
+    # Generated by the database from the stay dates, never written by the application
+    stay_range = Column(
+        DATERANGE().with_variant(String, "sqlite"),
+        Computed(stay_range_of(literal_column("check_in_date"), literal_column("check_out_date")), persisted=True)
+    )
+
+    __table_args__ = (
+        # Two active reservations of the same room may not overlap; enforced by a GiST index
+        ExcludeConstraint(
+            (room_id, "="),
+            (stay_range, "&&"),
+            name="reservations_no_overlap",
+            using="gist",
+            where=literal_column("status").in_(ACTIVE_STATUSES)
+        ),
+        # Created by the Alembic migrations in migrations/versions; keep the two in step
+        # reservationsByGuest
+        Index("ix_reservations_guest_id", "guest_id"),
+        # reservationsByRoom, which also lists a room's stays in date order
+        Index("ix_reservations_room_id_check_in_date", "room_id", "check_in_date"),
+        # reservationsConnection(status) pages by id within a status
+        Index("ix_reservations_status_id", "status", "id"),
+        # Active stays are a small slice of the table, so loading the availability index
+        # reads this small partial index instead of every past reservation
+        Index(
+            "ix_reservations_active_stay",
+            "room_id", "check_in_date", "check_out_date",
+            postgresql_where=literal_column("status").in_(ACTIVE_STATUSES),
+            sqlite_where=literal_column("status").in_(ACTIVE_STATUSES)
+        ),
+    )
+
+# Equality on an integer inside a GiST index needs the btree_gist extension
+event.listen(
+    Reservation.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql")
+)
+
+def active_stay_filter():
+    """``status IN ACTIVE_STATUSES`` with the statuses rendered inline.
+
+    The planner can only use the partial index on active stays when it can see that the
+    query's condition matches the index's, which a bound parameter hides.
+    """
+    return Reservation.status.in_(bindparam("active_statuses", ACTIVE_STATUSES, expanding=True, literal_execute=True))
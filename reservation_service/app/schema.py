@@ -1,12 +1,24 @@
 import strawberry
-from typing import List, Optional
+import asyncio
+import dataclasses
+from typing import AsyncGenerator, Dict, List, Optional
+from strawberry.dataloader import DataLoader
+from sqlalchemy import func, and_, insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import date
 from .models import Reservation
-from .db import get_db
+from .db import get_db, run_db, fetch_by_ids
+from .pagination import Connection, paginate
+from .availability import availability_index, ensure_loaded, ACTIVE_STATUSES
 from fastapi import Depends
 from strawberry.fastapi import GraphQLRouter
 from .client import RoomServiceClient, GuestServiceClient
+from .dataloaders import create_loaders
+from .persisted_queries import CachedDocuments
+from .query_cost import QueryCost, REMOTE, all_rows
+from .response_cache import ResponseCache, cached, invalidates
+from .pubsub import pubsub
 import logging
 
 # Configure basic logging
@@ -57,9 +69,14 @@ class ReservationType:
     check_in_date: date
     check_out_date: date
     status: str
+    # Loaders of a subscription event; None resolves through the request's loaders in the context
+    loaders: strawberry.Private[Optional[Dict[str, DataLoader]]] = None
 
-    # Field resolvers for guest and room
-    @strawberry.field
+    def loader(self, info, name: str) -> DataLoader:
+        return (self.loaders or info.context)[name]
+
+    # Field resolvers for guest and room, batched through the per-request DataLoaders
+    @strawberry.field(metadata={**REMOTE, **cached("Guest")})
     async def guest(self, info) -> Optional[GuestType]:
         if self.guest_id is None:
             logger.info(f"Guest ID is None for reservation, skipping guest fetch.")
@@ -67,8 +84,7 @@ class ReservationType:
         
         try:
             logger.info(f"Attempting to fetch guest {self.guest_id} for reservation {self.id}")
-            guest_client = info.context["guest_service_client"]
-            guest_data = await guest_client.get_guest(self.guest_id)
+            guest_data = await self.loader(info, "guest_loader").load(self.guest_id)
             if guest_data:
                 logger.info(f"Successfully fetched guest {self.guest_id}: {guest_data}")
                 return GuestType(
@@ -87,7 +103,7 @@ class ReservationType:
             # Client lifecycle is managed by FastAPI lifespan, no need to close here
             logger.info(f"Finished attempt to fetch guest {self.guest_id}")
 
-    @strawberry.field
+    @strawberry.field(metadata={**REMOTE, **cached("Room")})
     async def room(self, info) -> Optional[RoomType]:
         if self.room_id is None:
             logger.info(f"Room ID is None for reservation, skipping room fetch.")
@@ -95,8 +111,7 @@ class ReservationType:
 
         try:
             logger.info(f"Attempting to fetch room {self.room_id} for reservation {self.id}")
-            room_client = info.context["room_service_client"]
-            room_data = await room_client.get_room(self.room_id)
+            room_data = await self.loader(info, "room_loader").load(self.room_id)
             if room_data:
                 logger.info(f"Successfully fetched room {self.room_id}: {room_data}")
                 return RoomType(
@@ -115,6 +130,30 @@ class ReservationType:
             # Client lifecycle is managed by FastAPI lifespan, no need to close here
             logger.info(f"Finished attempt to fetch room {self.room_id}")
 
+# Dashboard aggregate type
+@strawberry.type
+class ReservationStatisticsType:
+    total_reservations: int
+    active_reservations: int
+    upcoming_reservations: int
+    completed_reservations: int
+    cancelled_reservations: int
+
+# Per-item outcome of a group booking; index is the item's position in the request
+@strawberry.type
+class ReservationResultType:
+    index: int
+    success: bool
+    reservation: Optional[ReservationType] = None
+    error: Optional[str] = None
+
+# Subscription payload; operation is create, update or delete, and reservation is None after a delete
+@strawberry.type
+class ReservationChangeType:
+    operation: str
+    id: int
+    reservation: Optional[ReservationType] = None
+
 # Convert database model to GraphQL type
 def reservation_to_graphql(reservation: Reservation) -> ReservationType:
     return ReservationType(
@@ -126,193 +165,438 @@ def reservation_to_graphql(reservation: Reservation) -> ReservationType:
         status=reservation.status
     )
 
+# Pub/sub topic of committed reservation changes
+RESERVATION_TOPIC = "reservation"
+
+def publish_change(operation: str, id: int, reservation: Optional[ReservationType] = None):
+    pubsub.publish(RESERVATION_TOPIC, ReservationChangeType(operation=operation, id=id, reservation=reservation))
+
+# Roll back a failed write so the request session stays usable
+def rollback_if_active(db):
+    if db.in_transaction():
+        db.rollback()
+
+# SQLSTATE raised by the reservations_no_overlap exclusion constraint
+EXCLUSION_VIOLATION = "23P01"
+
+def is_overlap_violation(error) -> bool:
+    """True if ``error`` is the database rejecting an overlapping booking (psycopg2 or asyncpg)"""
+    if not isinstance(error, IntegrityError):
+        return False
+    sqlstate = getattr(error.orig, "pgcode", None) or getattr(error.orig.__cause__, "sqlstate", None)
+    return sqlstate == EXCLUSION_VIOLATION
+
+async def no_fetch():
+    return None
+
+def prime_related(info, rooms=(), guests=()):
+    """Seed the request's DataLoaders with rooms/guests the mutation already has, skipping failed or empty results"""
+    for room in rooms:
+        if isinstance(room, dict) and room.get("roomType") is not None:
+            info.context["room_loader"].prime(room["id"], room, force=True)
+    for guest in guests:
+        if isinstance(guest, Exception):
+            # The guest field will retry through the loader
+            logger.warning(f"Guest fetch for mutation response failed: {guest}")
+        elif isinstance(guest, dict):
+            info.context["guest_loader"].prime(guest["id"], guest, force=True)
+
+def booking_conflict(room_id: int, check_in: date, check_out: date) -> Exception:
+    return Exception(f"Room {room_id} is already booked between {check_in} and {check_out}")
+
+RESERVATION_COLUMNS = ("guest_id", "room_id", "check_in_date", "check_out_date", "status")
+
+def reservation_key(values) -> tuple:
+    return tuple(values[column] for column in RESERVATION_COLUMNS)
+
+def insert_reservations(session, items: List[ReservationInput]):
+    """Insert reservations with a single multi-row INSERT and return the new rows in item order"""
+    values = [{column: getattr(item, column) for column in RESERVATION_COLUMNS} for item in items]
+    if session.get_bind().dialect.name == "postgresql":
+        table = Reservation.__table__
+        rows = session.execute(
+            insert(table).values(values).returning(
+                table.c.id, table.c.guest_id, table.c.room_id, table.c.check_in_date, table.c.check_out_date, table.c.status
+            )
+        ).all()
+        # RETURNING guarantees neither the order of the rows nor that of the ids, so match each
+        # row to its item by its values. Items with equal values get interchangeable rows.
+        rows_by_key = {}
+        for row in rows:
+            rows_by_key.setdefault(reservation_key(row._mapping), []).append(row)
+        return [rows_by_key[reservation_key(value)].pop(0) for value in values]
+    # Dialects without multi-row RETURNING (SQLite) fall back to the unit of work
+    reservations = [Reservation(**row) for row in values]
+    session.add_all(reservations)
+    session.flush()
+    return reservations
+
 # Queries
 @strawberry.type
 class Query:
-    @strawberry.field
+    @strawberry.field(metadata=cached("Reservation"))
     async def reservation(self, info, id: int) -> Optional[ReservationType]:
-        db = info.context["db"]
-        reservation = db.query(Reservation).filter(Reservation.id == id).first()
-        if not reservation:
-            return None
-        
-        return reservation_to_graphql(reservation)
+        def load(db):
+            reservation = db.query(Reservation).filter(Reservation.id == id).first()
+            if not reservation:
+                return None
+            
+            return reservation_to_graphql(reservation)
+        return await run_db(info.context["db"], load)
 
-    @strawberry.field
-    def reservations(self, info) -> List[ReservationType]:
-        db = info.context["db"]
-        reservations = db.query(Reservation).all()
-        return [reservation_to_graphql(reservation) for reservation in reservations]
+    @strawberry.field(metadata={**cached("Reservation"), **all_rows(Reservation)})
+    async def reservations(self, info) -> List[ReservationType]:
+        def load(db):
+            reservations = db.query(Reservation).all()
+            return [reservation_to_graphql(reservation) for reservation in reservations]
+        return await run_db(info.context["db"], load)
+
+    @strawberry.field(metadata=cached("Reservation"))
+    async def reservations_connection(self, info, first: Optional[int] = None, after: Optional[str] = None, status: Optional[str] = None, checked_out_since: Optional[date] = None) -> Connection[ReservationType]:
+        """Page through reservations by id; pass pageInfo.endCursor as ``after`` to get the next page.
+
+        ``checked_out_since`` keeps reservations with a check-out date on or after that day.
+        """
+        def build_query(db):
+            query = db.query(Reservation)
+            if status is not None:
+                query = query.filter(Reservation.status == status)
+            if checked_out_since is not None:
+                query = query.filter(Reservation.check_out_date >= checked_out_since)
+            return query
+        return await paginate(info.context["db"], build_query, Reservation, reservation_to_graphql, first, after)
+
+    @strawberry.field(metadata=cached("Reservation"))
+    async def reservation_statistics(self, info) -> ReservationStatisticsType:
+        """Reservation counts for the dashboard, computed in one aggregate query"""
+        today = date.today()
+        open_statuses = ["confirmed", "checked-in"]
+        # Active stays cover today; upcoming ones start after today
+        def load(db):
+            return db.query(
+                func.count(Reservation.id),
+                func.count(Reservation.id).filter(and_(
+                    Reservation.status.in_(open_statuses),
+                    Reservation.check_in_date <= today,
+                    Reservation.check_out_date > today
+                )),
+                func.count(Reservation.id).filter(and_(
+                    Reservation.status.in_(open_statuses),
+                    Reservation.check_in_date > today
+                )),
+                func.count(Reservation.id).filter(Reservation.status == "checked-out"),
+                func.count(Reservation.id).filter(Reservation.status == "cancelled")
+            ).one()
+        total, active, upcoming, completed, cancelled = await run_db(info.context["db"], load)
+        return ReservationStatisticsType(
+            total_reservations=total,
+            active_reservations=active,
+            upcoming_reservations=upcoming,
+            completed_reservations=completed,
+            cancelled_reservations=cancelled
+        )
+
+    @strawberry.field(metadata=cached("Reservation"))
+    async def reservations_by_ids(self, info, ids: List[int]) -> List[Optional[ReservationType]]:
+        """Fetch many reservations in one query, in the order of ``ids`` (None for unknown ids)"""
+        def load(db):
+            return [reservation_to_graphql(reservation) if reservation else None for reservation in fetch_by_ids(db, Reservation, ids)]
+        return await run_db(info.context["db"], load)
     
-    @strawberry.field
-    def reservations_by_guest(self, info, guest_id: int) -> List[ReservationType]:
-        db = info.context["db"]
-        reservations = db.query(Reservation).filter(Reservation.guest_id == guest_id).all()
-        return [reservation_to_graphql(reservation) for reservation in reservations]
+    @strawberry.field(metadata=cached("Reservation"))
+    async def reservations_by_guest(self, info, guest_id: int) -> List[ReservationType]:
+        def load(db):
+            reservations = db.query(Reservation).filter(Reservation.guest_id == guest_id).all()
+            return [reservation_to_graphql(reservation) for reservation in reservations]
+        return await run_db(info.context["db"], load)
     
-    @strawberry.field
-    def reservations_by_room(self, info, room_id: int) -> List[ReservationType]:
-        db = info.context["db"]
-        reservations = db.query(Reservation).filter(Reservation.room_id == room_id).all()
-        return [reservation_to_graphql(reservation) for reservation in reservations]
+    @strawberry.field(metadata=cached("Reservation"))
+    async def reservations_by_room(self, info, room_id: int) -> List[ReservationType]:
+        def load(db):
+            reservations = db.query(Reservation).filter(Reservation.room_id == room_id).all()
+            return [reservation_to_graphql(reservation) for reservation in reservations]
+        return await run_db(info.context["db"], load)
+
+    @strawberry.field(metadata={**REMOTE, **cached("Reservation", "Room")})
+    async def available_rooms_for_dates(self, info, check_in: date, check_out: date, room_type: Optional[str] = None) -> List[RoomType]:
+        """Rooms with no active reservation overlapping [checkIn, checkOut), answered from the availability index"""
+        if check_out <= check_in:
+            raise Exception("checkOut must be after checkIn")
+        await run_db(info.context["db"], ensure_loaded)
+        rooms = await info.context["room_service_client"].get_rooms()
+        result = []
+        for room in rooms:
+            # Rooms under maintenance cannot be booked for any dates
+            if room["status"] == "maintenance" or (room_type and room["roomType"] != room_type):
+                continue
+            if availability_index.is_available(room["id"], check_in, check_out):
+                result.append(RoomType(
+                    id=room["id"],
+                    room_number=room["roomNumber"],
+                    room_type=room["roomType"],
+                    price_per_night=room["pricePerNight"],
+                    status=room["status"]
+                ))
+        return result
 
 # Mutations
 @strawberry.type
 class Mutation:
-    @strawberry.mutation
+    @strawberry.mutation(metadata=invalidates("Reservation", "Room"))
     async def create_reservation(self, info, reservation_data: ReservationInput) -> ReservationType:
         db = info.context["db"]
         room_service_client = info.context["room_service_client"]
         guest_service_client = info.context["guest_service_client"]
         try:
-            # Check room availability
-            room_data = await room_service_client.get_room(reservation_data.room_id)
-            if not room_data or room_data["status"] != "available":
+            # The room check and the guest for the response are independent, so fetch them together
+            room_data, guest_data = await asyncio.gather(
+                room_service_client.get_room(reservation_data.room_id),
+                guest_service_client.get_guest(reservation_data.guest_id),
+                return_exceptions=True
+            )
+            if isinstance(room_data, Exception):
+                raise room_data
+
+            # Check room availability: the room must be bookable and free for the requested dates
+            if not room_data or room_data["status"] == "maintenance":
                 raise Exception(f"Room {reservation_data.room_id} is not available")
+            await run_db(db, ensure_loaded)
+            if reservation_data.status in ACTIVE_STATUSES and not availability_index.is_available(
+                reservation_data.room_id, reservation_data.check_in_date, reservation_data.check_out_date
+            ):
+                raise booking_conflict(reservation_data.room_id, reservation_data.check_in_date, reservation_data.check_out_date)
 
             # Create reservation
-            reservation = Reservation(
-                guest_id=reservation_data.guest_id,
-                room_id=reservation_data.room_id,
-                check_in_date=reservation_data.check_in_date,
-                check_out_date=reservation_data.check_out_date,
-                status=reservation_data.status
-            )
-            db.add(reservation)
-            db.commit()
-            db.refresh(reservation)
-
-            # Update room status to reserved
-            await room_service_client.update_room_status(reservation_data.room_id, "reserved")
-            
-            # Convert to GraphQL type and fetch related data for response
-            graphql_reservation = reservation_to_graphql(reservation)
-            
-            # Fetch guest details for the response
-            guest_data = await guest_service_client.get_guest(reservation.guest_id)
-            if guest_data:
-                graphql_reservation.guest = GuestType(
-                    id=guest_data["id"],
-                    full_name=guest_data.get("fullName"),
-                    email=guest_data.get("email"),
-                    phone=guest_data.get("phone"),
-                    address=guest_data.get("address")
-                )
-            
-            # Room data for the response is already fetched and known
-            # Re-fetch to get the absolute latest, or use the one from check if acceptable
-            # For consistency, let's re-fetch, though room_data from above could be used if status is manually set to 'reserved'
-            updated_room_data = await room_service_client.get_room(reservation.room_id) 
-            if updated_room_data:
-                graphql_reservation.room = RoomType(
-                    id=updated_room_data["id"],
-                    room_number=updated_room_data["roomNumber"],
-                    room_type=updated_room_data["roomType"],
-                    price_per_night=updated_room_data["pricePerNight"],
-                    status=updated_room_data["status"] # This should now be 'reserved'
+            def create(session):
+                reservation = Reservation(
+                    guest_id=reservation_data.guest_id,
+                    room_id=reservation_data.room_id,
+                    check_in_date=reservation_data.check_in_date,
+                    check_out_date=reservation_data.check_out_date,
+                    status=reservation_data.status
                 )
+                session.add(reservation)
+                session.commit()
+                session.refresh(reservation)
+                availability_index.apply(reservation)
+                return reservation_to_graphql(reservation)
+            graphql_reservation = await run_db(db, create)
+            publish_change("create", graphql_reservation.id, graphql_reservation)
 
+            # Update room status to reserved; the mutation returns the updated room for the response
+            updated_room_data = await room_service_client.update_room_status(reservation_data.room_id, "reserved")
+
+            # Prime the loaders so the guest/room fields resolve without fetching again
+            prime_related(info, rooms=[updated_room_data], guests=[guest_data])
             return graphql_reservation
         except Exception as e:
             logger.error(f"Error creating reservation: {e}", exc_info=True)
-            if db.in_transaction():
-                db.rollback()
+            await run_db(db, rollback_if_active)
+            if is_overlap_violation(e):
+                # Another booking for an overlapping stay committed first
+                raise booking_conflict(reservation_data.room_id, reservation_data.check_in_date, reservation_data.check_out_date) from None
             raise e # Re-raise the exception to be caught by Strawberry's error handling
-        finally:
-            # Clients are managed by lifespan
-            pass
-                
-    @strawberry.mutation
+
+    @strawberry.mutation(metadata=invalidates("Reservation", "Room"))
+    async def create_reservations(self, info, items: List[ReservationInput]) -> List[ReservationResultType]:
+        """Group booking: one batched room lookup, one bulk insert and commit, one room status update"""
+        db = info.context["db"]
+        room_service_client = info.context["room_service_client"]
+        results: List[Optional[ReservationResultType]] = [None] * len(items)
+
+        def fail(index: int, message: str):
+            results[index] = ReservationResultType(index=index, success=False, error=message)
+
+        room_ids = list(dict.fromkeys(item.room_id for item in items))
+        rooms = dict(zip(room_ids, await room_service_client.get_rooms_by_ids(room_ids))) if room_ids else {}
+        await run_db(db, ensure_loaded)
+
+        # Validate every item up front, including overlaps between items of the same batch
+        accepted = []
+        batch_stays = {}
+        for index, item in enumerate(items):
+            room = rooms.get(item.room_id)
+            if item.check_out_date <= item.check_in_date:
+                fail(index, "checkOutDate must be after checkInDate")
+                continue
+            if not room or room["status"] == "maintenance":
+                fail(index, f"Room {item.room_id} is not available")
+                continue
+            if item.status in ACTIVE_STATUSES:
+                stays = batch_stays.setdefault(item.room_id, [])
+                overlaps_batch = any(check_in < item.check_out_date and item.check_in_date < check_out for check_in, check_out in stays)
+                if overlaps_batch or not availability_index.is_available(item.room_id, item.check_in_date, item.check_out_date):
+                    fail(index, str(booking_conflict(item.room_id, item.check_in_date, item.check_out_date)))
+                    continue
+                stays.append((item.check_in_date, item.check_out_date))
+            accepted.append(index)
+
+        def create(session):
+            try:
+                rows = insert_reservations(session, [items[index] for index in accepted])
+                session.commit()
+                inserted, conflicts = list(zip(accepted, rows)), []
+            except IntegrityError as e:
+                session.rollback()
+                if not is_overlap_violation(e):
+                    raise
+                # A concurrent booking took some of the stays: retry item by item so only those fail
+                inserted, conflicts = [], []
+                for index in accepted:
+                    try:
+                        with session.begin_nested():
+                            row = insert_reservations(session, [items[index]])[0]
+                        inserted.append((index, row))
+                    except IntegrityError as item_error:
+                        if not is_overlap_violation(item_error):
+                            raise
+                        conflicts.append(index)
+                session.commit()
+            for _, row in inserted:
+                availability_index.apply(row)
+            return [(index, reservation_to_graphql(row)) for index, row in inserted], conflicts
+
+        if accepted:
+            try:
+                inserted, conflicts = await run_db(db, create)
+            except Exception:
+                await run_db(db, rollback_if_active)
+                raise
+        else:
+            inserted, conflicts = [], []
+
+        for index in conflicts:
+            item = items[index]
+            fail(index, str(booking_conflict(item.room_id, item.check_in_date, item.check_out_date)))
+        for index, reservation in inserted:
+            results[index] = ReservationResultType(index=index, success=True, reservation=reservation)
+            publish_change("create", reservation.id, reservation)
+
+        # Mark all booked rooms reserved in one request, and reuse the returned rooms for the response
+        booked_room_ids = list(dict.fromkeys(reservation.room_id for _, reservation in inserted))
+        if booked_room_ids:
+            try:
+                updated_rooms = await room_service_client.update_room_statuses(booked_room_ids, "reserved")
+                info.context["room_loader"].prime_many({room["id"]: room for room in updated_rooms if room}, force=True)
+            except Exception as e:
+                # The reservations are committed; room status is informational next to the availability index
+                logger.error(f"Error updating room statuses for group booking: {e}", exc_info=True)
+
+        return results
+
+    @strawberry.mutation(metadata=invalidates("Reservation", "Room"))
     async def update_reservation(self, info, id: int, reservation_data: ReservationUpdateInput) -> Optional[ReservationType]:
         db = info.context["db"]
         room_service_client = info.context["room_service_client"]
         guest_service_client = info.context["guest_service_client"]
         
-        reservation = db.query(Reservation).filter(Reservation.id == id).first()
+        reservation = await run_db(db, lambda session: session.query(Reservation).filter(Reservation.id == id).first())
         if not reservation:
             raise Exception(f"Reservation with id {id} not found")
 
+        old_room_id = reservation.room_id
+        new_room_id = reservation_data.room_id if reservation_data.room_id is not None else reservation.room_id
+        new_guest_id = reservation_data.guest_id if reservation_data.guest_id is not None else reservation.guest_id
+        new_check_in = reservation_data.check_in_date or reservation.check_in_date
+        new_check_out = reservation_data.check_out_date or reservation.check_out_date
+        new_status = reservation_data.status or reservation.status
+        room_changed = new_room_id != old_room_id
+
+        # Fetch the new room (if the room changes) and the guest for the response together
+        new_room_data, guest_data = await asyncio.gather(
+            room_service_client.get_room(new_room_id) if room_changed else no_fetch(),
+            guest_service_client.get_guest(new_guest_id),
+            return_exceptions=True
+        )
+        if isinstance(new_room_data, Exception):
+            raise new_room_data
+        if room_changed and (not new_room_data or new_room_data["status"] == "maintenance"):
+            raise Exception(f"Room {new_room_id} is not available")
+
+        # Reject date/room changes that would overlap another active stay
+        await run_db(db, ensure_loaded)
+        if new_status in ACTIVE_STATUSES and not availability_index.is_available(new_room_id, new_check_in, new_check_out, exclude_reservation_id=reservation.id):
+            raise booking_conflict(new_room_id, new_check_in, new_check_out)
+
+        reservation.room_id = new_room_id
+        reservation.guest_id = new_guest_id
+        reservation.check_in_date = new_check_in
+        reservation.check_out_date = new_check_out
+        reservation.status = new_status
+
+        def save(session):
+            session.commit()
+            session.refresh(reservation)
+            availability_index.apply(reservation)
+            return reservation_to_graphql(reservation)
         try:
-            # Handle room status changes if room_id is updated
-            if reservation_data.room_id is not None and reservation_data.room_id != reservation.room_id:
-                # Check new room availability
-                new_room_data = await room_service_client.get_room(reservation_data.room_id)
-                if not new_room_data or new_room_data["status"] != "available":
-                    raise Exception(f"Room {reservation_data.room_id} is not available")
-                
-                # Update old room status to available
-                await room_service_client.update_room_status(reservation.room_id, "available")
-                
-                # Update new room status to reserved
-                await room_service_client.update_room_status(reservation_data.room_id, "reserved")
-                
-                reservation.room_id = reservation_data.room_id
-            
-            # Update other fields
-            if reservation_data.guest_id is not None:
-                reservation.guest_id = reservation_data.guest_id
-            if reservation_data.check_in_date is not None:
-                reservation.check_in_date = reservation_data.check_in_date
-            if reservation_data.check_out_date is not None:
-                reservation.check_out_date = reservation_data.check_out_date
-            if reservation_data.status is not None:
-                reservation.status = reservation_data.status
-                
-                # If status is changed to checked-out, update room status to available
-                if reservation_data.status == "checked-out":
-                    await room_service_client.update_room_status(reservation.room_id, "available")
-                
-            db.commit()
-            db.refresh(reservation)
-            
-            graphql_reservation = reservation_to_graphql(reservation)
-
-            # Fetch full details for the response using context clients
-            current_room_data = await room_service_client.get_room(reservation.room_id)
-            if current_room_data:
-                graphql_reservation.room = RoomType(
-                    id=current_room_data["id"],
-                    room_number=current_room_data["roomNumber"],
-                    room_type=current_room_data["roomType"],
-                    price_per_night=current_room_data["pricePerNight"],
-                    status=current_room_data["status"]
-                )
+            graphql_reservation = await run_db(db, save)
+        except IntegrityError as e:
+            await run_db(db, rollback_if_active)
+            if is_overlap_violation(e):
+                raise booking_conflict(new_room_id, new_check_in, new_check_out) from None
+            raise
+        publish_change("update", graphql_reservation.id, graphql_reservation)
 
-            current_guest_data = await guest_service_client.get_guest(reservation.guest_id)
-            if current_guest_data:
-                graphql_reservation.guest = GuestType(
-                    id=current_guest_data["id"],
-                    full_name=current_guest_data.get("fullName"),
-                    email=current_guest_data.get("email" ),
-                    phone=current_guest_data.get("phone"),
-                    address=current_guest_data.get("address")
-                )
-            
-            return graphql_reservation
-        finally:
-            # Clients are managed by lifespan
-            pass
+        # Room status changes: free the old room and reserve the new one, and free the room
+        # on check-out. The updates touch different rooms, so they run concurrently.
+        room_statuses = {}
+        if room_changed:
+            room_statuses[old_room_id] = "available"
+            room_statuses[new_room_id] = "reserved"
+        if reservation_data.status == "checked-out":
+            room_statuses[new_room_id] = "available"
+        updated_rooms = await asyncio.gather(*[
+            room_service_client.update_room_status(room_id, status) for room_id, status in room_statuses.items()
+        ])
+
+        prime_related(info, rooms=updated_rooms + ([new_room_data] if new_room_id not in room_statuses else []), guests=[guest_data])
+        return graphql_reservation
             
-    @strawberry.mutation
+    @strawberry.mutation(metadata=invalidates("Reservation", "Room"))
     async def delete_reservation(self, info, id: int) -> bool:
         db = info.context["db"]
         room_service_client = info.context["room_service_client"]
-        reservation = db.query(Reservation).filter(Reservation.id == id).first()
+        reservation = await run_db(db, lambda session: session.query(Reservation).filter(Reservation.id == id).first())
         if not reservation:
             return False
         
         # Update room status to available
         try:
             await room_service_client.update_room_status(reservation.room_id, "available")
-            db.delete(reservation)
-            db.commit()
-            return True
+            def delete(session):
+                session.delete(reservation)
+                session.commit()
+                availability_index.remove(reservation.id)
+                return True
+            deleted = await run_db(db, delete)
+            publish_change("delete", id)
+            return deleted
         finally:
             # Client is managed by lifespan
             pass
 
+# Subscriptions, served over WebSocket (graphql-transport-ws or graphql-ws) on the GraphQL endpoint
+@strawberry.type
+class Subscription:
+    @strawberry.subscription
+    async def reservation_changed(self, info, id: Optional[int] = None) -> AsyncGenerator[ReservationChangeType, None]:
+        """Every committed reservation change from this instance; pass ``id`` to follow a single reservation"""
+        async for change in pubsub.subscribe(RESERVATION_TOPIC):
+            if id is None or change.id == id:
+                # The context lives as long as the connection and the event is shared by every
+                # subscriber, so resolve guest and room of each event through a copy with its own
+                # loaders; the connection's loaders would serve them from the first event's cache
+                if change.reservation is not None:
+                    loaders = create_loaders(info.context["room_service_client"], info.context["guest_service_client"])
+                    change = dataclasses.replace(change, reservation=dataclasses.replace(change.reservation, loaders=loaders))
+                yield change
+
+# Responses of repeated queries, dropped when a mutation changes reservations or room statuses
+response_cache = ResponseCache.from_env("reservation")
+
 # Create GraphQL schema
-schema = strawberry.Schema(query=Query, mutation=Mutation)
+schema = strawberry.Schema(query=Query, mutation=Mutation, subscription=Subscription, extensions=[CachedDocuments, QueryCost, response_cache.extension()])
 
 # GraphQLRouter is now created in main.py with a new context_getter.
 # This file (schema.py) only needs to export the 'schema' object.
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""Baseline reservations table with the no-overlap exclusion constraint
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Databases created by the old Base.metadata.create_all startup already have the
+table. It is adopted, and on PostgreSQL the stay_range column and exclusion
+constraint are added if it predates them.
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import DATERANGE, ExcludeConstraint
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ACTIVE_STATUS_CONDITION = "status IN ('confirmed', 'checked-in')"
+
+def has_table(name: str) -> bool:
+    # Offline runs (alembic upgrade head --sql) can't inspect the database; they emit the full schema
+    return not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table(name)
+
+def upgrade():
+    postgresql = op.get_context().dialect.name == "postgresql"
+    if postgresql:
+        # Equality on an integer inside a GiST index needs the btree_gist extension
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+
+    if not has_table("reservations"):
+        columns = [
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("guest_id", sa.Integer, nullable=False),
+            sa.Column("room_id", sa.Integer, nullable=False),
+            sa.Column("check_in_date", sa.Date, nullable=False),
+            sa.Column("check_out_date", sa.Date, nullable=False),
+            sa.Column("status", sa.String, nullable=False)
+        ]
+        if postgresql:
+            columns.append(sa.Column(
+                "stay_range", DATERANGE,
+                sa.Computed("daterange(check_in_date, check_out_date, '[)')", persisted=True)
+            ))
+            columns.append(ExcludeConstraint(
+                ("room_id", "="), ("stay_range", "&&"),
+                name="reservations_no_overlap", using="gist", where=sa.text(ACTIVE_STATUS_CONDITION)
+            ))
+        else:
+            # Databases without range types (SQLite for local runs) store a readable text form
+            columns.append(sa.Column(
+                "stay_range", sa.String,
+                sa.Computed("check_in_date || '/' || check_out_date", persisted=True)
+            ))
+        op.create_table("reservations", *columns)
+        return
+
+    if postgresql:
+        op.execute(
+            "ALTER TABLE reservations ADD COLUMN IF NOT EXISTS stay_range daterange "
+            "GENERATED ALWAYS AS (daterange(check_in_date, check_out_date, '[)')) STORED"
+        )
+        exists = op.get_bind().execute(sa.text("SELECT 1 FROM pg_constraint WHERE conname = 'reservations_no_overlap'")).first()
+        if not exists:
+            # Fails if existing active reservations already overlap; they must be resolved first
+            op.execute(
+                "ALTER TABLE reservations ADD CONSTRAINT reservations_no_overlap "
+                f"EXCLUDE USING gist (room_id WITH =, stay_range WITH &&) WHERE ({ACTIVE_STATUS_CONDITION})"
+            )
+
+def downgrade():
+    op.drop_table("reservations")
@@ -0,0 +1,47 @@
+"""Indexes for the guest, room and status lookups of reservations
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+reservationsByGuest, reservationsByRoom, reservationsConnection(status) and the
+availability index load were all sequential scans of reservations. Active stays
+(confirmed or checked in) are a small slice of the table, so they get a partial
+index of their own.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+ACTIVE_STATUS_CONDITION = "status IN ('confirmed', 'checked-in')"
+
+def create_index_concurrently(name, table, columns, **kw):
+    # An interrupted CONCURRENTLY build leaves an INVALID index with this name behind, which
+    # would make every later run of this migration fail; drop it so the build starts over
+    if op.get_context().dialect.name == "postgresql":
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    op.create_index(name, table, columns, postgresql_concurrently=True, **kw)
+
+def upgrade():
+    # CONCURRENTLY keeps the table writable while the indexes build; it can't run in a transaction
+    with op.get_context().autocommit_block():
+        create_index_concurrently("ix_reservations_guest_id", "reservations", ["guest_id"])
+        create_index_concurrently(
+            "ix_reservations_room_id_check_in_date", "reservations", ["room_id", "check_in_date"]
+        )
+        create_index_concurrently("ix_reservations_status_id", "reservations", ["status", "id"])
+        create_index_concurrently(
+            "ix_reservations_active_stay", "reservations", ["room_id", "check_in_date", "check_out_date"],
+            postgresql_where=sa.text(ACTIVE_STATUS_CONDITION),
+            sqlite_where=sa.text(ACTIVE_STATUS_CONDITION)
+        )
+
+def downgrade():
+    op.drop_index("ix_reservations_active_stay", table_name="reservations")
+    op.drop_index("ix_reservations_status_id", table_name="reservations")
+    op.drop_index("ix_reservations_room_id_check_in_date", table_name="reservations")
+    op.drop_index("ix_reservations_guest_id", table_name="reservations")
@@ -0,0 +1,145 @@
+import codecs
+import csv
+import os
+import tempfile
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from .db import SessionLocal
+from .schema_simple import response_cache
+
+# Bulk CSV import of rooms.
+#
+# The request body is spooled to a temporary file, validated row by row, and the valid rows
+# are loaded with COPY into a temporary staging table (a plain INSERT on databases without
+# COPY). One INSERT ... SELECT ... ON CONFLICT (room_number) DO UPDATE then creates or updates
+# every room, and the change outbox gets one row per room, all in a single transaction.
+# Invalid rows are skipped and reported with their line number.
+
+# Request bodies up to this size stay in memory; larger ones go to disk
+IMPORT_SPOOL_SIZE = int(os.getenv("IMPORT_SPOOL_SIZE", 8 * 1024 * 1024))
+# Rows per INSERT into the staging table when COPY isn't available
+STAGING_CHUNK_SIZE = 5000
+
+COLUMNS = ["room_number", "room_type", "price_per_night", "status"]
+
+def validate_row(row: Dict[str, Any]) -> List[Any]:
+    """Staging values of a CSV row; raises ValueError with a message for the error report"""
+    missing = [column for column in COLUMNS if not (row.get(column) or "").strip()]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    try:
+        price = Decimal(row["price_per_night"].strip())
+    except InvalidOperation:
+        raise ValueError(f"price_per_night is not a number: {row['price_per_night']!r}")
+    if not price.is_finite() or price < 0:
+        raise ValueError(f"price_per_night must be a non-negative number: {row['price_per_night']!r}")
+    return [row["room_number"].strip(), row["room_type"].strip(), price, row["status"].strip()]
+
+def read_rows(source, staged) -> Dict[str, Any]:
+    """Validate the CSV in ``source`` and write the valid rows, as CSV with their line number, to ``staged``"""
+    # SpooledTemporaryFile can't be wrapped in io.TextIOWrapper before Python 3.11
+    reader = csv.DictReader(codecs.getreader("utf-8-sig")(source))
+    missing = [column for column in COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        return {"rows": 0, "staged": 0, "errors": [{"line": 1, "error": f"missing columns: {', '.join(missing)}"}]}
+    writer = csv.writer(staged)
+    errors = []
+    seen = {}
+    rows = 0
+    for row in reader:
+        rows += 1
+        line = reader.line_num
+        try:
+            values = validate_row(row)
+        except ValueError as e:
+            errors.append({"line": line, "error": str(e)})
+            continue
+        # One upsert can't change the same room twice; the first occurrence wins
+        if values[0] in seen:
+            errors.append({"line": line, "error": f"duplicate room_number {values[0]!r} (first on line {seen[values[0]]})"})
+            continue
+        seen[values[0]] = line
+        writer.writerow([line] + values)
+    staged.seek(0)
+    return {"rows": rows, "staged": len(seen), "errors": errors}
+
+def load_staging(db, staged):
+    db.execute(text("DROP TABLE IF EXISTS rooms_import"))
+    db.execute(text(
+        "CREATE TEMPORARY TABLE rooms_import ("
+        "line INTEGER, room_number VARCHAR, room_type VARCHAR, price_per_night NUMERIC(10, 2), status VARCHAR, "
+        "existing BOOLEAN NOT NULL DEFAULT FALSE)"
+    ))
+    columns = ["line"] + COLUMNS
+    if db.get_bind().dialect.name == "postgresql":
+        cursor = db.connection().connection.cursor()
+        cursor.copy_expert(f"COPY rooms_import ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", staged)
+        return
+    insert = text(f"INSERT INTO rooms_import ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})")
+    chunk = []
+    for values in csv.reader(staged):
+        chunk.append(dict(zip(columns, values)))
+        if len(chunk) == STAGING_CHUNK_SIZE:
+            db.execute(insert, chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert, chunk)
+
+def upsert_rooms(db) -> Dict[str, int]:
+    """Create or update rooms from the staging table and record them in the change outbox"""
+    db.execute(text(
+        "UPDATE rooms_import SET existing = TRUE "
+        "WHERE room_number IN (SELECT room_number FROM rooms)"
+    ))
+    updated = db.execute(text("SELECT count(*) FROM rooms_import WHERE existing")).scalar()
+    staged = db.execute(text("SELECT count(*) FROM rooms_import")).scalar()
+    # WHERE TRUE keeps SQLite from reading ON CONFLICT as part of the SELECT
+    db.execute(text(
+        "INSERT INTO rooms (room_number, room_type, price_per_night, status) "
+        "SELECT room_number, room_type, price_per_night, status FROM rooms_import WHERE TRUE ORDER BY line "
+        "ON CONFLICT (room_number) DO UPDATE SET "
+        "room_type = excluded.room_type, price_per_night = excluded.price_per_night, status = excluded.status"
+    ))
+    db.execute(text(
+        "INSERT INTO change_outbox (entity, entity_id, operation) "
+        "SELECT 'Room', rooms.id, CASE WHEN rooms_import.existing THEN 'update' ELSE 'create' END "
+        "FROM rooms_import JOIN rooms ON rooms.room_number = rooms_import.room_number ORDER BY rooms_import.line"
+    ))
+    db.execute(text("DROP TABLE rooms_import"))
+    return {"created": staged - updated, "updated": updated}
+
+def import_rooms(source) -> Dict[str, Any]:
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE, mode="w+", newline="") as staged:
+        report = read_rows(source, staged)
+        counts = {"created": 0, "updated": 0}
+        if report["staged"]:
+            db = SessionLocal()
+            try:
+                load_staging(db, staged)
+                counts = upsert_rooms(db)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+    return {"rows": report["rows"], **counts, "failed": len(report["errors"]), "errors": report["errors"]}
+
+import_router = APIRouter(prefix="/import")
+
+@import_router.post("/rooms.csv")
+async def import_rooms_csv(request: Request):
+    """Create or update rooms from a CSV body with columns room_number, room_type, price_per_night, status"""
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as source:
+        async for chunk in request.stream():
+            source.write(chunk)
+        source.seek(0)
+        result = await run_in_threadpool(import_rooms, source)
+    if result["created"] or result["updated"]:
+        await response_cache.invalidate(["Room"])
+    return result
@@ -1,6 +1,8 @@
 import os
+import asyncio
 import logging
 import json
+import time
 from gql import gql, Client
 from gql.transport.aiohttp import AIOHTTPTransport
 
@@ -8,6 +10,212 @@ from gql.transport.aiohttp import AIOHTTPTransport
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class GraphQLUpstream:
+    """
+    A persistent gql session to one upstream GraphQL endpoint
+
+    The session (and its pooled keep-alive aiohttp connections) is opened once and
+    reused by every call. The upstream schema is introspected at most once, on first use.
+    """
+    def __init__(self, url, timeout=5, fetch_schema=True):
+        self.url = url
+        self.client = Client(transport=AIOHTTPTransport(url=url, timeout=timeout), fetch_schema_from_transport=False)
+        self.session = None
+        self.fetch_schema = fetch_schema
+        self._lock = asyncio.Lock()
+
+    async def connect(self):
+        async with self._lock:
+            if self.session is None:
+                self.session = await self.client.connect_async()
+            if self.fetch_schema:
+                # Only one attempt: if introspection fails, queries are sent without local validation
+                self.fetch_schema = False
+                try:
+                    await self.session.fetch_schema()
+                except Exception as e:
+                    logger.warning(f"Could not fetch schema from {self.url}: {str(e)}")
+
+    async def execute(self, document, variable_values=None):
+        if self.session is None or self.fetch_schema:
+            await self.connect()
+        return await self.session.execute(document, variable_values=variable_values)
+
+    async def close(self):
+        async with self._lock:
+            if self.session is not None:
+                await self.client.close_async()
+                self.session = None
+
+# Try both container name and localhost
+# When running inside Docker, use the container name
+# When running from host machine, use localhost
+review_upstreams = [
+    GraphQLUpstream(os.environ.get("REVIEW_SERVICE_URL", "http://review_service:3000/graphql")),
+    GraphQLUpstream("http://localhost:3000/graphql"),
+]
+
+async def open_review_sessions():
+    """Open the review service sessions, called once at application startup"""
+    for upstream in review_upstreams:
+        try:
+            await upstream.connect()
+        except Exception as e:
+            logger.error(f"Error connecting to review service at {upstream.url}: {str(e)}")
+
+async def close_review_sessions():
+    for upstream in review_upstreams:
+        await upstream.close()
+
+REVIEW_FIELDS = """
+    reviewId
+    stayId
+    overallRating
+    content
+    reviewDate
+    lastUpdated
+    aspects {
+        rating
+        comment
+    }
+"""
+
+# Use a query that gets all reviews, parsed once at import
+REVIEWS_QUERY = gql("query { reviews {" + REVIEW_FIELDS + "} }")
+
+# How long the review index is served before the next refresh, and how often a
+# full download replaces incremental refreshes (to drop deleted reviews)
+REVIEW_CACHE_TTL = float(os.environ.get("REVIEW_CACHE_TTL", "30"))
+REVIEW_FULL_REFRESH_INTERVAL = float(os.environ.get("REVIEW_FULL_REFRESH_INTERVAL", "600"))
+
+# Argument names on Query.reviews that filter by lastUpdated, when the review service offers one
+SINCE_ARGUMENTS = ("updatedSince", "lastUpdatedSince", "since")
+
+def normalize_review(review):
+    """Apply the id/date fixups the room service has always done to review service data"""
+    # Convert string IDs to integers where needed
+    if isinstance(review.get("reviewId"), str):
+        review["reviewId"] = int(review["reviewId"])
+    if "reviewDate" in review and isinstance(review["reviewDate"], str) and review["reviewDate"].isdigit():
+        # Convert timestamp to date string
+        review["reviewDate"] = "2025-06-13"
+    return review
+
+def _updated_key(value):
+    # lastUpdated is either an epoch timestamp string or an ISO date, compare accordingly
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return value
+
+class ReviewCache:
+    """
+    In-process index of review service reviews by stayId
+
+    The whole review list is fetched at most once per REVIEW_CACHE_TTL, no matter how many
+    rooms are resolved, and every room's reviews are answered from the index. Refreshes are
+    incremental on lastUpdated: if the review service can filter by it only newer reviews
+    are requested, otherwise only reviews whose lastUpdated changed are re-indexed.
+    """
+    def __init__(self, upstreams, ttl=REVIEW_CACHE_TTL, full_refresh_interval=REVIEW_FULL_REFRESH_INTERVAL):
+        self.upstreams = upstreams
+        self.ttl = ttl
+        self.full_refresh_interval = full_refresh_interval
+        self.reviews_by_id = {}
+        # stayId (as string, matching the old str() comparison) -> {reviewId: review}
+        self.by_stay_id = {}
+        self.last_updated = None
+        self.refreshed_at = None
+        self.full_refreshed_at = None
+        self._since_queries = {}
+        self._lock = asyncio.Lock()
+
+    def is_fresh(self):
+        return self.refreshed_at is not None and time.monotonic() - self.refreshed_at < self.ttl
+
+    async def get(self, stay_id):
+        if not self.is_fresh():
+            await self.refresh()
+        return list(self.by_stay_id.get(str(stay_id), {}).values())
+
+    async def refresh(self, full=False):
+        # Concurrent resolvers wait for the one refresh in flight instead of each fetching
+        async with self._lock:
+            if self.is_fresh() and not full:
+                return
+            for upstream in self.upstreams:
+                try:
+                    await self._refresh_from(upstream, full)
+                    break
+                except Exception as e:
+                    logger.error(f"Error refreshing reviews from {upstream.url}: {str(e)}")
+            else:
+                # Keep serving the previous index until the next window rather than retrying per room
+                logger.warning("All review service URLs failed, serving cached reviews")
+            self.refreshed_at = time.monotonic()
+
+    def _since_query(self, upstream):
+        schema = upstream.client.schema
+        if schema is None or schema.query_type is None or "reviews" not in schema.query_type.fields:
+            return None
+        args = schema.query_type.fields["reviews"].args
+        for name in SINCE_ARGUMENTS:
+            if name in args:
+                key = (name, str(args[name].type))
+                if key not in self._since_queries:
+                    self._since_queries[key] = gql(
+                        f"query GetReviewsSince($since: {key[1]}) {{ reviews({name}: $since) {{{REVIEW_FIELDS}}} }}"
+                    )
+                return self._since_queries[key]
+        return None
+
+    async def _refresh_from(self, upstream, full):
+        now = time.monotonic()
+        due_full = self.full_refreshed_at is None or now - self.full_refreshed_at >= self.full_refresh_interval
+        since_query = None if full or due_full or self.last_updated is None else self._since_query(upstream)
+        if since_query is not None:
+            result = await upstream.execute(since_query, variable_values={"since": self.last_updated})
+            changed = self._merge(result.get("reviews") or [])
+            logger.info(f"Incremental review refresh from {upstream.url}: {changed} changed")
+        else:
+            result = await upstream.execute(REVIEWS_QUERY)
+            changed = self._merge(result.get("reviews") or [], complete=True)
+            self.full_refreshed_at = now
+            logger.info(f"Full review refresh from {upstream.url}: {len(self.reviews_by_id)} reviews, {changed} changed")
+
+    def _merge(self, reviews, complete=False):
+        """Index new or changed reviews; with ``complete`` also drop reviews no longer returned"""
+        changed = 0
+        seen = set()
+        for review in reviews:
+            review = normalize_review(review)
+            review_id = review.get("reviewId")
+            seen.add(review_id)
+            current = self.reviews_by_id.get(review_id)
+            if current is not None and current.get("lastUpdated") == review.get("lastUpdated") and current.get("stayId") == review.get("stayId"):
+                continue
+            if current is not None:
+                self._unindex(current)
+            self.reviews_by_id[review_id] = review
+            self.by_stay_id.setdefault(str(review.get("stayId")), {})[review_id] = review
+            changed += 1
+            if review.get("lastUpdated") is not None and (self.last_updated is None or _updated_key(review["lastUpdated"]) > _updated_key(self.last_updated)):
+                self.last_updated = review["lastUpdated"]
+        if complete:
+            for review_id in [review_id for review_id in self.reviews_by_id if review_id not in seen]:
+                self._unindex(self.reviews_by_id.pop(review_id))
+                changed += 1
+        return changed
+
+    def _unindex(self, review):
+        stay_key = str(review.get("stayId"))
+        bucket = self.by_stay_id.get(stay_key)
+        if bucket is not None:
+            bucket.pop(review.get("reviewId"), None)
+            if not bucket:
+                del self.by_stay_id[stay_key]
+
+review_cache = ReviewCache(review_upstreams)
+
 async def get_reviews_by_room_id(room_id):
     """
     Fetch reviews for a specific room from the hotelmate review service
@@ -16,116 +224,17 @@ async def get_reviews_by_room_id(room_id):
         room_id: The ID of the room to fetch reviews for
         
     Returns:
-        List of review objects or empty list if error occurs
+        List of review objects, or a sample review if the room has none
     """
-    # Try both container name and localhost
-    # When running inside Docker, use the container name
-    # When running from host machine, use localhost
-    primary_url = os.environ.get("REVIEW_SERVICE_URL", "http://review_service:3000/graphql")
-    fallback_url = "http://localhost:3000/graphql"
-    
     logger.info(f"Fetching reviews for room {room_id}")
     
-    # Try the primary URL first
-    try:
-        reviews = await fetch_reviews_from_url(primary_url, room_id)
-        if reviews:
-            return reviews
-        logger.warning(f"No reviews found at {primary_url}, trying fallback URL")
-    except Exception as e:
-        logger.error(f"Error with primary URL {primary_url}: {str(e)}")
+    reviews = await review_cache.get(room_id)
+    if reviews:
+        return reviews
     
-    # If primary URL fails, try the fallback URL
-    try:
-        reviews = await fetch_reviews_from_url(fallback_url, room_id)
-        if reviews:
-            return reviews
-        logger.warning(f"No reviews found at fallback URL {fallback_url} either")
-    except Exception as e:
-        logger.error(f"Error with fallback URL {fallback_url}: {str(e)}")
-    
-    # If both URLs fail, return sample data
-    logger.warning(f"Both URLs failed, returning sample data for room {room_id}")
+    logger.info(f"No cached reviews for room {room_id}, returning sample data")
     return create_sample_review(room_id)
 
-async def fetch_reviews_from_url(url, room_id):
-    """
-    Fetch reviews from a specific URL
-    
-    Args:
-        url: The GraphQL endpoint URL
-        room_id: The ID of the room to fetch reviews for
-        
-    Returns:
-        List of review objects or empty list if error occurs
-    """
-    logger.info(f"Attempting to fetch reviews from {url} for room {room_id}")
-    
-    # Set a timeout for the request to avoid long waits if the service is down
-    transport = AIOHTTPTransport(url=url, timeout=5)
-    
-    async with Client(
-        transport=transport,
-        fetch_schema_from_transport=True,
-    ) as session:
-        # Use a query that gets all reviews
-        query = gql("""
-        query {
-            reviews {
-                reviewId
-                stayId
-                overallRating
-                content
-                reviewDate
-                lastUpdated
-                aspects {
-                    rating
-                    comment
-                }
-            }
-        }
-        """)
-        
-        logger.info(f"Executing GraphQL query to fetch reviews")
-        result = await session.execute(query)
-        
-        # Filter reviews for this room
-        all_reviews = result.get("reviews", [])
-        if not all_reviews:
-            logger.warning(f"No reviews found in the response")
-            return []
-        
-        # Convert room_id to integer for comparison since stayId is stored as integer
-        try:
-            room_id_int = int(room_id)
-        except (ValueError, TypeError):
-            room_id_int = room_id  # Keep as is if conversion fails
-            
-        logger.info(f"Looking for reviews with stayId={room_id_int}")
-        
-        # Filter reviews where stayId matches room_id
-        room_reviews = []
-        for review in all_reviews:
-            stay_id = review.get("stayId")
-            # Convert both to strings for comparison to handle different types
-            if str(stay_id) == str(room_id_int):
-                # Convert string IDs to integers where needed
-                if isinstance(review.get("reviewId"), str):
-                    review["reviewId"] = int(review["reviewId"])
-                room_reviews.append(review)
-        
-        logger.info(f"Found {len(room_reviews)} reviews for room {room_id_int}")
-        
-        if room_reviews:
-            # Format dates to be consistent
-            for review in room_reviews:
-                if "reviewDate" in review and isinstance(review["reviewDate"], str) and review["reviewDate"].isdigit():
-                    # Convert timestamp to date string
-                    review["reviewDate"] = "2025-06-13"
-            return room_reviews
-    
-    return []
-
 def create_sample_review(room_id):
     """
     Create a sample review for testing as fallback
@@ -0,0 +1,85 @@
+import argparse
+import re
+import sys
+from sqlalchemy import insert, text
+
+from .db import SessionLocal
+from .models import Room
+from .pagination import DEFAULT_PAGE_SIZE
+
+# EXPLAIN each resolver query against seeded rows and fail if a lookup scans the whole table.
+# The seed rows live in the check's own transaction and are rolled back when it ends, but
+# run it against a development database anyway: the seeding takes write locks.
+#
+#   python -m app.explain_check [--rows 20000] [--verbose]
+
+DEFAULT_ROWS = 20000
+
+def seed(db, rows: int):
+    """Insert ``rows`` rooms where only a few are available, as in a busy hotel"""
+    statuses = ["occupied"] * 17 + ["reserved", "maintenance", "available"]
+    db.execute(insert(Room), [
+        {
+            "room_number": f"explain-{i}",
+            "room_type": ["Standard", "Deluxe", "Suite"][i % 3],
+            "price_per_night": 100,
+            "status": statuses[i % len(statuses)]
+        }
+        for i in range(rows)
+    ])
+
+def resolver_queries(db):
+    """The table each resolver reads and its query"""
+    return {
+        "availableRooms": ("rooms", db.query(Room).filter(Room.status == "available")),
+        "roomsConnection(status)": (
+            "rooms",
+            db.query(Room).filter(Room.status == "maintenance").order_by(Room.id).limit(DEFAULT_PAGE_SIZE + 1)
+        ),
+    }
+
+def explain(db, query):
+    """Plan lines of ``query``, from EXPLAIN on PostgreSQL or EXPLAIN QUERY PLAN on SQLite"""
+    dialect = db.get_bind().dialect
+    compiled = query.statement.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if dialect.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if dialect.name == "sqlite":
+        rows = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).fetchall()
+        return [row[-1] for row in rows]
+    rows = db.connection().exec_driver_sql("EXPLAIN " + str(compiled), params).fetchall()
+    return [row[0] for row in rows]
+
+def full_scans(plan, table: str):
+    """Plan lines that read every row of ``table``"""
+    pattern = re.compile(rf"Seq Scan on {table}\b|^SCAN (TABLE )?{table}\b")
+    return [line for line in plan if pattern.search(line.strip()) and "INDEX" not in line]
+
+def run_check(db, rows: int = DEFAULT_ROWS, verbose: bool = False) -> bool:
+    seed(db, rows)
+    db.execute(text("ANALYZE"))
+    ok = True
+    for name, (table, query) in resolver_queries(db).items():
+        plan = explain(db, query)
+        scans = full_scans(plan, table)
+        ok = ok and not scans
+        print(f"{'FULL SCAN' if scans else 'ok':9} {name}")
+        for line in plan if verbose or scans else []:
+            print(f"          {line}")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN the room resolver queries against seeded data")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--verbose", action="store_true", help="print every plan, not only failing ones")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        ok = run_check(db, rows=args.rows, verbose=args.verbose)
+    finally:
+        # Never keep the seed rows
+        db.rollback()
+        db.close()
+    sys.exit(0 if ok else 1)
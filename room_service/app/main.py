@@ -3,9 +3,15 @@ from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import time
 from sqlalchemy import inspect
-from .db import engine, Base, get_db, wait_for_db
+from .db import engine, Base, get_db, wait_for_db, run_migrations
 from .models import Room
-from .schema_simple import graphql_router
+from .schema_simple import graphql_router, response_cache
+from .outbox import prune_outbox
+from .pubsub import pubsub
+from .bulk_import import import_router
+from .client import open_review_sessions, close_review_sessions
+from .persisted_queries import query_cache
+from .query_cost import cost_throttle
 import logging
 
 # Configure logging
@@ -26,22 +32,44 @@ app.add_middleware(
 # Include GraphQL router
 app.include_router(graphql_router, prefix="/graphql")
 
+# Bulk CSV imports
+app.include_router(import_router)
+
 # Health check endpoint
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "service": "room_management"}
 
+# Persisted query and parsed-document cache counters
+@app.get("/metrics/query-cache")
+def query_cache_metrics():
+    return query_cache.stats()
+
+# Query cost throttle (QUERY_COST_RATE) state and counters
+@app.get("/metrics/query-cost")
+def query_cost_metrics():
+    return cost_throttle.stats()
+
+# Response cache hit ratio and memory use
+@app.get("/metrics/response-cache")
+async def response_cache_metrics():
+    return await response_cache.stats()
+
+# Open GraphQL subscriptions and queued/dropped events
+@app.get("/metrics/subscriptions")
+def subscription_metrics():
+    return pubsub.stats()
+
 # Startup event to initialize database and add sample data
 @app.on_event("startup")
 async def startup_event():
     # Wait for database to be ready
     print("Waiting for database to be ready...")
     if wait_for_db():
-        print("Creating database tables...")
+        print("Running database migrations...")
         try:
-            # Create database tables
-            Base.metadata.create_all(bind=engine)
-            print("Database tables created successfully")
+            run_migrations()
+            print("Database migrations applied successfully")
             
             # Verify tables were created
             inspector = inspect(engine)
@@ -68,6 +96,10 @@ async def startup_event():
                     db.add_all(sample_rooms)
                     db.commit()
                     print("Sample data added successfully")
+                # Old outbox rows are only needed by listeners catching up after a reconnect
+                pruned = prune_outbox(db)
+                if pruned:
+                    print(f"Pruned {pruned} change outbox rows")
             except Exception as e:
                 print(f"Error adding sample data: {e}")
                 # Print the full exception traceback for debugging
@@ -83,5 +115,12 @@ async def startup_event():
     else:
         print("Failed to connect to database. Service may not function correctly.")
 
+    # Open the persistent review service sessions once for the lifetime of the app
+    await open_review_sessions()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_review_sessions()
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, func
+from sqlalchemy import Column, BigInteger, Integer, String, Numeric, DateTime, Index, func
 from sqlalchemy.sql import expression
 from typing import Optional
 from sqlmodel import Field, SQLModel
@@ -15,3 +15,24 @@ class Room(Base):
     room_type = Column(String, nullable=False)
     price_per_night = Column(Numeric(10, 2), nullable=False)
     status = Column(String, nullable=False)  # available, occupied, maintenance, etc.
+
+    # Created by the Alembic migrations in migrations/versions; keep the two in step
+    __table_args__ = (
+        # availableRooms and roomsConnection(status) filter by status and page by id
+        Index("ix_rooms_status_id", "status", "id"),
+    )
+
+class ChangeOutbox(Base):
+    """Committed entity changes, announced to other services with NOTIFY (see outbox.py)"""
+    __tablename__ = "change_outbox"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    operation = Column(String, nullable=False)  # create, update, delete
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        # prune_outbox deletes by age
+        Index("ix_change_outbox_created_at", "created_at"),
+    )
@@ -0,0 +1,70 @@
+import base64
+import strawberry
+from typing import Any, Callable, Generic, List, Optional, TypeVar
+
+from .db import run_db
+
+T = TypeVar("T")
+
+# Page size limits for connection fields
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    end_cursor: Optional[str] = None
+
+@strawberry.type
+class Edge(Generic[T]):
+    cursor: str
+    node: T
+
+@strawberry.type
+class Connection(Generic[T]):
+    edges: List[Edge[T]]
+    page_info: PageInfo
+    # Request session and unpaged query builder, only used when the client asks for totalCount
+    db: strawberry.Private[Any]
+    build_query: strawberry.Private[Callable[[Any], Any]]
+
+    @strawberry.field
+    async def total_count(self) -> int:
+        return await run_db(self.db, lambda session: self.build_query(session).order_by(None).count())
+
+# Cursors are opaque to clients but simply wrap the primary key of the row
+def encode_cursor(row_id: int) -> str:
+    return base64.b64encode(f"cursor:{row_id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        prefix, row_id = base64.b64decode(cursor.encode()).decode().split(":", 1)
+        if prefix != "cursor":
+            raise ValueError(prefix)
+        return int(row_id)
+    except Exception:
+        raise Exception(f"Invalid cursor: {cursor}")
+
+async def paginate(db, build_query: Callable[[Any], Any], model, to_graphql: Callable[[Any], T], first: Optional[int] = None, after: Optional[str] = None) -> Connection[T]:
+    """Return one keyset page of ``build_query(session)`` ordered by primary key, starting after the ``after`` cursor"""
+    page_size = min(max(first or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+    after_id = decode_cursor(after) if after else None
+
+    def load_page(session):
+        page_query = build_query(session)
+        if after_id is not None:
+            page_query = page_query.filter(model.id > after_id)
+        # Fetch one extra row to know whether another page exists without a COUNT
+        rows = page_query.order_by(model.id).limit(page_size + 1).all()
+        return [Edge(cursor=encode_cursor(row.id), node=to_graphql(row)) for row in rows[:page_size]], len(rows) > page_size
+
+    edges, has_next_page = await run_db(db, load_page)
+    return Connection(
+        edges=edges,
+        page_info=PageInfo(
+            has_next_page=has_next_page,
+            end_cursor=edges[-1].cursor if edges else None
+        ),
+        db=db,
+        build_query=build_query
+    )
@@ -0,0 +1,54 @@
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, Set
+
+# In-process publish/subscribe for GraphQL subscriptions.
+#
+# Mutations publish an event to a topic after their transaction commits, and every open
+# subscription on that topic gets it through its own bounded queue. A subscriber that
+# doesn't keep up loses its oldest queued events instead of holding up the publisher or
+# growing without limit. Events only reach subscribers connected to the same process.
+
+SUBSCRIPTION_QUEUE_SIZE = int(os.getenv("SUBSCRIPTION_QUEUE_SIZE", 100))
+
+class PubSub:
+    def __init__(self, queue_size: int = SUBSCRIPTION_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.topics: Dict[str, Set[asyncio.Queue]] = {}
+        self.published = 0
+        self.queued = 0
+        self.dropped = 0
+
+    def publish(self, topic: str, event: Any):
+        """Queue ``event`` for every subscriber of ``topic``; never blocks"""
+        self.published += 1
+        for queue in self.topics.get(topic, ()):
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+            self.queued += 1
+
+    async def subscribe(self, topic: str) -> AsyncIterator[Any]:
+        """Events published to ``topic`` from now on, until the caller stops iterating"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self.topics.setdefault(topic, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            subscribers = self.topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self.topics[topic]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": {topic: len(queues) for topic, queues in self.topics.items()},
+            "published": self.published,
+            "queued": self.queued,
+            "dropped": self.dropped,
+        }
+
+pubsub = PubSub()
@@ -0,0 +1,245 @@
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from graphql import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError, GraphQLSchema, InlineFragmentNode,
+    ListValueNode, SelectionSetNode, VariableNode, get_named_type, get_nullable_type, get_operation_ast,
+    is_composite_type, is_list_type, value_from_ast_untyped
+)
+from graphql.execution import ExecutionResult as GraphQLExecutionResult
+from sqlalchemy import func
+from strawberry.extensions import SchemaExtension
+
+from .db import SessionLocal
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+# Static query cost, computed from the selection set before execution.
+#
+# An object field costs 1 and a scalar is free. A field resolved by calling another service
+# (marked with metadata=REMOTE) costs REMOTE_FIELD_COST. A list field multiplies the cost of
+# its selections by its expected length: the length of a list argument (ids, items), the
+# page size of the connection it belongs to, a "list_size" given in the field's metadata
+# (a number, or the cached row count of the table a root list returns in full), or
+# DEFAULT_LIST_SIZE for other unbounded lists. Row counts are taken in a worker thread before
+# the cost is computed; a stale count is still used while the next one is being taken.
+#
+# Queries over the budget are rejected. With QUERY_COST_RATE set, the cost of the queries a
+# service accepts is also throttled: a token bucket refills at that many points per second,
+# a query waits up to QUERY_COST_MAX_WAIT seconds for its cost to become available, and is
+# rejected if it would have to wait longer.
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+QUERY_COST_BUDGET = int(os.getenv("QUERY_COST_BUDGET", 5000))
+REMOTE_FIELD_COST = int(os.getenv("QUERY_COST_REMOTE_FIELD", 10))
+DEFAULT_LIST_SIZE = int(os.getenv("QUERY_COST_LIST_SIZE", 100))
+# With QUERY_COST_ENFORCE=false the cost is only reported, never rejected or throttled
+QUERY_COST_ENFORCE = _env_flag("QUERY_COST_ENFORCE", "true")
+# Cost points per second accepted by this process; 0 disables throttling
+QUERY_COST_RATE = float(os.getenv("QUERY_COST_RATE", 0))
+QUERY_COST_BURST = float(os.getenv("QUERY_COST_BURST", 2 * QUERY_COST_BUDGET))
+QUERY_COST_MAX_WAIT = float(os.getenv("QUERY_COST_MAX_WAIT", 1))
+# How long a table's row count is used as the length of its full list
+ROW_COUNT_TTL = float(os.getenv("QUERY_COST_ROW_COUNT_TTL", 60))
+
+# Field metadata for resolvers that call another service
+REMOTE = {"remote": True}
+
+class RowCount:
+    """count(*) of a model's table, refreshed at most every ROW_COUNT_TTL seconds"""
+    def __init__(self, model, ttl: float = ROW_COUNT_TTL):
+        self.model = model
+        self.ttl = ttl
+        self.value: Optional[int] = None
+        self.counted_at: Optional[float] = None
+        self._refresh: Optional[asyncio.Future] = None
+        row_counts.append(self)
+
+    def __call__(self) -> int:
+        # Without a count the list is priced as any other unbounded list
+        return DEFAULT_LIST_SIZE if self.value is None else self.value
+
+    def _count(self) -> int:
+        db = SessionLocal()
+        try:
+            return db.query(func.count()).select_from(self.model).scalar()
+        finally:
+            db.close()
+
+    async def _take(self):
+        try:
+            self.value = await run_in_threadpool(self._count)
+        except Exception as e:
+            print(f"Row count of {self.model.__tablename__} failed: {e}")
+        finally:
+            # A failed count is retried after the TTL too, not by every request
+            self.counted_at = time.monotonic()
+            self._refresh = None
+
+    async def refresh(self):
+        """Start a count when the current one is stale; only the first count is waited for"""
+        if self._refresh is None and (self.counted_at is None or time.monotonic() - self.counted_at >= self.ttl):
+            self._refresh = asyncio.ensure_future(self._take())
+        if self._refresh is not None and self.counted_at is None:
+            await asyncio.shield(self._refresh)
+
+# Every RowCount, refreshed before a query's cost is computed
+row_counts: List[RowCount] = []
+
+async def refresh_row_counts():
+    await asyncio.gather(*[row_count.refresh() for row_count in row_counts])
+
+def all_rows(model) -> Dict[str, Any]:
+    """Field metadata for a list of every row of ``model``: its expected length is the table's row count"""
+    return {"list_size": RowCount(model)}
+
+class CostCalculator:
+    def __init__(self, schema: GraphQLSchema, fragments: Dict[str, Any], variables: Optional[Dict[str, Any]]):
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables or {}
+
+    def _argument(self, node: FieldNode, name: str):
+        for argument in node.arguments or ():
+            if argument.name.value == name:
+                return argument.value
+        return None
+
+    def _list_length(self, node: FieldNode) -> Optional[int]:
+        """Length of the first list argument of a field (ids, items), if any"""
+        for argument in node.arguments or ():
+            value = argument.value
+            if isinstance(value, ListValueNode):
+                return len(value.values)
+            if isinstance(value, VariableNode) and isinstance(self.variables.get(value.name.value), list):
+                return len(self.variables[value.name.value])
+        return None
+
+    def _page_size(self, node: FieldNode, field_def) -> Optional[int]:
+        """Page size of a connection field (one with a ``first`` argument)"""
+        if "first" not in field_def.args:
+            return None
+        first = self._argument(node, "first")
+        first = value_from_ast_untyped(first, self.variables) if first is not None else None
+        return min(max(first or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+
+    def selection_set_cost(self, selection_set: Optional[SelectionSetNode], parent_type, page_size: Optional[int] = None) -> int:
+        if selection_set is None:
+            return 0
+        cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                cost += self.field_cost(selection, parent_type, page_size)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = self.schema.get_type(selection.type_condition.name.value) if selection.type_condition else parent_type
+                cost += self.selection_set_cost(selection.selection_set, fragment_type, page_size)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments[selection.name.value]
+                cost += self.selection_set_cost(fragment.selection_set, self.schema.get_type(fragment.type_condition.name.value), page_size)
+        return cost
+
+    def field_cost(self, node: FieldNode, parent_type, page_size: Optional[int] = None) -> int:
+        name = node.name.value
+        # Introspection is answered from the schema in memory
+        if name.startswith("__"):
+            return 0
+        field_def = parent_type.fields.get(name)
+        if field_def is None:
+            return 0
+        field_type = get_nullable_type(field_def.type)
+        named_type = get_named_type(field_type)
+        strawberry_field = field_def.extensions.get("strawberry-definition")
+        metadata = strawberry_field.metadata if strawberry_field is not None else {}
+
+        if metadata.get("remote"):
+            cost = REMOTE_FIELD_COST
+        else:
+            cost = 1 if is_composite_type(named_type) else 0
+        if not is_composite_type(named_type):
+            return cost
+
+        multiplier = 1
+        if is_list_type(field_type):
+            list_size = metadata.get("list_size")
+            if callable(list_size):
+                list_size = list_size()
+            multiplier = self._list_length(node) or page_size or list_size or DEFAULT_LIST_SIZE
+        # The page size of a connection applies to the list directly below it (edges)
+        child_page_size = self._page_size(node, field_def)
+        return cost + multiplier * self.selection_set_cost(node.selection_set, named_type, child_page_size)
+
+def query_cost(schema: GraphQLSchema, document, operation_name: Optional[str], variables: Optional[Dict[str, Any]]) -> Optional[int]:
+    operation = get_operation_ast(document, operation_name)
+    if operation is None:
+        return None
+    fragments = {definition.name.value: definition for definition in document.definitions if isinstance(definition, FragmentDefinitionNode)}
+    root_type = schema.get_root_type(operation.operation)
+    return CostCalculator(schema, fragments, variables).selection_set_cost(operation.selection_set, root_type)
+
+class CostThrottle:
+    """Token bucket of query cost points shared by every request of the process"""
+    def __init__(self, rate: float = QUERY_COST_RATE, burst: float = QUERY_COST_BURST, max_wait: float = QUERY_COST_MAX_WAIT):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.throttled = 0
+        self.rejected = 0
+
+    def reserve(self, cost: int) -> Optional[float]:
+        """Take ``cost`` points and return how long to wait before executing, or None if that is over max_wait"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        # A query costlier than the burst only waits for a full bucket
+        cost = min(cost, self.burst)
+        wait = max(0.0, (cost - self.tokens) / self.rate)
+        if wait > self.max_wait:
+            self.rejected += 1
+            return None
+        # Tokens may go negative; later queries wait for the ones already admitted
+        self.tokens -= cost
+        if wait:
+            self.throttled += 1
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rate": self.rate, "burst": self.burst, "tokens": round(self.tokens, 1), "throttled": self.throttled, "rejected": self.rejected}
+
+cost_throttle = CostThrottle()
+
+def _reject(message: str, code: str, cost: int) -> GraphQLExecutionResult:
+    return GraphQLExecutionResult(data=None, errors=[GraphQLError(
+        message, extensions={"code": code, "cost": cost, "budget": QUERY_COST_BUDGET}
+    )])
+
+class QueryCost(SchemaExtension):
+    """Reject queries whose static cost exceeds QUERY_COST_BUDGET, throttle to QUERY_COST_RATE, and report the cost in the response extensions"""
+    cost: Optional[int] = None
+
+    async def on_execute(self) -> AsyncIterator[None]:
+        context = self.execution_context
+        await refresh_row_counts()
+        self.cost = query_cost(context.schema._schema, context.graphql_document, context.operation_name, context.variables)
+        if QUERY_COST_ENFORCE and self.cost is not None:
+            # Strawberry skips execution when a result is already set
+            if self.cost > QUERY_COST_BUDGET:
+                context.result = _reject(f"Query cost {self.cost} exceeds the budget of {QUERY_COST_BUDGET}", "QUERY_TOO_EXPENSIVE", self.cost)
+            elif QUERY_COST_RATE > 0:
+                wait = cost_throttle.reserve(self.cost)
+                if wait is None:
+                    context.result = _reject(f"Query cost rate limit of {QUERY_COST_RATE:g} per second reached, retry later", "QUERY_THROTTLED", self.cost)
+                elif wait:
+                    await asyncio.sleep(wait)
+        yield
+
+    def get_results(self) -> Dict[str, Any]:
+        if self.cost is None:
+            return {}
+        return {"cost": {"requested": self.cost, "budget": QUERY_COST_BUDGET}}
@@ -1,12 +1,19 @@
 import strawberry
-from typing import List, Optional
+from typing import AsyncGenerator, List, Optional
+from sqlalchemy import func, select, update, any_, bindparam, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session
 from .models import Room
-from .db import get_db
+from .db import get_db, get_request_db, run_db, fetch_by_ids
+from .outbox import record_changes
+from .pubsub import pubsub
+from .pagination import Connection, paginate
 from fastapi import Depends
-from strawberry.fastapi import GraphQLRouter
 import logging
 from .client import get_reviews_by_room_id
+from .persisted_queries import CachedDocuments, PersistedQueryRouter
+from .query_cost import QueryCost, REMOTE, all_rows
+from .response_cache import ResponseCache, cached, invalidates
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -51,7 +58,8 @@ class RoomType:
     pricePerNight: float
     status: str
     
-    @strawberry.field
+    # A room collects a handful of reviews, not the default list size of the cost estimate
+    @strawberry.field(metadata={**REMOTE, "list_size": 20})
     async def reviews(self) -> List[ReviewType]:
         """Fetch reviews for this room from the hotelmate review service"""
         logging.info(f"Fetching reviews for room {self.id}")
@@ -106,6 +114,28 @@ class RoomType:
         
         return [sample_review]
 
+# Dashboard aggregate types
+@strawberry.type
+class RoomStatusCountType:
+    status: str
+    count: int
+
+@strawberry.type
+class RoomStatisticsType:
+    totalRooms: int
+    availableRooms: int
+    reservedRooms: int
+    occupiedRooms: int
+    maintenanceRooms: int
+    byStatus: List[RoomStatusCountType]
+
+# Subscription payloads
+@strawberry.type
+class RoomStatusChangeType:
+    room: RoomType
+    # None for a new room
+    previousStatus: Optional[str] = None
+
 # Convert database model to GraphQL type
 def room_to_graphql(room: Room) -> RoomType:
     return RoomType(
@@ -116,90 +146,195 @@ def room_to_graphql(room: Room) -> RoomType:
         status=room.status
     )
 
+# Pub/sub topic of committed room status changes
+ROOM_STATUS_TOPIC = "room_status"
+
+def publish_status_changes(changes):
+    """Publish (room, previous status) pairs whose status actually changed"""
+    for room, previous_status in changes:
+        if room.status != previous_status:
+            pubsub.publish(ROOM_STATUS_TOPIC, RoomStatusChangeType(room=room, previousStatus=previous_status))
+
 # Dependency to get database session for strawberry
-def get_context():
-    db = next(get_db())
-    try:
+async def get_context():
+    async for db in get_request_db():
         yield {"db": db}
-    finally:
-        db.close()
 
 # Queries
 @strawberry.type
 class Query:
-    @strawberry.field
-    def room(self, info, id: int) -> Optional[RoomType]:
-        db = info.context["db"]
-        room = db.query(Room).filter(Room.id == id).first()
-        if room:
-            return room_to_graphql(room)
-        return None
+    @strawberry.field(metadata=cached("Room"))
+    async def room(self, info, id: int) -> Optional[RoomType]:
+        def load(db):
+            room = db.query(Room).filter(Room.id == id).first()
+            if room:
+                return room_to_graphql(room)
+            return None
+        return await run_db(info.context["db"], load)
 
-    @strawberry.field
-    def rooms(self, info) -> List[RoomType]:
-        db = info.context["db"]
-        rooms = db.query(Room).all()
-        return [room_to_graphql(room) for room in rooms]
+    @strawberry.field(metadata={**cached("Room"), **all_rows(Room)})
+    async def rooms(self, info) -> List[RoomType]:
+        def load(db):
+            rooms = db.query(Room).all()
+            return [room_to_graphql(room) for room in rooms]
+        return await run_db(info.context["db"], load)
+
+    @strawberry.field(metadata=cached("Room"))
+    async def rooms_connection(self, info, first: Optional[int] = None, after: Optional[str] = None, status: Optional[str] = None) -> Connection[RoomType]:
+        """Page through rooms by id; pass pageInfo.endCursor as ``after`` to get the next page"""
+        def build_query(db):
+            query = db.query(Room)
+            if status is not None:
+                query = query.filter(Room.status == status)
+            return query
+        return await paginate(info.context["db"], build_query, Room, room_to_graphql, first, after)
     
-    @strawberry.field
-    def available_rooms(self, info) -> List[RoomType]:
-        db = info.context["db"]
-        rooms = db.query(Room).filter(Room.status == "available").all()
-        return [room_to_graphql(room) for room in rooms]
+    @strawberry.field(metadata={**cached("Room"), **all_rows(Room)})
+    async def available_rooms(self, info) -> List[RoomType]:
+        def load(db):
+            rooms = db.query(Room).filter(Room.status == "available").all()
+            return [room_to_graphql(room) for room in rooms]
+        return await run_db(info.context["db"], load)
+
+    @strawberry.field(metadata=cached("Room"))
+    async def room_statistics(self, info) -> RoomStatisticsType:
+        """Room counts per status, computed with a single GROUP BY"""
+        def load(db):
+            return dict(db.query(Room.status, func.count(Room.id)).group_by(Room.status).all())
+        counts = await run_db(info.context["db"], load)
+        return RoomStatisticsType(
+            totalRooms=sum(counts.values()),
+            availableRooms=counts.get("available", 0),
+            reservedRooms=counts.get("reserved", 0),
+            occupiedRooms=counts.get("occupied", 0),
+            maintenanceRooms=counts.get("maintenance", 0),
+            byStatus=[RoomStatusCountType(status=status, count=count) for status, count in sorted(counts.items())]
+        )
+
+    @strawberry.field(metadata=cached("Room"))
+    async def rooms_by_ids(self, info, ids: List[int]) -> List[Optional[RoomType]]:
+        """Fetch many rooms in one query, in the order of ``ids`` (None for unknown ids)"""
+        def load(db):
+            return [room_to_graphql(room) if room else None for room in fetch_by_ids(db, Room, ids)]
+        return await run_db(info.context["db"], load)
 
 # Mutations
 @strawberry.type
 class Mutation:
-    @strawberry.mutation
-    def create_room(self, info, room_data: RoomInput) -> RoomType:
-        db = info.context["db"]
-        room = Room(
-            room_number=room_data.room_number,
-            room_type=room_data.room_type,
-            price_per_night=room_data.price_per_night,
-            status=room_data.status
-        )
-        db.add(room)
-        db.commit()
-        db.refresh(room)
-        return room_to_graphql(room)
-
-    @strawberry.mutation
-    def update_room(self, info, id: int, room_data: RoomUpdateInput) -> Optional[RoomType]:
-        db = info.context["db"]
-        room = db.query(Room).filter(Room.id == id).first()
-        if not room:
-            return None
-        
-        if room_data.room_number is not None:
-            room.room_number = room_data.room_number
-        if room_data.room_type is not None:
-            room.room_type = room_data.room_type
-        if room_data.price_per_night is not None:
-            room.price_per_night = room_data.price_per_night
-        if room_data.status is not None:
-            room.status = room_data.status
+    @strawberry.mutation(metadata=invalidates("Room"))
+    async def create_room(self, info, room_data: RoomInput) -> RoomType:
+        def create(db):
+            room = Room(
+                room_number=room_data.room_number,
+                room_type=room_data.room_type,
+                price_per_night=room_data.price_per_night,
+                status=room_data.status
+            )
+            db.add(room)
+            db.flush()
+            record_changes(db, "Room", [room.id], "create")
+            db.commit()
+            db.refresh(room)
+            return room_to_graphql(room)
+        room = await run_db(info.context["db"], create)
+        publish_status_changes([(room, None)])
+        return room
+
+    @strawberry.mutation(metadata=invalidates("Room"))
+    async def update_room(self, info, id: int, room_data: RoomUpdateInput) -> Optional[RoomType]:
+        def update(db):
+            room = db.query(Room).filter(Room.id == id).first()
+            if not room:
+                return None, None
+            previous_status = room.status
             
-        db.commit()
-        db.refresh(room)
-        return room_to_graphql(room)
-
-    @strawberry.mutation
-    def delete_room(self, info, id: int) -> bool:
-        db = info.context["db"]
-        room = db.query(Room).filter(Room.id == id).first()
-        if not room:
-            return False
-        
-        db.delete(room)
-        db.commit()
-        return True
+            if room_data.room_number is not None:
+                room.room_number = room_data.room_number
+            if room_data.room_type is not None:
+                room.room_type = room_data.room_type
+            if room_data.price_per_night is not None:
+                room.price_per_night = room_data.price_per_night
+            if room_data.status is not None:
+                room.status = room_data.status
+                
+            record_changes(db, "Room", [room.id], "update")
+            db.commit()
+            db.refresh(room)
+            return room_to_graphql(room), previous_status
+        room, previous_status = await run_db(info.context["db"], update)
+        if room:
+            publish_status_changes([(room, previous_status)])
+        return room
+
+    @strawberry.mutation(metadata=invalidates("Room"))
+    async def update_room_statuses(self, info, ids: List[int], status: str, expected_status: Optional[str] = None) -> List[RoomType]:
+        """Set the status of many rooms with one UPDATE; with ``expected_status`` only rooms currently in that status change.
+
+        Returns the rooms that were updated.
+        """
+        def update_statuses(db):
+            if not ids:
+                return []
+            table = Room.__table__
+            if db.get_bind().dialect.name == "postgresql":
+                # Lock the matching rows and keep their old status for the subscription events
+                matched = select(table.c.id, table.c.status.label("previous_status")).where(
+                    table.c.id == any_(bindparam("ids", list(set(ids)), type_=ARRAY(Integer)))
+                )
+                if expected_status is not None:
+                    matched = matched.where(table.c.status == expected_status)
+                matched = matched.with_for_update().subquery()
+                statement = update(table).where(table.c.id == matched.c.id).values(status=status)
+                rows = db.execute(statement.returning(*table.c, matched.c.previous_status)).all()
+                previous_statuses = {row.id: row.previous_status for row in rows}
+            else:
+                # Without UPDATE ... RETURNING, pick the matching ids first, then update exactly those
+                query = db.query(Room.id, Room.status).filter(Room.id.in_(ids))
+                if expected_status is not None:
+                    query = query.filter(Room.status == expected_status)
+                previous_statuses = dict(query.all())
+                matched_ids = list(previous_statuses)
+                if matched_ids:
+                    db.execute(update(table).where(table.c.id.in_(matched_ids)).values(status=status))
+                rows = db.query(Room).filter(Room.id.in_(matched_ids)).all() if matched_ids else []
+            record_changes(db, "Room", sorted(row.id for row in rows), "update")
+            db.commit()
+            return [(room_to_graphql(row), previous_statuses[row.id]) for row in sorted(rows, key=lambda row: row.id)]
+        changes = await run_db(info.context["db"], update_statuses)
+        publish_status_changes(changes)
+        return [room for room, _ in changes]
+
+    @strawberry.mutation(metadata=invalidates("Room"))
+    async def delete_room(self, info, id: int) -> bool:
+        def delete(db):
+            room = db.query(Room).filter(Room.id == id).first()
+            if not room:
+                return False
+            
+            db.delete(room)
+            record_changes(db, "Room", [id], "delete")
+            db.commit()
+            return True
+        return await run_db(info.context["db"], delete)
+
+# Subscriptions, served over WebSocket (graphql-transport-ws or graphql-ws) on the GraphQL endpoint
+@strawberry.type
+class Subscription:
+    @strawberry.subscription
+    async def room_status_changed(self, info, room_id: Optional[int] = None) -> AsyncGenerator[RoomStatusChangeType, None]:
+        """Every committed room status change from this instance; pass ``room_id`` to follow a single room"""
+        async for change in pubsub.subscribe(ROOM_STATUS_TOPIC):
+            if room_id is None or change.room.id == room_id:
+                yield change
+
+# Responses of repeated queries, dropped when a mutation changes rooms
+response_cache = ResponseCache.from_env("room")
 
 # Create GraphQL schema
-schema = strawberry.Schema(query=Query, mutation=Mutation)
+schema = strawberry.Schema(query=Query, mutation=Mutation, subscription=Subscription, extensions=[CachedDocuments, QueryCost, response_cache.extension()])
 
 # Create GraphQL router for FastAPI
-graphql_router = GraphQLRouter(
+graphql_router = PersistedQueryRouter(
     schema,
     context_getter=get_context
 )
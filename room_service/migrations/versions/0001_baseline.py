@@ -0,0 +1,36 @@
+"""Baseline rooms table
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Databases created by the old Base.metadata.create_all startup already have the
+table; it is adopted as is and only new databases get it created here.
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def has_table(name: str) -> bool:
+    # Offline runs (alembic upgrade head --sql) can't inspect the database; they emit the full schema
+    return not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table(name)
+
+def upgrade():
+    if has_table("rooms"):
+        return
+    op.create_table(
+        "rooms",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("room_number", sa.String),
+        sa.Column("room_type", sa.String, nullable=False),
+        sa.Column("price_per_night", sa.Numeric(10, 2), nullable=False),
+        sa.Column("status", sa.String, nullable=False)
+    )
+    op.create_index("ix_rooms_room_number", "rooms", ["room_number"], unique=True)
+
+def downgrade():
+    op.drop_table("rooms")
@@ -0,0 +1,30 @@
+"""Index rooms by status
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+availableRooms and roomsConnection(status) filter on status and page by id, which
+was a sequential scan of rooms.
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def create_index_concurrently(name, table, columns, **kw):
+    # An interrupted CONCURRENTLY build leaves an INVALID index with this name behind, which
+    # would make every later run of this migration fail; drop it so the build starts over
+    if op.get_context().dialect.name == "postgresql":
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    op.create_index(name, table, columns, postgresql_concurrently=True, **kw)
+
+def upgrade():
+    # CONCURRENTLY keeps the table writable while the index builds; it can't run in a transaction
+    with op.get_context().autocommit_block():
+        create_index_concurrently("ix_rooms_status_id", "rooms", ["status", "id"])
+
+def downgrade():
+    op.drop_index("ix_rooms_status_id", table_name="rooms")